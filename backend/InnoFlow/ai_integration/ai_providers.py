@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 class AIProvider(ABC):
+    # Largest number of texts a single embed() call may carry
+    max_embedding_batch = 16
+
     @abstractmethod
     def generate_completion(self, prompt: str, **kwargs) -> str:
         """Generate a completion based on the prompt."""
-        pass
\ No newline at end of file
+        pass
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Embed texts, one vector per text in order; errors are raised, not swallowed."""
+        raise NotImplementedError(f"{type(self).__name__} does not support embeddings")
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from .models import AIModelConfig
+from .providers_registry import ProviderRegistry
+from .near_duplicate import NearDuplicateCache
+from .single_flight import SingleFlight
+from .tokens import preflight, record_usage
+
+logger = logging.getLogger(__name__)
+
+
+def is_mock_config(model_config: AIModelConfig) -> bool:
+    """Configs with test keys are answered by the mock provider"""
+    return bool(model_config.api_key and model_config.api_key.startswith('test-'))
+
+
+def get_config_provider(model_config: AIModelConfig):
+    """Build the provider of a model config, the mock provider for test keys"""
+    if is_mock_config(model_config):
+        logger.info(f"Using mock provider for test key: {model_config.provider}")
+        return ProviderRegistry.get_provider(
+            "MOCK",
+            api_key=model_config.api_key,
+            model_name=f"{model_config.provider.lower()}-{model_config.model_name}"
+        )
+    logger.info(f"Using real provider: {model_config.provider}")
+    return ProviderRegistry.get_provider(
+        model_config.provider.lower(),
+        api_key=model_config.api_key,
+        model_name=model_config.model_name,
+        base_url=model_config.base_url
+    )
+
+
+def uses_single_flight(model_config: AIModelConfig) -> bool:
+    """
+    Whether identical concurrent calls to this config may share one response
+
+    Configs that sample non-deterministically opt out with
+    ``parameters = {"single_flight": false}``.
+    """
+    parameters = model_config.parameters or {}
+    return parameters.get('single_flight', getattr(settings, 'AI_SINGLE_FLIGHT_ENABLED', True)) is not False
+
+
+def uses_near_duplicate_cache(model_config: AIModelConfig) -> bool:
+    """Whether near-identical prompts to this config may reuse a cached response"""
+    parameters = model_config.parameters or {}
+    return parameters.get(
+        'near_duplicate_cache', getattr(settings, 'AI_NEAR_DUPLICATE_CACHE_ENABLED', False)
+    ) is True
+
+
+def config_namespace(model_config: AIModelConfig, kwargs: dict) -> str:
+    """Identity of a config and call options; edits to the config start a new one"""
+    return json.dumps([
+        model_config.pk,
+        model_config.updated_at.isoformat() if model_config.updated_at else None,
+        model_config.provider,
+        model_config.model_name,
+        kwargs,
+    ], sort_keys=True, default=str)
+
+
+def completion_key(model_config: AIModelConfig, prompt: str, kwargs: dict) -> str:
+    """Identity of a provider call"""
+    payload = json.dumps([config_namespace(model_config, kwargs), prompt])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide SingleFlight configured by the AI_SINGLE_FLIGHT_* settings"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(
+                    cache_alias=getattr(settings, 'AI_SINGLE_FLIGHT_CACHE', 'default'),
+                    lock_timeout=getattr(settings, 'AI_SINGLE_FLIGHT_TIMEOUT', 120.0),
+                    result_ttl=getattr(settings, 'AI_SINGLE_FLIGHT_RESULT_TTL', 5.0),
+                    prefix='ai_completion'
+                )
+    return _single_flight
+
+
+_near_duplicate_cache = None
+_near_duplicate_cache_lock = threading.Lock()
+
+
+def get_near_duplicate_cache() -> NearDuplicateCache:
+    """Process-wide NearDuplicateCache configured by the AI_NEAR_DUPLICATE_* settings"""
+    global _near_duplicate_cache
+    if _near_duplicate_cache is None:
+        with _near_duplicate_cache_lock:
+            if _near_duplicate_cache is None:
+                _near_duplicate_cache = NearDuplicateCache(
+                    threshold=getattr(settings, 'AI_NEAR_DUPLICATE_THRESHOLD', 0.9),
+                    max_entries=getattr(settings, 'AI_NEAR_DUPLICATE_MAX_ENTRIES', 10000),
+                    ttl=getattr(settings, 'AI_NEAR_DUPLICATE_TTL', 3600),
+                    mask_volatile=getattr(settings, 'AI_NEAR_DUPLICATE_MASK_VOLATILE', False)
+                )
+    return _near_duplicate_cache
+
+
+def _call_provider(model_config: AIModelConfig, prompt: str, provider, kwargs: dict) -> str:
+    if provider is None:
+        provider = get_config_provider(model_config)
+    if not uses_single_flight(model_config):
+        return provider.generate_completion(prompt, **kwargs)
+    key = completion_key(model_config, prompt, kwargs)
+    return get_single_flight().do(key, lambda: provider.generate_completion(prompt, **kwargs))
+
+
+def generate_completion(model_config: AIModelConfig, prompt: str, provider=None, usage: dict = None,
+                        **kwargs) -> str:
+    """
+    Generate a completion with a model config
+
+    Prompts are checked against the model's context window first, so
+    oversized ones fail with PromptTooLongError before any provider call.
+    Identical calls that overlap in time, in this process or in other
+    workers sharing the cache, wait for a single provider call. ``usage``,
+    when given, receives the prompt and completion token counts.
+    """
+    prompt, prompt_tokens = preflight(model_config, prompt, kwargs)
+    response = _call_provider(model_config, prompt, provider, kwargs)
+    record_usage(usage, model_config, prompt_tokens, response)
+    return response
+
+
+def generate_cached_completion(model_config: AIModelConfig, prompt: str, provider=None, usage: dict = None,
+                               **kwargs) -> Tuple[str, Optional[float]]:
+    """
+    generate_completion that first looks for a cached response to a
+    near-identical prompt, for configs using the near-duplicate cache
+
+    Returns:
+        (response, similarity of the cached prompt that answered it, or None
+        when the provider was called)
+    """
+    if not uses_near_duplicate_cache(model_config):
+        return generate_completion(model_config, prompt, provider, usage, **kwargs), None
+
+    sent_prompt, prompt_tokens = preflight(model_config, prompt, kwargs)
+    cache = get_near_duplicate_cache()
+    namespace = config_namespace(model_config, kwargs)
+    response, similarity = cache.get(namespace, prompt)
+    if response is not None:
+        logger.info(f"Near-duplicate cache hit for {model_config} (similarity {similarity:.2f})")
+        record_usage(usage, model_config, prompt_tokens, response)
+        return response, similarity
+
+    response = _call_provider(model_config, sent_prompt, provider, kwargs)
+    record_usage(usage, model_config, prompt_tokens, response)
+    if response:
+        cache.set(namespace, prompt, response)
+    return response, None
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_integration', '0003_alter_aimodelconfig_provider'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nodeport',
+            index=models.Index(fields=['node', 'port_type', 'optional'], name='ai_nodeport_type_optional'),
+        ),
+    ]
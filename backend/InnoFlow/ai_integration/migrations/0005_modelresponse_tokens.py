@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_integration', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelresponse',
+            name='completion_tokens',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='modelresponse',
+            name='prompt_tokens',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_integration', '0005_modelresponse_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modelresponse',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
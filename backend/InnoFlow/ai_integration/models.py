@@ -46,6 +46,10 @@ class ModelResponse(models.Model):
     model_config = models.ForeignKey(AIModelConfig, on_delete=models.CASCADE)
     response = models.TextField()
     latency = models.FloatField(help_text="Response time in seconds")
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    completion_tokens = models.IntegerField(null=True, blank=True)
+    # Set, with an empty response, when the model could not be called
+    error = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -80,6 +84,9 @@ class NodePort(models.Model):
     
     class Meta:
         unique_together = ['node', 'name', 'port_type']
+        indexes = [
+            models.Index(fields=['node', 'port_type', 'optional'], name='ai_nodeport_type_optional'),
+        ]
         
     def __str__(self):
         return f"{self.node} - {self.port_type}:{self.name}"
\ No newline at end of file
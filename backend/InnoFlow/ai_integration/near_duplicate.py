@@ -0,0 +1,202 @@
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Parts of a prompt that change between otherwise identical runs. They can
+# also change the answer, so they are only masked when a cache opts in.
+_VOLATILE_PATTERNS = [
+    (re.compile(r'\b\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?\b'), ' <datetime> '),
+    (re.compile(r'\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b'), ' <date> '),
+    (re.compile(r'\b\d{1,2}:\d{2}(?::\d{2})?(?:\s?[ap]m)?\b'), ' <time> '),
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b'), ' <uuid> '),
+]
+_TOKEN_PATTERN = re.compile(r'<\w+>|\w+')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_prompt(prompt: str, mask_volatile: bool = False) -> str:
+    """Lowercase and collapse whitespace and punctuation, masking timestamps and ids if asked"""
+    text = prompt.lower()
+    if mask_volatile:
+        for pattern, placeholder in _VOLATILE_PATTERNS:
+            text = pattern.sub(placeholder, text)
+    return ' '.join(_TOKEN_PATTERN.findall(text))
+
+
+def shingle_hashes(text: str, size: int = 3) -> np.ndarray:
+    """32-bit hashes of the word n-grams of a normalized text"""
+    words = text.split()
+    if len(words) <= size:
+        shingles = {text}
+    else:
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """MinHash signatures from ``num_perm`` universal hash functions"""
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Multipliers below 2**31 keep a * hash + b within uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        permuted = (self.a * hashes[None, :] + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class _Entry:
+    __slots__ = ('namespace', 'normalized', 'signature', 'bands', 'value', 'expires_at')
+
+    def __init__(self, namespace, normalized, signature, bands, value, expires_at):
+        self.namespace = namespace
+        self.normalized = normalized
+        self.signature = signature
+        self.bands = bands
+        self.value = value
+        self.expires_at = expires_at
+
+
+class NearDuplicateCache:
+    """
+    In-memory completion cache that also answers near-identical prompts.
+
+    Prompts are normalized, shingled into word n-grams and indexed by their
+    MinHash signature in an LSH table of ``bands`` x ``rows`` buckets, so a
+    lookup only compares against prompts that share a bucket. A candidate is
+    a hit when its estimated Jaccard similarity reaches ``threshold``.
+    Entries live in ``namespace`` (e.g. one per model config), expire after
+    ``ttl`` seconds and the least recently used are evicted past
+    ``max_entries``.
+
+    Exact hits need the same normalized text. With ``mask_volatile``,
+    dates, times and UUIDs are masked before shingling, so prompts differing
+    only in them are near hits rather than exact ones.
+    """
+    def __init__(self, threshold: float = 0.9, max_entries: int = 10000, ttl: Optional[float] = 3600,
+                 num_perm: int = 128, bands: int = 16, shingle_size: int = 3, mask_volatile: bool = False):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.mask_volatile = mask_volatile
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, _Entry]' = OrderedDict()
+        self._exact: Dict[Tuple, int] = {}
+        self._buckets: Dict[Tuple, set] = defaultdict(set)
+        self._next_id = 0
+        self._stats = {'hits': 0, 'exact_hits': 0, 'misses': 0, 'evictions': 0, 'similarity_total': 0.0}
+
+    def _index(self, namespace, prompt: str):
+        normalized = normalize_prompt(prompt)
+        shingled = normalize_prompt(prompt, mask_volatile=True) if self.mask_volatile else normalized
+        signature = self.hasher.signature(shingle_hashes(shingled, self.shingle_size))
+        bands = [
+            (namespace, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+        return normalized, signature, bands
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        if self._exact.get((entry.namespace, entry.normalized)) == entry_id:
+            del self._exact[(entry.namespace, entry.normalized)]
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _is_live(self, entry_id: int, now: float) -> bool:
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return False
+        if entry.expires_at is not None and entry.expires_at <= now:
+            self._remove(entry_id)
+            return False
+        return True
+
+    def get(self, namespace, prompt: str) -> Tuple[Optional[object], Optional[float]]:
+        """
+        Cached value of the most similar prompt
+
+        Returns:
+            (value, estimated similarity), or (None, None) on a miss
+        """
+        normalized, signature, bands = self._index(namespace, prompt)
+        now = time.monotonic()
+        with self._lock:
+            entry_id = self._exact.get((namespace, normalized))
+            if entry_id is not None and self._is_live(entry_id, now):
+                self._entries.move_to_end(entry_id)
+                self._stats['hits'] += 1
+                self._stats['exact_hits'] += 1
+                self._stats['similarity_total'] += 1.0
+                return self._entries[entry_id].value, 1.0
+
+            candidates = set()
+            for band in bands:
+                candidates.update(self._buckets.get(band, ()))
+            candidates = [candidate_id for candidate_id in candidates if self._is_live(candidate_id, now)]
+            best_id, best_similarity = None, 0.0
+            if candidates:
+                signatures = np.stack([self._entries[candidate_id].signature for candidate_id in candidates])
+                similarities = (signatures == signature).mean(axis=1)
+                best = int(similarities.argmax())
+                best_id, best_similarity = candidates[best], float(similarities[best])
+
+            if best_id is None or best_similarity < self.threshold:
+                self._stats['misses'] += 1
+                return None, None
+            self._entries.move_to_end(best_id)
+            self._stats['hits'] += 1
+            self._stats['similarity_total'] += best_similarity
+            return self._entries[best_id].value, best_similarity
+
+    def set(self, namespace, prompt: str, value) -> None:
+        normalized, signature, bands = self._index(namespace, prompt)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            existing = self._exact.get((namespace, normalized))
+            if existing is not None:
+                self._remove(existing)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(namespace, normalized, signature, bands, value, expires_at)
+            self._exact[(namespace, normalized)] = entry_id
+            for band in bands:
+                self._buckets[band].add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict:
+        """Hit rate and hit quality (mean similarity of served prompts)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['near_hits'] = stats['hits'] - stats['exact_hits']
+        stats['mean_similarity'] = stats.pop('similarity_total') / stats['hits'] if stats['hits'] else None
+        return stats
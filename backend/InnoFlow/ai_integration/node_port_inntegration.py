@@ -1,9 +1,84 @@
 # ai_integration/node_port_integration.py
-from typing import List, Dict, Any
-from ai_integration.models import NodePort
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+from django.db import transaction
+from InnoFlow.ai_integration.models import NodePort
 from workflows.models import Node
 from workflows.node_types import NodeTypeRegistry
 
+def get_desired_ports(node_type: str) -> Optional[Dict[Tuple[str, str], Tuple[str, bool]]]:
+    """
+    Ports a node of the given type should have, by (name, port_type)
+    
+    Returns:
+        Mapping to (data_type, optional), or None for unregistered types
+    """
+    definition = NodeTypeRegistry.get_all_node_types().get(node_type)
+    if definition is None:
+        return None
+    ports = {}
+    for port_def in definition.ports:
+        ports.setdefault((port_def.name, port_def.port_type), (port_def.data_type, port_def.optional))
+    return ports
+
+def sync_node_ports(nodes: Iterable) -> Dict[int, Union[int, str]]:
+    """
+    Reconcile the NodePort rows of many nodes with their type definitions
+    
+    Stale ports are removed with one delete, missing ports added with one
+    bulk_create and ports with outdated settings fixed with one bulk_update;
+    ports that already match are left alone. Nodes of unregistered types keep
+    their ports.
+    
+    Args:
+        nodes: Node objects (or anything with ``id`` and ``type``)
+        
+    Returns:
+        Number of ports per node id, or an error message for nodes whose type
+        is not registered
+    """
+    results = {}
+    desired = {}
+    for node in nodes:
+        ports = get_desired_ports(node.type)
+        if ports is None:
+            results[node.id] = f"Failed to create ports for node {node.id}: Unknown node type: {node.type}"
+            continue
+        results[node.id] = len(ports)
+        for (name, port_type), port_settings in ports.items():
+            desired[(node.id, name, port_type)] = port_settings
+    
+    synced_ids = [node_id for node_id, result in results.items() if isinstance(result, int)]
+    if not synced_ids:
+        return results
+    
+    # Joins the caller's transaction rather than adding a savepoint
+    with transaction.atomic(savepoint=False):
+        stale_ids = []
+        changed = []
+        existing = NodePort.objects.filter(node_id__in=synced_ids).only(
+            'id', 'node_id', 'name', 'port_type', 'data_type', 'optional'
+        )
+        for port in existing:
+            key = (port.node_id, port.name, port.port_type)
+            port_settings = desired.pop(key, None)
+            if port_settings is None:
+                stale_ids.append(port.id)
+            elif (port.data_type, port.optional) != port_settings:
+                port.data_type, port.optional = port_settings
+                changed.append(port)
+        
+        if stale_ids:
+            NodePort.objects.filter(id__in=stale_ids).delete()
+        if changed:
+            NodePort.objects.bulk_update(changed, ['data_type', 'optional'])
+        # Whatever is left in desired does not exist yet
+        NodePort.objects.bulk_create([
+            NodePort(node_id=node_id, name=name, port_type=port_type, data_type=data_type, optional=optional)
+            for (node_id, name, port_type), (data_type, optional) in desired.items()
+        ])
+    
+    return results
+
 def create_ports_for_node(node: Node) -> List[NodePort]:
     """
     Create NodePort objects for a node based on its type definition
@@ -12,32 +87,12 @@ def create_ports_for_node(node: Node) -> List[NodePort]:
         node: The Node object
         
     Returns:
-        List of created NodePort objects
+        List of the node's NodePort objects
     """
-    try:
-        # Get node type definition
-        node_type = NodeTypeRegistry.get_node_type(node.type)
-        
-        created_ports = []
-        
-        # Delete existing ports
-        NodePort.objects.filter(node=node).delete()
-        
-        # Create ports based on the definition
-        for port_def in node_type.ports:
-            port = NodePort.objects.create(
-                node=node,
-                name=port_def.name,
-                port_type=port_def.port_type,
-                data_type=port_def.data_type,
-                optional=port_def.optional
-            )
-            created_ports.append(port)
-            
-        return created_ports
-        
-    except Exception as e:
-        raise ValueError(f"Failed to create ports for node {node.id}: {str(e)}")
+    result = sync_node_ports([node])[node.id]
+    if isinstance(result, str):
+        raise ValueError(result)
+    return list(NodePort.objects.filter(node=node))
 
 def update_workflow_ports(workflow_id: int) -> Dict[str, Any]:
     """
@@ -47,28 +102,42 @@ def update_workflow_ports(workflow_id: int) -> Dict[str, Any]:
         workflow_id: ID of the workflow
         
     Returns:
-        Dictionary with counts of created ports by node
+        Dictionary with port counts (or errors) by node
     """
     from workflows.models import Workflow
     
     workflow = Workflow.objects.get(id=workflow_id)
-    nodes = Node.objects.filter(workflow=workflow)
+    nodes = list(Node.objects.filter(workflow=workflow).only('id', 'type'))
     
-    results = {}
-    
-    for node in nodes:
-        try:
-            ports = create_ports_for_node(node)
-            results[node.id] = len(ports)
-        except Exception as e:
-            results[node.id] = str(e)
-            
     return {
         'workflow_id': workflow_id,
-        'node_results': results,
+        'node_results': sync_node_ports(nodes),
         'total_nodes': len(nodes)
     }
 
+def update_all_workflow_ports(batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Reconcile the ports of every node in every workflow
+    
+    Nodes are processed in batches of ``batch_size``, each in its own
+    transaction, so a port migration needs a handful of queries per batch.
+    
+    Returns:
+        Counts of processed nodes and of nodes with unregistered types
+    """
+    total = failed = 0
+    last_id = 0
+    while True:
+        nodes = list(Node.objects.filter(id__gt=last_id).order_by('id').only('id', 'type')[:batch_size])
+        if not nodes:
+            break
+        results = sync_node_ports(nodes)
+        total += len(nodes)
+        failed += sum(1 for result in results.values() if isinstance(result, str))
+        last_id = nodes[-1].id
+    
+    return {'total_nodes': total, 'failed_nodes': failed}
+
 def validate_node_ports(node: Node) -> List[str]:
     """
     Validate that a node has the correct ports based on its type
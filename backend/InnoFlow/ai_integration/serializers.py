@@ -12,7 +12,9 @@ class ModelResponseSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ModelResponse
-        fields = ['id', 'model_config', 'response', 'latency', 'created_at']
+        fields = [
+            'id', 'model_config', 'response', 'error', 'latency', 'prompt_tokens', 'completion_tokens', 'created_at'
+        ]
 
 class ModelComparisonSerializer(serializers.ModelSerializer):
     compared_models = serializers.PrimaryKeyRelatedField(
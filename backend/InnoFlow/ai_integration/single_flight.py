@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into a single upstream call.
+
+    Within a process, callers of ``do`` with a key already in flight wait for
+    the running call and share its result or exception. Across processes the
+    Django cache is used: the process holding the key's lock makes the call
+    and publishes the result for ``result_ttl`` seconds while the others poll
+    for it. Results are only shared with calls that overlap; this is not a
+    response cache. Cache failures degrade to calling upstream directly.
+    """
+    def __init__(self, cache_alias: str = 'default', lock_timeout: float = 120.0,
+                 result_ttl: float = 5.0, poll_interval: float = 0.05, prefix: str = 'singleflight'):
+        self.cache_alias = cache_alias
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        # leader / local / remote counts, for monitoring coalescing rates
+        self.stats = Counter()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.event.wait(self.lock_timeout):
+                logger.warning(f"Single-flight call {key} timed out, calling upstream directly")
+                return fn()
+            self.stats['local'] += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _do_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Make the call unless another process is already making it"""
+        cache = caches[self.cache_alias]
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+
+        waiting = False
+        while True:
+            try:
+                # Once another process was seen holding the lock, its result
+                # may be published and the lock released between two polls
+                shared = cache.get(result_key) if waiting else None
+                acquired = shared is None and cache.add(lock_key, token, self.lock_timeout)
+                if not acquired and shared is None:
+                    shared = cache.get(result_key)
+            except Exception as e:
+                logger.warning(f"Single-flight cache unavailable, calling upstream directly: {str(e)}")
+                self.stats['leader'] += 1
+                return fn()
+
+            if acquired:
+                self.stats['leader'] += 1
+                try:
+                    result = fn()
+                    self._publish(cache, result_key, result)
+                    return result
+                finally:
+                    self._release(cache, lock_key, token)
+
+            if shared is not None:
+                self.stats['remote'] += 1
+                return shared['value']
+            waiting = True
+            if time.monotonic() >= deadline:
+                logger.warning(f"Single-flight call {key} timed out, calling upstream directly")
+                self.stats['leader'] += 1
+                return fn()
+            time.sleep(self.poll_interval)
+
+    def _publish(self, cache, result_key: str, result: Any) -> None:
+        try:
+            cache.set(result_key, {'value': result}, self.result_ttl)
+        except Exception as e:
+            logger.warning(f"Failed to share single-flight result: {str(e)}")
+
+    @staticmethod
+    def _release(cache, lock_key: str, token: str) -> None:
+        try:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"Failed to release single-flight lock: {str(e)}")
@@ -1,34 +1,29 @@
 from celery import shared_task
 from .models import AIModelConfig, ModelComparison, ModelResponse
-from .providers_registry import ProviderRegistry
+from .completion import generate_cached_completion, generate_completion, is_mock_config
+from .tokens import PromptTooLongError
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 @shared_task
 def run_ai_model_task(model_config_id: int, prompt: str, comparison_id: int = None) -> str:
     model_config = AIModelConfig.objects.get(id=model_config_id)
     
     start_time = time.time()
     
-    # Check if this is a test/demo environment with fake API keys
-    is_test_key = model_config.api_key and model_config.api_key.startswith('test-')
-    
-    if is_test_key:
-        # Use mock provider for test keys
-        provider = ProviderRegistry.get_provider(
-            "MOCK",
-            api_key=model_config.api_key,
-            model_name=f"{model_config.provider.lower()}-{model_config.model_name}"
-        )
-    else:
-        # Use real provider for production
-        provider = ProviderRegistry.get_provider(
-            model_config.provider.lower(),
-            api_key=model_config.api_key,
-            model_name=model_config.model_name,
-            base_url=model_config.base_url
-        )
-    
-    response = provider.generate_completion(prompt)
+    # Test keys are answered by the mock provider; identical concurrent
+    # calls share one provider call
+    usage = {}
+    error = None
+    try:
+        response = generate_completion(model_config, prompt, usage=usage)
+    except PromptTooLongError as e:
+        # Retrying cannot make the prompt fit, record the failure instead
+        logger.warning(f"Prompt rejected for {model_config}: {str(e)}")
+        response, error = '', str(e)
+        usage['prompt_tokens'] = e.prompt_tokens
     
     latency = time.time() - start_time
     
@@ -39,7 +34,10 @@ def run_ai_model_task(model_config_id: int, prompt: str, comparison_id: int = No
             comparison=comparison,
             model_config=model_config,
             response=response,
-            latency=latency
+            error=error,
+            latency=latency,
+            prompt_tokens=usage.get('prompt_tokens'),
+            completion_tokens=usage.get('completion_tokens')
         )
     
     return response
@@ -56,36 +54,20 @@ def run_single_model_task(model_config_id: int, prompt: str, task_id: str, param
         start_time = time.time()
         
         # Check if this is a test/demo environment with fake API keys
-        is_test_key = model_config.api_key and model_config.api_key.startswith('test-')
+        is_test_key = is_mock_config(model_config)
         
-        if is_test_key:
-            print(f"🧪 Using mock provider for test key: {model_config.provider}")
-            # Use mock provider for test keys
-            provider = ProviderRegistry.get_provider(
-                "MOCK",
-                api_key=model_config.api_key,
-                model_name=f"{model_config.provider.lower()}-{model_config.model_name}"
-            )
-        else:
-            print(f"🚀 Using real provider: {model_config.provider}")
-            # Validate model config has required fields for real providers
-            if not model_config.api_key and model_config.provider in ['OPENAI', 'ANTHROPIC', 'DEEPSEEK', 'GEMINI']:
-                return {
-                    'error': f'API key required for {model_config.provider}',
-                    'task_id': task_id,
-                    'status': 'failed'
-                }
-            
-            # Use real provider for production
-            provider = ProviderRegistry.get_provider(
-                model_config.provider.lower(),
-                api_key=model_config.api_key,
-                model_name=model_config.model_name,
-                base_url=model_config.base_url
-            )
+        # Validate model config has required fields for real providers
+        if not is_test_key and not model_config.api_key and model_config.provider in ['OPENAI', 'ANTHROPIC', 'DEEPSEEK', 'GEMINI']:
+            return {
+                'error': f'API key required for {model_config.provider}',
+                'task_id': task_id,
+                'status': 'failed'
+            }
         
-        # Execute the model
-        response = provider.generate_completion(prompt)
+        # Execute the model, reusing answers to near-identical prompts when
+        # enabled and sharing identical in-flight calls
+        usage = {}
+        response, cache_similarity = generate_cached_completion(model_config, prompt, usage=usage)
         
         if not response:
             return {
@@ -105,9 +87,12 @@ def run_single_model_task(model_config_id: int, prompt: str, task_id: str, param
                 'provider': model_config.provider,
                 'model_name': model_config.model_name
             },
+            'usage': usage,
             'task_id': task_id,
             'status': 'completed',
-            'is_mock': is_test_key
+            'is_mock': is_test_key,
+            # Similarity of the cached prompt that answered, None for provider calls
+            'cache_similarity': cache_similarity
         }
         
     except AIModelConfig.DoesNotExist:
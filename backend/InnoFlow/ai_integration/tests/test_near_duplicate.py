@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.test import TestCase
+from InnoFlow.ai_integration.completion import generate_cached_completion
+from InnoFlow.ai_integration.models import AIModelConfig
+from InnoFlow.ai_integration.near_duplicate import NearDuplicateCache, normalize_prompt
+
+TEMPLATE = (
+    "You are a helpful assistant. Today is {date}. Summarize the following support ticket "
+    "in two sentences and suggest a next step for the agent handling it. Ticket: the customer "
+    "reports that exported invoices are missing the tax column since the last release{suffix}"
+)
+
+
+class NearDuplicateCacheTests(TestCase):
+    def test_normalize_masks_volatile_parts_on_request(self):
+        prompt = "Run at 2024-05-01T10:00:00Z,\n  ID 123e4567-e89b-12d3-a456-426614174000!"
+        self.assertEqual(normalize_prompt(prompt, mask_volatile=True), "run at <datetime> id <uuid>")
+        self.assertEqual(
+            normalize_prompt(prompt), "run at 2024 05 01t10 00 00z id 123e4567 e89b 12d3 a456 426614174000"
+        )
+
+    def test_near_identical_prompts_hit(self):
+        near_cache = NearDuplicateCache(threshold=0.8)
+        near_cache.set('config', TEMPLATE.format(date='2024-05-01', suffix='.'), 'answer')
+
+        value, similarity = near_cache.get('config', TEMPLATE.format(date='2024-05-01', suffix='!!').upper())
+        self.assertEqual((value, similarity), ('answer', 1.0))
+
+        value, similarity = near_cache.get('config', TEMPLATE.format(date='2024-05-01', suffix=', thanks'))
+        self.assertEqual(value, 'answer')
+        self.assertGreaterEqual(similarity, 0.8)
+        self.assertLess(similarity, 1.0)
+        self.assertEqual((near_cache.stats()['exact_hits'], near_cache.stats()['near_hits']), (1, 1))
+
+    def test_dates_and_ids_are_not_exact_matches(self):
+        near_cache = NearDuplicateCache(threshold=0.95)
+        near_cache.set('config', 'List the orders on 2024-01-01', 'January orders')
+        near_cache.set('config', 'Summarize record 123e4567-e89b-12d3-a456-426614174000', 'record A')
+        self.assertEqual(near_cache.get('config', 'List the orders on 2024-02-01'), (None, None))
+        self.assertEqual(
+            near_cache.get('config', 'Summarize record 9f1c2d3e-0000-4000-8000-000000000001'), (None, None)
+        )
+
+        # Masking them is opt-in, and their matches are near hits
+        masking_cache = NearDuplicateCache(threshold=0.95, mask_volatile=True)
+        masking_cache.set('config', TEMPLATE.format(date='2024-05-01', suffix=''), 'answer')
+        value, _ = masking_cache.get('config', TEMPLATE.format(date='2024-06-12', suffix=''))
+        self.assertEqual(value, 'answer')
+        self.assertEqual((masking_cache.stats()['exact_hits'], masking_cache.stats()['near_hits']), (0, 1))
+
+    def test_different_prompts_and_namespaces_miss(self):
+        near_cache = NearDuplicateCache(threshold=0.8)
+        near_cache.set('config', TEMPLATE.format(date='2024-05-01', suffix=''), 'answer')
+        self.assertEqual(near_cache.get('config', "Translate 'good morning' into French"), (None, None))
+        self.assertEqual(near_cache.get('other', TEMPLATE.format(date='2024-05-01', suffix='')), (None, None))
+
+        stats = near_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def test_memory_is_bounded(self):
+        near_cache = NearDuplicateCache(max_entries=2)
+        for i in range(3):
+            near_cache.set('config', f"prompt number {i} about topic {i * 7}", i)
+        self.assertEqual(near_cache.get('config', "prompt number 0 about topic 0"), (None, None))
+        self.assertEqual(near_cache.get('config', "prompt number 2 about topic 14")[0], 2)
+        self.assertEqual(near_cache.stats()['evictions'], 1)
+        self.assertEqual(near_cache.stats()['entries'], 2)
+
+    def test_entries_expire(self):
+        near_cache = NearDuplicateCache(ttl=10)
+        with patch('InnoFlow.ai_integration.near_duplicate.time.monotonic', return_value=100.0):
+            near_cache.set('config', 'hello there', 'hi')
+        with patch('InnoFlow.ai_integration.near_duplicate.time.monotonic', return_value=111.0):
+            self.assertEqual(near_cache.get('config', 'hello there'), (None, None))
+
+
+class CachedCompletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = AIModelConfig.objects.create(
+            name='Cached', provider='OPENAI', model_name='gpt-4', api_key='test-key', model_type='chat',
+            parameters={'near_duplicate_cache': True}
+        )
+
+    @patch('InnoFlow.ai_integration.completion._near_duplicate_cache', None)
+    def test_near_duplicate_prompts_skip_the_provider(self):
+        provider = MagicMock()
+        provider.generate_completion.return_value = 'summary'
+
+        first = generate_cached_completion(self.config, TEMPLATE.format(date='2024-05-01', suffix=''), provider)
+        second = generate_cached_completion(self.config, TEMPLATE.format(date='2024-05-01', suffix='!'), provider)
+
+        self.assertEqual(first, ('summary', None))
+        self.assertEqual(second, ('summary', 1.0))
+        provider.generate_completion.assert_called_once()
+
+    def test_cache_is_opt_in(self):
+        provider = MagicMock()
+        provider.generate_completion.return_value = 'summary'
+        self.config.parameters = {}
+        for _ in range(2):
+            self.assertEqual(generate_cached_completion(self.config, 'Hello', provider), ('summary', None))
+        self.assertEqual(provider.generate_completion.call_count, 2)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from InnoFlow.ai_integration.models import NodePort
+from InnoFlow.ai_integration.node_port_inntegration import (
+    create_ports_for_node, update_workflow_ports, update_all_workflow_ports
+)
+from workflows.models import Workflow, Node
+
+User = get_user_model()
+
+
+class NodePortSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='portuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Port Workflow', user=self.user)
+        self.nodes = [
+            Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'x'}, order=i)
+            for i in range(3)
+        ]
+        self.unregistered = Node.objects.create(
+            workflow=self.workflow, type='openai_tts', config={'voice': 'en'}, order=3
+        )
+
+    def test_update_workflow_ports_reconciles_in_bulk(self):
+        first, second, third = self.nodes
+        kept = NodePort.objects.create(node=first, name='output', port_type='output', data_type='string')
+        NodePort.objects.create(node=first, name='legacy', port_type='input')
+        outdated = NodePort.objects.create(node=second, name='output', port_type='output', data_type='any')
+        custom = NodePort.objects.create(node=self.unregistered, name='input', port_type='input')
+
+        # workflow, nodes, ports, then one delete, update and insert
+        with self.assertNumQueries(6):
+            result = update_workflow_ports(self.workflow.id)
+
+        self.assertEqual(result['total_nodes'], 4)
+        self.assertEqual(result['node_results'][first.id], 1)
+        self.assertIn('Unknown node type', result['node_results'][self.unregistered.id])
+        self.assertEqual(
+            sorted(NodePort.objects.values_list('node_id', 'name', 'data_type')),
+            sorted([(first.id, 'output', 'string'), (second.id, 'output', 'string'),
+                    (third.id, 'output', 'string'), (self.unregistered.id, 'input', 'any')])
+        )
+        # Matching ports are updated in place, never recreated
+        self.assertEqual(NodePort.objects.filter(id__in=[kept.id, outdated.id, custom.id]).count(), 3)
+
+    def test_update_all_workflow_ports_is_idempotent(self):
+        self.assertEqual(update_all_workflow_ports(batch_size=2), {'total_nodes': 4, 'failed_nodes': 1})
+        ports = list(NodePort.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(len(ports), 3)
+
+        with self.assertNumQueries(5):
+            update_all_workflow_ports(batch_size=2)
+        self.assertEqual(list(NodePort.objects.order_by('id').values_list('id', flat=True)), ports)
+
+    def test_create_ports_for_node(self):
+        ports = create_ports_for_node(self.nodes[0])
+        self.assertEqual([(p.name, p.port_type) for p in ports], [('output', 'output')])
+        with self.assertRaises(ValueError):
+            create_ports_for_node(self.unregistered)
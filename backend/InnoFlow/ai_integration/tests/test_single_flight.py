@@ -0,0 +1,95 @@
+import threading
+from unittest.mock import MagicMock
+from django.core.cache import cache
+from django.test import TestCase
+from InnoFlow.ai_integration.completion import generate_completion
+from InnoFlow.ai_integration.models import AIModelConfig
+from InnoFlow.ai_integration.single_flight import SingleFlight
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_concurrently(self, single_flight, key, fn, count=5):
+        results = [None] * count
+        threads = [
+            threading.Thread(target=lambda i=i: results.__setitem__(i, single_flight.do(key, fn)))
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_upstream_call(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def upstream():
+            calls.append(1)
+            release.wait(5)
+            return 'answer'
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        results = self.run_concurrently(single_flight, 'key', upstream)
+
+        self.assertEqual(results, ['answer'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.stats['leader'], 1)
+        self.assertEqual(single_flight.stats['local'], 4)
+
+    def test_calls_after_the_flight_go_upstream_again(self):
+        single_flight = SingleFlight()
+        upstream = MagicMock(side_effect=['first', 'second'])
+        self.assertEqual(single_flight.do('key', upstream), 'first')
+        self.assertEqual(single_flight.do('key', upstream), 'second')
+
+    def test_errors_are_shared_and_not_cached(self):
+        single_flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            single_flight.do('key', MagicMock(side_effect=ValueError('provider down')))
+        self.assertEqual(single_flight.do('key', lambda: 'recovered'), 'recovered')
+
+    def test_other_processes_wait_for_the_cache_lock_holder(self):
+        # Two instances stand in for two worker processes sharing the cache
+        leader, follower = SingleFlight(poll_interval=0.01), SingleFlight(poll_interval=0.01)
+        started, release = threading.Event(), threading.Event()
+        follower_upstream = MagicMock(return_value='own call')
+
+        def upstream():
+            started.set()
+            release.wait(5)
+            return 'shared'
+
+        thread = threading.Thread(target=leader.do, args=('key', upstream))
+        thread.start()
+        started.wait(5)
+        threading.Timer(0.1, release.set).start()
+
+        self.assertEqual(follower.do('key', follower_upstream), 'shared')
+        thread.join()
+        follower_upstream.assert_not_called()
+        self.assertEqual(follower.stats['remote'], 1)
+
+
+class CompletionSingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = AIModelConfig.objects.create(
+            name='Mock', provider='OPENAI', model_name='gpt-4', api_key='test-key', model_type='chat'
+        )
+
+    def test_opted_out_configs_call_the_provider_directly(self):
+        provider = MagicMock()
+        provider.generate_completion.return_value = 'sampled'
+        self.config.parameters = {'single_flight': False}
+
+        self.assertEqual(generate_completion(self.config, 'Hello', provider), 'sampled')
+        provider.generate_completion.assert_called_once_with('Hello')
+
+    def test_mock_configs_complete_through_single_flight(self):
+        self.assertTrue(generate_completion(self.config, 'Hello'))
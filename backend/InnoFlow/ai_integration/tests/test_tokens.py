@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.test import TestCase
+from InnoFlow.ai_integration.completion import generate_completion
+from InnoFlow.ai_integration.models import AIModelConfig, ModelComparison, ModelResponse
+from InnoFlow.ai_integration.tasks import run_ai_model_task
+from InnoFlow.ai_integration.tokens import (
+    PromptTooLongError, count_tokens, get_context_window, get_tokenizer, preflight, resolve_context_window,
+    trim_to_tokens
+)
+
+
+class WordTokenizer:
+    """Stands in for a model's own tokenizer, whose counts are exact"""
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+
+class TokenAccountingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = AIModelConfig.objects.create(
+            name='Small', provider='OLLAMA', model_name='llama3:8b', api_key='test-key', model_type='chat',
+            parameters={'context_window': 64, 'max_tokens': 16}
+        )
+
+    def test_tokenizers_are_cached_per_family_and_model(self):
+        other = AIModelConfig(provider='DEEPSEEK', model_name='deepseek-chat')
+        self.assertIs(get_tokenizer(self.config), get_tokenizer(other))
+        self.assertEqual(count_tokens(self.config, 'Hello, world'), 3)
+        text = 'one two three four five'
+        self.assertEqual(trim_to_tokens(self.config, text, 2), 'one two')
+        self.assertEqual(trim_to_tokens(self.config, text, 10), text)
+
+    def test_context_windows(self):
+        self.assertEqual(get_context_window(self.config), 64)
+        self.assertEqual(get_context_window(AIModelConfig(model_name='gpt-4o-mini')), 128000)
+        self.assertEqual(get_context_window(AIModelConfig(model_name='gpt-4-0613')), 8192)
+        with self.settings(AI_MODEL_CONTEXT_WINDOWS={'gpt-4-0613': 1000}):
+            self.assertEqual(get_context_window(AIModelConfig(model_name='gpt-4-0613')), 1000)
+
+    def test_only_known_windows_are_trusted(self):
+        windows = {
+            name: resolve_context_window(AIModelConfig(model_name=name))
+            for name in ['llama3:8b', 'llama3.1:70b', 'llama3.3', 'llama3.2-vision', 'gpt-4o-mini', 'mystery']
+        }
+        self.assertEqual(windows, {
+            'llama3:8b': (8192, True),
+            'llama3.1:70b': (131072, True),
+            'llama3.3': (131072, True),
+            'llama3.2-vision': (131072, False),
+            'gpt-4o-mini': (128000, False),
+            'mystery': (4096, False),
+        })
+        self.assertEqual(resolve_context_window(self.config), (64, True))
+
+    def test_estimated_counts_only_warn(self):
+        provider = MagicMock()
+        provider.generate_completion.return_value = 'ok'
+        with self.assertLogs('InnoFlow.ai_integration.tokens', 'WARNING'):
+            generate_completion(self.config, ' '.join(['word'] * 60), provider)
+        provider.generate_completion.assert_called_once()
+
+    @patch('InnoFlow.ai_integration.tokens.get_tokenizer', return_value=WordTokenizer())
+    def test_oversized_prompts_fail_before_the_provider_call(self, _):
+        provider = MagicMock()
+        prompt = ' '.join(['word'] * 60)
+        with self.assertRaises(PromptTooLongError) as raised:
+            generate_completion(self.config, prompt, provider)
+        self.assertEqual((raised.exception.prompt_tokens, raised.exception.context_window), (60, 64))
+        provider.generate_completion.assert_not_called()
+
+        # A smaller completion budget makes room for the prompt
+        provider.generate_completion.return_value = 'ok then'
+        usage = {}
+        self.assertEqual(generate_completion(self.config, prompt, provider, usage=usage, max_tokens=4), 'ok then')
+        self.assertEqual(usage, {'prompt_tokens': 60, 'completion_tokens': 2})
+
+    def test_truncation_is_opt_in(self):
+        self.config.parameters['prompt_overflow'] = 'truncate'
+        prompt, tokens = preflight(self.config, ' '.join(['word'] * 60))
+        self.assertEqual(tokens, 48)
+        self.assertEqual(count_tokens(self.config, prompt), 48)
+
+    @patch('InnoFlow.ai_integration.tokens.get_tokenizer', return_value=WordTokenizer())
+    def test_comparison_records_prompts_that_do_not_fit(self, _):
+        comparison = ModelComparison.objects.create(prompt='long')
+        run_ai_model_task(self.config.id, ' '.join(['word'] * 60), comparison.id)
+        response = ModelResponse.objects.get(comparison=comparison)
+        self.assertEqual((response.response, response.prompt_tokens), ('', 60))
+        self.assertIn('exceeds the context window of 64 tokens', response.error)
+
+    def test_comparison_responses_record_token_usage(self):
+        comparison = ModelComparison.objects.create(prompt='Say hello')
+        run_ai_model_task(self.config.id, 'Say hello', comparison.id)
+        response = ModelResponse.objects.get(comparison=comparison)
+        self.assertEqual(response.prompt_tokens, 2)
+        self.assertEqual(response.completion_tokens, count_tokens(self.config, response.response))
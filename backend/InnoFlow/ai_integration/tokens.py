@@ -0,0 +1,226 @@
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .models import AIModelConfig
+
+try:
+    import tiktoken
+except ImportError:  # Optional: token counts of OpenAI models are then estimated
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Context windows by model name prefix; the longest matching prefix wins.
+# AI_MODEL_CONTEXT_WINDOWS adds to or overrides these, and a model config
+# can set its own with parameters = {"context_window": ...}. Only windows
+# from a config, the setting, or an exact entry here (Ollama tags aside) are
+# trusted enough to reject prompts; prefix matches are guesses.
+CONTEXT_WINDOWS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4.1': 1047576,
+    'o1': 200000,
+    'o3': 200000,
+    'o4': 200000,
+    'claude': 200000,
+    'gemini': 32768,
+    'gemini-1.5': 1048576,
+    'gemini-2': 1048576,
+    'deepseek': 65536,
+    'llama3': 8192,
+    'llama-3': 8192,
+    'llama3.1': 131072,
+    'llama-3.1': 131072,
+    'llama3.2': 131072,
+    'llama-3.2': 131072,
+    'llama3.3': 131072,
+    'llama-3.3': 131072,
+    'mistral': 32768,
+}
+
+
+class PromptTooLongError(ValueError):
+    """A prompt and the completion it asks for do not fit the model's context window"""
+    def __init__(self, prompt_tokens: int, completion_tokens: int, context_window: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.context_window = context_window
+        super().__init__(
+            f"Prompt of {prompt_tokens} tokens plus {completion_tokens} completion tokens "
+            f"exceeds the context window of {context_window} tokens"
+        )
+
+
+class EstimatingTokenizer:
+    """
+    Approximate tokens for models without a local tokenizer: punctuation
+    marks and words of up to six characters count as one token, longer
+    words as one per six characters; lossless
+    """
+    pattern = re.compile(r'\s*(?:\w{1,6}|[^\w\s])|\s+')
+
+    def encode(self, text: str) -> List[str]:
+        return self.pattern.findall(text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return ''.join(tokens)
+
+
+class TiktokenTokenizer:
+    """Tokens of the tiktoken encoding of an OpenAI model"""
+    def __init__(self, model_name: str):
+        try:
+            self.encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            newer = model_name.startswith(('gpt-4o', 'gpt-4.1', 'o1', 'o3', 'o4'))
+            self.encoding = tiktoken.get_encoding('o200k_base' if newer else 'cl100k_base')
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.encoding.decode(tokens)
+
+
+class HuggingFaceTokenizer:
+    """Tokens of a Hugging Face model's own tokenizer"""
+    def __init__(self, model_name: str):
+        from transformers import AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.tokenizer.decode(tokens)
+
+
+def get_tokenizer_family(model_config: AIModelConfig) -> str:
+    provider = (model_config.provider or '').upper()
+    if provider == 'OPENAI' and tiktoken is not None:
+        return 'tiktoken'
+    if provider == 'HUGGINGFACE':
+        return 'huggingface'
+    return 'estimate'
+
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(model_config: AIModelConfig):
+    """Process-wide tokenizer of a model config, loaded once per provider family and model"""
+    family = get_tokenizer_family(model_config)
+    key = (family, model_config.model_name if family != 'estimate' else None)
+    tokenizer = _tokenizers.get(key)
+    if tokenizer is None:
+        with _tokenizers_lock:
+            tokenizer = _tokenizers.get(key)
+            if tokenizer is None:
+                try:
+                    if family == 'tiktoken':
+                        tokenizer = TiktokenTokenizer(model_config.model_name)
+                    elif family == 'huggingface':
+                        tokenizer = HuggingFaceTokenizer(model_config.model_name)
+                    else:
+                        tokenizer = EstimatingTokenizer()
+                except Exception as e:
+                    logger.warning(f"No {family} tokenizer for {model_config.model_name}, estimating tokens: {str(e)}")
+                    tokenizer = EstimatingTokenizer()
+                _tokenizers[key] = tokenizer
+    return tokenizer
+
+
+def count_tokens(model_config: AIModelConfig, text: str) -> int:
+    return len(get_tokenizer(model_config).encode(text or ''))
+
+
+def trim_to_tokens(model_config: AIModelConfig, text: str, max_tokens: int) -> str:
+    """The longest start of ``text`` of at most ``max_tokens`` tokens"""
+    tokenizer = get_tokenizer(model_config)
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return tokenizer.decode(tokens[:max(max_tokens, 0)])
+
+
+def resolve_context_window(model_config: AIModelConfig) -> Tuple[int, bool]:
+    """
+    Context window of a model, and whether it is known rather than guessed
+    from a name prefix or AI_DEFAULT_CONTEXT_WINDOW
+    """
+    parameters = model_config.parameters or {}
+    if parameters.get('context_window'):
+        return int(parameters['context_window']), True
+    configured = getattr(settings, 'AI_MODEL_CONTEXT_WINDOWS', {})
+    windows = {**CONTEXT_WINDOWS, **configured}
+    name = (model_config.model_name or '').lower()
+    # Ollama tags ("llama3.1:8b") pick a size or quantization of the same model
+    names = {name, name.split(':', 1)[0]}
+    matches = [prefix for prefix in windows if name.startswith(prefix.lower())]
+    if matches:
+        prefix = max(matches, key=len)
+        return windows[prefix], prefix in configured or prefix.lower() in names
+    return getattr(settings, 'AI_DEFAULT_CONTEXT_WINDOW', 4096), False
+
+
+def get_context_window(model_config: AIModelConfig) -> int:
+    return resolve_context_window(model_config)[0]
+
+
+def get_completion_budget(model_config: AIModelConfig, kwargs: Dict = None) -> int:
+    """Tokens reserved for the completion: max_tokens of the call or the config"""
+    parameters = model_config.parameters or {}
+    max_tokens = (kwargs or {}).get('max_tokens') or parameters.get('max_tokens')
+    return int(max_tokens or getattr(settings, 'AI_DEFAULT_COMPLETION_TOKENS', 512))
+
+
+def get_prompt_budget(model_config: AIModelConfig, kwargs: Dict = None) -> int:
+    """Tokens a prompt may use so that the completion still fits the context window"""
+    return get_context_window(model_config) - get_completion_budget(model_config, kwargs)
+
+
+def preflight(model_config: AIModelConfig, prompt: str, kwargs: Dict = None):
+    """
+    Check a prompt against the model's context window before calling the provider
+
+    Prompts that do not fit raise PromptTooLongError, unless the config sets
+    ``parameters = {"prompt_overflow": "truncate"}`` to keep their start.
+    When the window is guessed or the tokens are estimated, oversized
+    prompts are only logged and sent as they are.
+
+    Returns:
+        (prompt to send, its token count)
+    """
+    tokenizer = get_tokenizer(model_config)
+    tokens = tokenizer.encode(prompt or '')
+    context_window, known = resolve_context_window(model_config)
+    completion_tokens = get_completion_budget(model_config, kwargs)
+    budget = context_window - completion_tokens
+    if len(tokens) <= budget:
+        return prompt, len(tokens)
+    if (model_config.parameters or {}).get('prompt_overflow') != 'truncate' or budget <= 0:
+        if known and not isinstance(tokenizer, EstimatingTokenizer):
+            raise PromptTooLongError(len(tokens), completion_tokens, context_window)
+        logger.warning(
+            f"Prompt of about {len(tokens)} tokens plus {completion_tokens} completion tokens may not fit "
+            f"the context window of {model_config} (assumed {context_window} tokens), sending it anyway"
+        )
+        return prompt, len(tokens)
+    logger.warning(f"Truncating a prompt of {len(tokens)} tokens to {budget} for {model_config}")
+    return tokenizer.decode(tokens[:budget]), budget
+
+
+def record_usage(usage: Optional[Dict], model_config: AIModelConfig, prompt_tokens: int, response) -> None:
+    """Fill a caller's usage dict with the prompt and completion tokens of a call"""
+    if usage is None:
+        return
+    usage['prompt_tokens'] = prompt_tokens
+    usage['completion_tokens'] = count_tokens(model_config, response) if isinstance(response, str) else 0
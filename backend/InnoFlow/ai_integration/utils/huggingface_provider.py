@@ -1,7 +1,14 @@
+import threading
+import numpy as np
 from transformers import pipeline
 from ..ai_providers import AIProvider
 
 class HuggingFaceProvider(AIProvider):
+    max_embedding_batch = 32
+    # Feature-extraction pipelines are loaded once per model
+    _extractors = {}
+    _extractors_lock = threading.Lock()
+
     def __init__(self, model_name: str, api_key: str = None):
         self.model_name = model_name
         self.api_key = api_key  # Optional for HuggingFace Hub models
@@ -19,4 +26,19 @@ class HuggingFaceProvider(AIProvider):
             return result[0]["generated_text"]
         except Exception as e:
             print(f"HuggingFace Error: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def get_extractor(self):
+        if self.model_name not in self._extractors:
+            with self._extractors_lock:
+                if self.model_name not in self._extractors:
+                    if self.api_key:
+                        import os
+                        os.environ["HUGGINGFACE_HUB_TOKEN"] = self.api_key
+                    self._extractors[self.model_name] = pipeline("feature-extraction", model=self.model_name)
+        return self._extractors[self.model_name]
+
+    def embed(self, texts, **kwargs):
+        # Mean of the token vectors of each text
+        outputs = self.get_extractor()(list(texts), truncation=True, **kwargs)
+        return [np.asarray(output[0], dtype=np.float32).mean(axis=0).tolist() for output in outputs]
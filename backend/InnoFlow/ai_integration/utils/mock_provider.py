@@ -1,5 +1,8 @@
 import time
 import random
+import re
+import hashlib
+import math
 from ..ai_providers import AIProvider
 
 class MockProvider(AIProvider):
@@ -7,6 +10,8 @@ class MockProvider(AIProvider):
     Mock AI provider for demos and testing.
     Returns realistic-looking responses based on prompt patterns.
     """
+    max_embedding_batch = 64
+    embedding_dim = 64
     
     def __init__(self, api_key: str = "mock-key", model_name: str = "mock-model"):
         self.api_key = api_key
@@ -231,4 +236,19 @@ Based on your prompt, I recommend implementing a workflow that combines multiple
         
         # Return random response from the detected category
         responses = self.responses.get(response_type, self.responses['greeting'])
-        return random.choice(responses) 
\ No newline at end of file
+        return random.choice(responses) 
+
+    def embed(self, texts, **kwargs):
+        """
+        Deterministic bag-of-words vectors: texts sharing words get similar
+        embeddings, so mock retrieval still ranks sensibly
+        """
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.embedding_dim
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                vector[digest[0] % self.embedding_dim] += 1.0 if digest[1] % 2 else -1.0
+            norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+            vectors.append([value / norm for value in vector])
+        return vectors
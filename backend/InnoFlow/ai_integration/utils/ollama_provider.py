@@ -2,6 +2,8 @@ import requests
 from ..ai_providers import AIProvider
 
 class OllamaProvider(AIProvider):
+    max_embedding_batch = 256
+
     def __init__(self, base_url: str, model_name: str):
         self.base_url = base_url
         self.model_name = model_name
@@ -20,4 +22,16 @@ class OllamaProvider(AIProvider):
             return response.json().get("response")
         except Exception as e:
             print(f"Ollama Error: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def embed(self, texts, **kwargs):
+        response = requests.post(
+            f"{self.base_url}/api/embed",
+            json={
+                "model": self.model_name,
+                "input": list(texts),
+                **kwargs
+            }
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]
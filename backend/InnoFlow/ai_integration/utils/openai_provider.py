@@ -3,6 +3,8 @@ from django.conf import settings
 from ..ai_providers import AIProvider
 
 class OpenAIProvider(AIProvider):
+    max_embedding_batch = 2048
+
     def __init__(self, api_key: str, model_name: str):
         self.api_key = api_key
         self.model_name = model_name
@@ -18,4 +20,9 @@ class OpenAIProvider(AIProvider):
             return response.choices[0].message.content
         except Exception as e:
             print(f"OpenAI Error: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def embed(self, texts, **kwargs):
+        client = OpenAI(api_key=self.api_key)
+        response = client.embeddings.create(model=self.model_name, input=list(texts), **kwargs)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
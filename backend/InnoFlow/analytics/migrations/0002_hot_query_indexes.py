@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('workflows', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workflowanalytics',
+            index=models.Index(fields=['workflow', '-executed_at'], name='analytics_workflow_executed'),
+        ),
+    ]
@@ -9,6 +9,11 @@ class WorkflowAnalytics(models.Model):
     error_count = models.IntegerField(default=0)
     executed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['workflow', '-executed_at'], name='analytics_workflow_executed'),
+        ]
+
 class UserActivityLog(models.Model):
     user = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
     activity_type = models.CharField(max_length=50)
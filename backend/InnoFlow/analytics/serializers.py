@@ -1,8 +1,9 @@
 # analytics/serializers.py
 from rest_framework import serializers
+from workflows.serializers import SparseFieldsetMixin
 from .models import WorkflowAnalytics, PerformanceMetrics, WorkflowUsageStats, UserActivityLog
 
-class WorkflowAnalyticsSerializer(serializers.ModelSerializer):
+class WorkflowAnalyticsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = WorkflowAnalytics
         fields = '__all__'
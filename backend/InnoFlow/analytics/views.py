@@ -5,15 +5,24 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny  # Temporarily allow all for development
 from django.db.models import Avg, Sum
 from .models import WorkflowAnalytics, UserActivityLog, PerformanceMetrics, WorkflowUsageStats
+from rest_framework.renderers import BrowsableAPIRenderer
+from InnoFlow.pagination import AnalyticsCursorPagination
+from workflows.fast_serializers import FastListModelMixin
+from workflows.renderers import FastJSONRenderer
 from .serializers import WorkflowAnalyticsSerializer
 from .services import AnalyticsService
 
 # Create your views here.
 
-class AnalyticsViewSet(viewsets.ModelViewSet):
+class AnalyticsViewSet(FastListModelMixin, viewsets.ModelViewSet):
     queryset = WorkflowAnalytics.objects.all()
     serializer_class = WorkflowAnalyticsSerializer
     permission_classes = [AllowAny]  # Temporarily allow unauthenticated access for development
+    pagination_class = AnalyticsCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_queryset(self):
+        return self.serializer_class.prepare_queryset(self.queryset.all(), self.request, self)
 
     @action(detail=False, methods=['get'])
     def workflow_performance(self, request):
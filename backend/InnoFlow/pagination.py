@@ -0,0 +1,25 @@
+# InnoFlow/pagination.py
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class TimestampCursorPagination(CursorPagination):
+    """
+    Keyset pagination on a creation timestamp, newest first.
+
+    The primary key breaks ties between rows created in the same instant.
+    Unlike offset pagination, every page costs the same index range scan no
+    matter how far the client has scrolled.
+    """
+    page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+    ordering = ('-created_at', '-id')
+
+
+class ExecutionCursorPagination(TimestampCursorPagination):
+    ordering = ('-started_at', '-id')
+
+
+class AnalyticsCursorPagination(TimestampCursorPagination):
+    ordering = ('-executed_at', '-id')
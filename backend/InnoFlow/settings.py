@@ -165,6 +165,10 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Cursor pagination of list endpoints (InnoFlow.pagination)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': datetime.timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(days=1),
@@ -228,9 +232,96 @@ CELERY_TASK_EAGER_PROPAGATES = True
 
 CELERY_TASK_ROUTES = {
     'workflows.tasks.run_workflow': {'queue': 'workflow'},
+    'workflows.tasks.run_workflow_batch': {'queue': 'workflow'},
     'ai_integration.tasks.run_ai_model_task': {'queue': 'ai'},
 }
 
+# Workflow batch execution
+WORKFLOW_BATCH_CONCURRENCY = int(os.getenv('WORKFLOW_BATCH_CONCURRENCY', '4'))
+WORKFLOW_BATCH_MAX_CONCURRENCY = 16
+WORKFLOW_BATCH_NODE_SIZE = 32
+WORKFLOW_BATCH_STREAM_CHUNK_SIZE = 256
+
+# Execution progress events (Server-Sent Events)
+# The local broker only sees events published in the web process; point this
+# at a shared broker when Celery runs out of process
+WORKFLOW_EVENT_BROKER = 'workflows.events.LocalEventBroker'
+WORKFLOW_EVENT_KEEPALIVE = 15.0
+# Each open stream holds a WSGI worker thread; clients reconnect with
+# Last-Event-ID when a stream ends
+WORKFLOW_EVENT_STREAM_MAX_DURATION = 120
+WORKFLOW_EVENT_OUTPUT_PREVIEW = 500
+
+# Node outputs and error logs larger than this many bytes are compressed into
+# the result store and referenced from the execution row
+WORKFLOW_RESULT_STORE = 'workflows.result_store.DatabaseResultStore'
+WORKFLOW_RESULT_INLINE_LIMIT = 2048
+
+# Directories document_loader nodes may read from; relative paths in node
+# configs resolve against the first one. Text files are read in blocks of
+# WORKFLOW_DOCUMENT_BLOCK_SIZE characters
+WORKFLOW_DOCUMENT_ROOTS = [BASE_DIR / 'media' / 'documents']
+WORKFLOW_DOCUMENT_BLOCK_SIZE = 65536
+
+# Retrieval indexes (vector_store nodes) live under WORKFLOW_INDEX_ROOT and
+# are memory-mapped on open. With hnswlib installed, indexes of at least
+# WORKFLOW_VECTOR_HNSW_THRESHOLD vectors are searched approximately
+WORKFLOW_INDEX_ROOT = BASE_DIR / 'media' / 'indexes'
+WORKFLOW_VECTOR_BACKEND = 'auto'
+WORKFLOW_VECTOR_HNSW_THRESHOLD = 100000
+WORKFLOW_VECTOR_HNSW_EF = 64
+WORKFLOW_VECTOR_MAX_SEGMENTS = 8
+WORKFLOW_VECTOR_COMPACT_RATIO = 0.25
+WORKFLOW_VECTOR_SEARCH_BLOCK = 65536
+
+# BM25 keyword indexes (keyword_search nodes)
+WORKFLOW_BM25_K1 = 1.2
+WORKFLOW_BM25_B = 0.75
+WORKFLOW_KEYWORD_MAX_SEGMENTS = 8
+WORKFLOW_KEYWORD_COMPACT_RATIO = 0.25
+
+# Cross-encoder reranking in hybrid_retriever nodes: pairs are scored in
+# batches and their scores cached by (query, chunk) hash
+WORKFLOW_RERANK_CACHE = 'default'
+WORKFLOW_RERANK_CACHE_TTL = 86400
+WORKFLOW_RERANK_BATCH_SIZE = 32
+
+# embedding nodes cache vectors by content hash under
+# WORKFLOW_INDEX_ROOT/embeddings; new vectors are written to disk every
+# WORKFLOW_EMBEDDING_FLUSH_SIZE vectors and at the end of each node
+WORKFLOW_EMBEDDING_STREAM_BATCH_SIZE = 256
+WORKFLOW_EMBEDDING_FLUSH_SIZE = 4096
+
+# Compiled prompt templates kept per process
+WORKFLOW_TEMPLATE_CACHE_SIZE = 1024
+
+# Identical provider calls in flight at the same time share one upstream
+# call, across workers through the cache. Opt a model config out with
+# parameters = {"single_flight": false}
+AI_SINGLE_FLIGHT_ENABLED = True
+AI_SINGLE_FLIGHT_CACHE = 'default'
+AI_SINGLE_FLIGHT_TIMEOUT = 120.0
+AI_SINGLE_FLIGHT_RESULT_TTL = 5.0
+
+# Optional in-memory cache answering near-identical playground prompts
+# (MinHash/LSH similarity at or above the threshold). Enable per model config
+# with parameters = {"near_duplicate_cache": true}
+AI_NEAR_DUPLICATE_CACHE_ENABLED = False
+AI_NEAR_DUPLICATE_THRESHOLD = 0.9
+AI_NEAR_DUPLICATE_MAX_ENTRIES = 10000
+AI_NEAR_DUPLICATE_TTL = 3600
+# Mask dates, times and UUIDs when comparing prompts; prompts differing only
+# in them are then answered from the cache
+AI_NEAR_DUPLICATE_MASK_VOLATILE = False
+
+# Prompts are counted with the model's tokenizer before every provider call
+# and rejected when they and the completion (max_tokens of the call or
+# config, else AI_DEFAULT_COMPLETION_TOKENS) exceed the context window.
+# Windows of unknown models default to AI_DEFAULT_CONTEXT_WINDOW
+AI_MODEL_CONTEXT_WINDOWS = {}
+AI_DEFAULT_CONTEXT_WINDOW = 4096
+AI_DEFAULT_COMPLETION_TOKENS = 512
+
 # Frontend URL for password reset and email verification
 FRONTEND_URL = 'http://localhost:3000'  # Change this in production
 
@@ -255,6 +346,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files and generated artifacts (batch inputs and outputs)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
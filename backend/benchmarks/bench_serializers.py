@@ -0,0 +1,90 @@
+"""
+Microbenchmark of the list serialization paths.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serializers.py [rows] [repeat]
+
+Compares, on in-memory data so no database is needed:
+- ModelSerializer(many=True) + JSONRenderer (the generic DRF path)
+- ValuesSerializer over values()-style rows + FastJSONRenderer
+for executions and analytics records. DJANGO_SETTINGS_MODULE defaults to
+InnoFlow.settings.
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'InnoFlow.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from InnoFlow.analytics.models import WorkflowAnalytics  # noqa: E402
+from InnoFlow.analytics.serializers import WorkflowAnalyticsSerializer  # noqa: E402
+from workflows.fast_serializers import get_values_serializer  # noqa: E402
+from workflows.models import WorkflowExecution  # noqa: E402
+from workflows.renderers import FastJSONRenderer  # noqa: E402
+from workflows.serializers import WorkflowExecutionSerializer  # noqa: E402
+
+
+def make_executions(count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        WorkflowExecution(
+            id=i, workflow_id=i % 50 + 1, started_at=now, completed_at=now, status='completed',
+            results={str(n): f"output of node {n}" for n in range(5)}, error_logs=None
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_analytics(count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        WorkflowAnalytics(
+            id=i, workflow_id=i % 50 + 1, execution_time=1.5, success_rate=0.9,
+            error_count=i % 3, executed_at=now
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def as_values_rows(instances, columns):
+    return [{column: getattr(instance, column) for column in columns} for instance in instances]
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare(label, serializer_class, instances, repeat):
+    values_serializer = get_values_serializer(serializer_class)
+    mapping = values_serializer.get_mapping()
+    rows = as_values_rows(instances, values_serializer.get_columns(mapping))
+    json_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+
+    drf = best_of(repeat, lambda: json_renderer.render(serializer_class(instances, many=True).data))
+    fast = best_of(repeat, lambda: fast_renderer.render(values_serializer.render(rows, mapping)))
+    print(f"{label:<12} {len(instances):>7} {drf:>10.4f} {fast:>10.4f} {drf / fast:>8.1f}x")
+
+
+def run(rows=10000, repeat=5):
+    print(f"{'endpoint':<12} {'rows':>7} {'drf (s)':>10} {'fast (s)':>10} {'speedup':>9}")
+    compare('executions', WorkflowExecutionSerializer, make_executions(rows), repeat)
+    compare('analytics', WorkflowAnalyticsSerializer, make_analytics(rows), repeat)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,64 @@
+"""
+Benchmark workflow structure validation on large generated graphs.
+
+Usage (from the backend directory):
+    python benchmarks/bench_validation.py [max_nodes] [edges_per_node]
+
+Builds wide random DAGs of growing size and times
+workflows.node_types.validate_workflow_structure. Time per element should
+stay roughly flat as the graph grows.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workflows.node_types import validate_workflow_structure  # noqa: E402
+
+
+def generate_graph(node_count, edges_per_node=5, seed=0):
+    """Random DAG: every connection points from a lower to a higher node id"""
+    rng = random.Random(seed)
+    nodes = [{'id': 0, 'type': 'text_input', 'config': {'text': 'start'}}]
+    nodes += [
+        {'id': i, 'type': 'text_transformation', 'config': {'operation': 'trim'}}
+        for i in range(1, node_count)
+    ]
+    connections = []
+    for _ in range(node_count * edges_per_node):
+        target = rng.randrange(1, node_count)
+        source = rng.randrange(0, target)
+        connections.append({
+            'source_node': source,
+            'target_node': target,
+            'source_port': 'output',
+            'target_port': 'input',
+        })
+    return nodes, connections
+
+
+def run(max_nodes=10000, edges_per_node=5, repeat=3):
+    sizes = []
+    size = max_nodes
+    while size >= 1000:
+        sizes.append(size)
+        size //= 2
+    print(f"{'nodes':>8} {'connections':>12} {'seconds':>9} {'us/element':>11}")
+    for size in reversed(sizes):
+        nodes, connections = generate_graph(size, edges_per_node)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            errors = validate_workflow_structure(nodes, connections)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        assert not errors, errors[:5]
+        per_element = best / (len(nodes) + len(connections)) * 1e6
+        print(f"{len(nodes):>8} {len(connections):>12} {best:>9.4f} {per_element:>11.2f}")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,446 @@
+# workflows/batch.py
+import codecs
+import csv
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .execution import WorkflowExecutor
+from .models import Workflow, WorkflowBatch, WorkflowExecution, NodeExecutionResult
+from .plan import ExecutionPlan
+from .retry import NodeRetryScheduled
+from .result_store import load_node_results, load_output_rows, offload_execution_output, offload_node_results
+from .streams import restore_stream, to_storable
+from .utils import BATCH_NODE_TYPES, execute_node_batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_CONCURRENCY = getattr(settings, 'WORKFLOW_BATCH_CONCURRENCY', 4)
+MAX_BATCH_CONCURRENCY = getattr(settings, 'WORKFLOW_BATCH_MAX_CONCURRENCY', 16)
+# Number of rows handed to a batch-capable node in a single call
+NODE_BATCH_SIZE = getattr(settings, 'WORKFLOW_BATCH_NODE_SIZE', 32)
+# Number of rows a streaming batch holds in memory at a time
+STREAM_CHUNK_SIZE = getattr(settings, 'WORKFLOW_BATCH_STREAM_CHUNK_SIZE', 256)
+
+
+def iter_batch_rows(lines: Iterable[str], file_format: str) -> Iterator[Dict]:
+    """
+    Lazily parse variable sets from JSONL or CSV lines
+
+    Args:
+        lines: Iterable of text lines
+        file_format: 'jsonl' or 'csv'
+
+    Yields:
+        One dictionary of workflow variables per row
+    """
+    if file_format == 'csv':
+        for row in csv.DictReader(lines):
+            yield dict(row)
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number} must be a JSON object")
+            yield row
+    else:
+        raise ValueError(f"Unsupported batch input format: {file_format}")
+
+
+def get_upload_format(uploaded_file) -> str:
+    name = os.path.basename(uploaded_file.name).lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    raise ValueError("Batch input file must be a .jsonl or .csv file")
+
+
+def iter_uploaded_rows(uploaded_file) -> Iterator[Dict]:
+    """Lazily parse the rows of an uploaded JSONL or CSV file"""
+    file_format = get_upload_format(uploaded_file)
+    return iter_batch_rows(codecs.iterdecode(uploaded_file, 'utf-8'), file_format)
+
+
+def create_batch(workflow: Workflow, rows: List[Dict], concurrency: int = None) -> WorkflowBatch:
+    """Create a batch and one pending execution per row of variables"""
+    concurrency = min(max(int(concurrency or DEFAULT_BATCH_CONCURRENCY), 1), MAX_BATCH_CONCURRENCY)
+    with transaction.atomic():
+        batch = WorkflowBatch.objects.create(
+            workflow=workflow,
+            concurrency=concurrency,
+            total_rows=len(rows)
+        )
+        WorkflowExecution.objects.bulk_create(
+            [
+                WorkflowExecution(workflow=workflow, batch=batch, status='pending', variables=row)
+                for row in rows
+            ],
+            batch_size=500
+        )
+    return batch
+
+
+def create_streaming_batch(workflow: Workflow, uploaded_file, concurrency: int = None) -> WorkflowBatch:
+    """Create a streaming batch whose rows are read from the uploaded file at run time"""
+    get_upload_format(uploaded_file)
+    concurrency = min(max(int(concurrency or DEFAULT_BATCH_CONCURRENCY), 1), MAX_BATCH_CONCURRENCY)
+    batch = WorkflowBatch(workflow=workflow, concurrency=concurrency, streaming=True)
+    # FileField.save writes the upload to storage chunk by chunk
+    batch.input_file.save(os.path.basename(uploaded_file.name), uploaded_file, save=False)
+    batch.save()
+    return batch
+
+
+def iter_batch_output(batch: WorkflowBatch) -> Iterator[str]:
+    """
+    Lazily yield the JSONL output of a batch, one line per row
+
+    Streaming batches replay their output parts; other batches are read
+    from their execution records in chunks.
+    """
+    if batch.output_parts:
+        storage = batch.output_file.storage
+        for name in batch.output_parts:
+            with storage.open(name, 'rb') as output:
+                yield from codecs.iterdecode(output, 'utf-8')
+        return
+    if batch.output_file:
+        with batch.output_file.open('rb') as output:
+            for line in codecs.iterdecode(output, 'utf-8'):
+                yield line
+        return
+
+    rows = batch.executions.order_by('id').values(
+        'id', 'status', 'variables', 'results', 'error_logs'
+    ).iterator(chunk_size=500)
+    # Stored outputs are loaded one chunk of rows at a time
+    chunks = iter(lambda: load_output_rows(list(itertools.islice(rows, 500))), [])
+    executions = (execution for chunk in chunks for execution in chunk)
+    for row_number, execution in enumerate(executions):
+        yield json.dumps({
+            'row': row_number,
+            'execution_id': execution['id'],
+            'status': execution['status'],
+            'variables': execution['variables'],
+            'results': execution['results'],
+            'error': execution['error_logs'],
+        }, default=str) + '\n'
+
+
+class BatchRunner:
+    """
+    Run a workflow over every pending execution of a batch.
+
+    The workflow is compiled once and executed node by node across all rows:
+    batch-capable nodes receive whole slices of rows in a single call, other
+    nodes run row by row on a bounded thread pool. Rows that fail are dropped
+    from the remaining nodes without affecting the others.
+    """
+    def __init__(self, batch: WorkflowBatch, plan: ExecutionPlan = None):
+        self.batch = batch
+        self.plan = plan or ExecutionPlan.for_workflow(batch.workflow)
+        self.concurrency = batch.concurrency or DEFAULT_BATCH_CONCURRENCY
+        self.sleep = time.sleep
+
+    def create_executor(self, execution: WorkflowExecution, persist: bool = True) -> WorkflowExecutor:
+        # Rows hand their backoff delays back to the runner instead of sleeping in a pool thread
+        return WorkflowExecutor(execution, defer_retries=True, plan=self.plan, persist=persist)
+
+    def load_checkpoints(self, executions) -> Dict:
+        """Completed node results of the batch still matching the plan, keyed by execution id"""
+        checkpoints = {execution.id: {} for execution in executions}
+        fingerprints = {
+            WorkflowExecutor.checkpoint_key(node): self.plan.fingerprints[node.id] for node in self.plan.nodes
+        }
+        rows = NodeExecutionResult.objects.filter(
+            execution__batch=self.batch,
+            status='completed'
+        ).values_list('execution_id', 'node_key', 'fingerprint', 'result')
+        rows = [
+            (execution_id, node_key, result) for execution_id, node_key, fingerprint, result in rows
+            if execution_id in checkpoints and fingerprints.get(node_key) == fingerprint
+        ]
+        results = load_node_results([(execution_id, result) for execution_id, _, result in rows])
+        for (execution_id, node_key, _), result in zip(rows, results):
+            checkpoints[execution_id][node_key] = restore_stream(result)
+        return checkpoints
+
+    def _execute_row(self, executor: WorkflowExecutor, node, input_data):
+        try:
+            return executor.execute_node(node, input_data)
+        except Exception as e:
+            return e
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+    def _execute_rows(self, pool, node, executors, inputs) -> List:
+        if pool is None or len(executors) == 1:
+            return [self._execute_row(ex, node, data) for ex, data in zip(executors, inputs)]
+        return list(pool.map(
+            lambda row: self._execute_row(row[0], node, row[1]),
+            zip(executors, inputs)
+        ))
+
+    def _execute_batched(self, pool, node, executors, inputs) -> List:
+        outputs = []
+        for start in range(0, len(inputs), NODE_BATCH_SIZE):
+            chunk_executors = executors[start:start + NODE_BATCH_SIZE]
+            chunk_inputs = inputs[start:start + NODE_BATCH_SIZE]
+            try:
+                outputs.extend(execute_node_batch(node, chunk_inputs))
+            except Exception as e:
+                # Fall back to per-row execution, which applies the node's retry policy
+                logger.warning(f"Batch call of node {node.id} failed, retrying rows one by one: {e}")
+                outputs.extend(self._execute_rows(pool, node, chunk_executors, chunk_inputs))
+        return outputs
+
+    def _retry_rows(self, pool, node, executors, inputs, outputs) -> List:
+        """
+        Re-run the rows that scheduled a retry of the node once their backoff
+        delay is over, until each one completes or fails for good
+
+        Only the runner waits for a delay; pool threads are never held by one.
+        """
+        outputs = list(outputs)
+        now = time.monotonic()
+        scheduled = {
+            index: now + output.countdown
+            for index, output in enumerate(outputs) if isinstance(output, NodeRetryScheduled)
+        }
+        while scheduled:
+            next_retry = min(scheduled.values())
+            wait = next_retry - time.monotonic()
+            if wait > 0:
+                self.sleep(wait)
+            due = [index for index, retry_at in scheduled.items() if retry_at <= next_retry]
+            retried = self._execute_rows(pool, node, [executors[i] for i in due], [inputs[i] for i in due])
+            now = time.monotonic()
+            for index, output in zip(due, retried):
+                outputs[index] = output
+                if isinstance(output, NodeRetryScheduled):
+                    scheduled[index] = now + output.countdown
+                else:
+                    del scheduled[index]
+        return outputs
+
+    def run_nodes(self, pool, executors: List[WorkflowExecutor], checkpoints: Dict = None) -> List[WorkflowExecutor]:
+        """
+        Execute every node of the plan across the given rows
+
+        Returns:
+            The executors of the rows that completed every node
+        """
+        checkpoints = checkpoints or {}
+        active = list(executors)
+        for node in self.plan.nodes:
+            key = WorkflowExecutor.checkpoint_key(node)
+            pending = []
+            for executor in active:
+                restored = checkpoints.get(executor.execution.id, {})
+                if key in restored:
+                    executor.results[node.id] = restored[key]
+                else:
+                    pending.append(executor)
+            if not pending:
+                continue
+
+            started = time.monotonic()
+            inputs = [executor.get_node_input(node) for executor in pending]
+            if node.type in BATCH_NODE_TYPES:
+                outputs = self._execute_batched(pool, node, pending, inputs)
+            else:
+                outputs = self._execute_rows(pool, node, pending, inputs)
+            outputs = self._retry_rows(pool, node, pending, inputs, outputs)
+            duration = (time.monotonic() - started) / len(pending)
+
+            completed = []
+            failed = set()
+            for executor, output in zip(pending, outputs):
+                if isinstance(output, Exception):
+                    error_msg = f"Error executing node {node.id}: {str(output)}"
+                    if error_msg not in executor.error_logs:
+                        executor.error_logs.append(error_msg)
+                    failed.add(id(executor))
+                    continue
+                executor.results[node.id] = output
+                if executor.persist:
+                    completed.append(NodeExecutionResult(
+                        execution=executor.execution,
+                        node_key=key,
+                        fingerprint=self.plan.fingerprints[node.id],
+                        status='completed',
+                        result=output,
+                        attempts=executor.attempts.get(key, 0),
+                        duration=duration
+                    ))
+
+            if completed:
+                # Large results go to the result store, shared with the execution's own results
+                stored = offload_node_results([(row.execution_id, key, row.result) for row in completed])
+                for row, result in zip(completed, stored):
+                    row.result = result
+                NodeExecutionResult.objects.bulk_create(
+                    completed,
+                    batch_size=500,
+                    update_conflicts=True,
+                    unique_fields=['execution', 'node_key'],
+                    update_fields=['fingerprint', 'status', 'result', 'error', 'attempts', 'duration']
+                )
+            active = [executor for executor in active if id(executor) not in failed]
+        return active
+
+    def run(self) -> WorkflowBatch:
+        batch = self.batch
+        batch.status = 'running'
+        batch.save(update_fields=['status'])
+
+        executions = list(batch.executions.exclude(status='completed').order_by('id'))
+        checkpoints = self.load_checkpoints(executions)
+        executors = [self.create_executor(execution) for execution in executions]
+
+        pool = ThreadPoolExecutor(max_workers=self.concurrency) if self.concurrency > 1 else None
+        try:
+            succeeded = self.run_nodes(pool, executors, checkpoints)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.finalize(executors, {executor.execution.id for executor in succeeded})
+        return batch
+
+    def finalize(self, executors: List[WorkflowExecutor], succeeded: set) -> None:
+        now = timezone.now()
+        executions = []
+        for executor in executors:
+            execution = executor.execution
+            if execution.id in succeeded:
+                execution.status = 'completed'
+                execution.results = executor.results
+                execution.completed_at = now
+            else:
+                execution.status = 'failed'
+                execution.error_logs = executor.error_logs
+            executions.append(execution)
+        offload_execution_output(executions)
+        WorkflowExecution.objects.bulk_update(
+            executions, ['status', 'results', 'error_logs', 'completed_at'], batch_size=500
+        )
+
+        batch = self.batch
+        batch.completed_rows = batch.executions.filter(status='completed').count()
+        batch.failed_rows = batch.executions.filter(status='failed').count()
+        batch.status = 'failed' if batch.failed_rows and not batch.completed_rows else 'completed'
+        batch.completed_at = now
+        batch.save(update_fields=['status', 'completed_rows', 'failed_rows', 'completed_at'])
+
+
+class StreamingBatchRunner(BatchRunner):
+    """
+    Run a batch whose rows are read lazily from ``batch.input_file``.
+
+    Rows are processed in fixed-size chunks. The outcomes of each chunk are
+    stored through the storage API as a JSONL part as soon as it finishes,
+    along with the row counts, so rows finished before a failure (or a lost
+    worker) are kept and no local copy of the whole output is needed. No
+    execution records are created, so memory and database use stay flat
+    regardless of batch size.
+    """
+    def iter_chunks(self) -> Iterator[List[Dict]]:
+        file_format = get_upload_format(self.batch.input_file)
+        with self.batch.input_file.open('rb') as source:
+            rows = iter_batch_rows(codecs.iterdecode(source, 'utf-8'), file_format)
+            while True:
+                chunk = list(itertools.islice(rows, STREAM_CHUNK_SIZE))
+                if not chunk:
+                    return
+                yield chunk
+
+    @staticmethod
+    def format_row(row_number: int, executor: WorkflowExecutor, succeeded: bool) -> str:
+        # Streams are written as their stored description, as in execution records
+        results = {node_id: to_storable(result) for node_id, result in executor.results.items()}
+        return json.dumps({
+            'row': row_number,
+            'status': 'completed' if succeeded else 'failed',
+            'variables': executor.execution.variables,
+            'results': results if succeeded else None,
+            'error': None if succeeded else '\n'.join(executor.error_logs),
+        }, default=str) + '\n'
+
+    def store_part(self, lines: List[str]) -> str:
+        """Store a chunk of output lines as the next output part"""
+        batch = self.batch
+        name = f'workflow_batches/outputs/batch_{batch.id}/part_{len(batch.output_parts):06d}.jsonl'
+        return batch.output_file.storage.save(name, ContentFile(''.join(lines).encode('utf-8')))
+
+    def delete_parts(self) -> None:
+        """Remove the output of an earlier run of the batch"""
+        storage = self.batch.output_file.storage
+        for name in self.batch.output_parts:
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.warning(f"Could not delete output part {name} of batch {self.batch.id}: {str(e)}")
+        self.batch.output_parts = []
+
+    def run(self) -> WorkflowBatch:
+        batch = self.batch
+        self.delete_parts()
+        batch.status = 'running'
+        batch.total_rows = batch.completed_rows = batch.failed_rows = 0
+        batch.save(update_fields=['status', 'output_parts', 'total_rows', 'completed_rows', 'failed_rows'])
+
+        pool = ThreadPoolExecutor(max_workers=self.concurrency) if self.concurrency > 1 else None
+        try:
+            for chunk in self.iter_chunks():
+                executors = [
+                    self.create_executor(
+                        WorkflowExecution(workflow=batch.workflow, batch=batch, variables=row),
+                        persist=False
+                    )
+                    for row in chunk
+                ]
+                succeeded = {id(executor) for executor in self.run_nodes(pool, executors)}
+                lines = [
+                    self.format_row(batch.total_rows + position, executor, id(executor) in succeeded)
+                    for position, executor in enumerate(executors)
+                ]
+                batch.output_parts.append(self.store_part(lines))
+                batch.total_rows += len(executors)
+                batch.completed_rows += len(succeeded)
+                batch.failed_rows += len(executors) - len(succeeded)
+                batch.save(update_fields=['output_parts', 'total_rows', 'completed_rows', 'failed_rows'])
+            batch.status = 'failed' if batch.failed_rows and not batch.completed_rows else 'completed'
+        except Exception as e:
+            # Rows of the chunks stored before the failure are kept
+            logger.error(f"Streaming batch {batch.id} stopped: {str(e)}", exc_info=True)
+            batch.status = 'failed'
+            batch.error = str(e)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        batch.completed_at = timezone.now()
+        batch.save(update_fields=[
+            'status', 'error', 'output_parts', 'total_rows',
+            'completed_rows', 'failed_rows', 'completed_at'
+        ])
+        return batch
@@ -1,7 +1,9 @@
 # workflows/connection_handling.py
+from collections import Counter
 from typing import Dict, List, Any, Optional, Union
 from .models import Node, NodeConnection, Workflow
-from ai_integration.models import NodePort
+from .graph import find_cycles
+from InnoFlow.ai_integration.models import NodePort
 import json
 import logging
 
@@ -74,6 +76,9 @@ class ConnectionManager:
         """
         Validate all connections in a workflow
         
+        The graph is loaded once and checked in a single O(V+E) pass, so every
+        cycle and every unconnected port is reported together.
+        
         Args:
             workflow_id: ID of the workflow to validate
             
@@ -82,49 +87,27 @@ class ConnectionManager:
         """
         errors = []
         workflow = Workflow.objects.get(id=workflow_id)
-        nodes = Node.objects.filter(workflow=workflow)
-        connections = NodeConnection.objects.filter(source_node__workflow=workflow)
+        node_ids = list(Node.objects.filter(workflow=workflow).values_list('id', flat=True))
+        connections = list(
+            NodeConnection.objects.filter(source_node__workflow=workflow)
+            .values_list('source_node_id', 'target_node_id', 'target_port')
+        )
         
         # Check for cycles in the workflow
-        visited = set()
-        path = set()
-        
-        def has_cycle(node_id):
-            if node_id in path:
-                return True
-            
-            if node_id in visited:
-                return False
-                
-            visited.add(node_id)
-            path.add(node_id)
-            
-            # Find all connections where this node is the source
-            outgoing = connections.filter(source_node_id=node_id)
-            for conn in outgoing:
-                if has_cycle(conn.target_node_id):
-                    return True
-                    
-            path.remove(node_id)
-            return False
-        
-        # Check for cycles starting from each node
-        for node in nodes:
-            if node.id not in visited:
-                if has_cycle(node.id):
-                    errors.append("Workflow contains a cycle")
-                    break
-        
-        # Check required input ports
-        for node in nodes:
-            input_ports = NodePort.objects.filter(node=node, port_type='input', optional=False)
-            for port in input_ports:
-                # Each required input port should have exactly one connection
-                conn_count = connections.filter(target_node=node, target_port=port.name).count()
-                if conn_count == 0:
-                    errors.append(f"Node {node.id}: Required input port '{port.name}' has no connection")
-                elif conn_count > 1:
-                    errors.append(f"Node {node.id}: Required input port '{port.name}' has multiple connections")
+        for cycle in find_cycles(node_ids, connections):
+            errors.append(f"Workflow contains a cycle: {' -> '.join(str(node_id) for node_id in cycle)}")
+        
+        # Each required input port should have exactly one connection
+        conn_counts = Counter((target_id, target_port) for _, target_id, target_port in connections)
+        required_ports = NodePort.objects.filter(
+            node__workflow=workflow, port_type='input', optional=False
+        ).order_by('node_id', 'id').values_list('node_id', 'name')
+        for node_id, port_name in required_ports:
+            conn_count = conn_counts[(node_id, port_name)]
+            if conn_count == 0:
+                errors.append(f"Node {node_id}: Required input port '{port_name}' has no connection")
+            elif conn_count > 1:
+                errors.append(f"Node {node_id}: Required input port '{port_name}' has multiple connections")
         
         return errors
     
@@ -0,0 +1,320 @@
+# workflows/documents.py
+import csv
+import logging
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from .retry import NonRetryableNodeError
+from .streams import LazyStream, get_stream_input, register_stream
+
+try:
+    import tiktoken
+except ImportError:  # Optional; chunks are measured with RegexTokenizer instead
+    tiktoken = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Optional; only needed to load PDF files
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Documents are dicts of {"text": str, "metadata": dict}. Loaders yield large
+# files in blocks and the chunker treats consecutive blocks of one source as
+# continuous text, so no file is ever held in memory as a whole.
+
+TEXT_EXTENSIONS = {'.txt', '.text', '.log'}
+MARKDOWN_EXTENSIONS = {'.md', '.markdown'}
+PDF_EXTENSIONS = {'.pdf'}
+CSV_EXTENSIONS = {'.csv', '.tsv'}
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS | MARKDOWN_EXTENSIONS | PDF_EXTENSIONS | CSV_EXTENSIONS
+
+
+def get_document_roots() -> List[Path]:
+    """Directories document loaders may read from (WORKFLOW_DOCUMENT_ROOTS)"""
+    roots = getattr(settings, 'WORKFLOW_DOCUMENT_ROOTS', None) or [Path(settings.MEDIA_ROOT) / 'documents']
+    return [Path(root).resolve() for root in roots]
+
+
+def resolve_document_path(path: str) -> Path:
+    """
+    Resolve a configured path inside the document roots
+
+    Relative paths are taken from the first root.
+
+    Raises:
+        NonRetryableNodeError: For paths outside the roots or that do not exist
+    """
+    roots = get_document_roots()
+    candidate = Path(path)
+    if not candidate.is_absolute():
+        candidate = roots[0] / candidate
+    candidate = candidate.resolve()
+    if not any(candidate.is_relative_to(root) for root in roots):
+        raise NonRetryableNodeError(f"Path {path} is outside the allowed document roots")
+    if not candidate.exists():
+        raise NonRetryableNodeError(f"Document path {path} does not exist")
+    return candidate
+
+
+def iter_document_files(root: Path, pattern: str = '*', recursive: bool = True) -> Iterator[Path]:
+    """Supported files at a path, in name order for directories"""
+    if root.is_file():
+        yield root
+        return
+    paths = root.rglob(pattern) if recursive else root.glob(pattern)
+    for path in sorted(paths):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            yield path
+
+
+def get_text_columns(value) -> Optional[List[str]]:
+    """
+    CSV columns of a document_loader config: a comma-separated string or a
+    list of column names
+
+    Raises:
+        NonRetryableNodeError: For any other value
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    elif not isinstance(value, (list, tuple)) or not all(isinstance(column, str) for column in value):
+        raise NonRetryableNodeError(
+            "Document loader text_columns must be a comma-separated string or a list of column names"
+        )
+    return [column.strip() for column in value if column.strip()] or None
+
+
+def read_text(path: Path, encoding: str = 'utf-8', block_size: int = 65536,
+              markdown: bool = False) -> Iterator[Dict]:
+    """
+    Yield a text or Markdown file in blocks of about ``block_size`` characters
+
+    Blocks end at line breaks; Markdown blocks also end at headings and carry
+    the heading they belong to as ``section``.
+    """
+    metadata = {'source': str(path), 'format': 'markdown' if markdown else 'text'}
+    section = None
+    lines = []
+    size = 0
+    with open(path, encoding=encoding, errors='replace', newline='') as source:
+        # readline is bounded so files without line breaks are still read in blocks
+        for line in iter(lambda: source.readline(block_size), ''):
+            if markdown and line.startswith('#'):
+                if lines:
+                    yield {'text': ''.join(lines), 'metadata': {**metadata, 'section': section}}
+                    lines, size = [], 0
+                section = line.lstrip('#').strip()
+            lines.append(line)
+            size += len(line)
+            if size >= block_size:
+                yield {'text': ''.join(lines), 'metadata': {**metadata, 'section': section}}
+                lines, size = [], 0
+    if lines:
+        yield {'text': ''.join(lines), 'metadata': {**metadata, 'section': section}}
+
+
+def read_pdf(path: Path) -> Iterator[Dict]:
+    """Yield the text of a PDF one page at a time"""
+    if PdfReader is None:
+        raise ImportError("pypdf is required to load PDF documents")
+    reader = PdfReader(str(path))
+    for number, page in enumerate(reader.pages, 1):
+        text = page.extract_text() or ''
+        if text.strip():
+            yield {'text': text + '\n', 'metadata': {'source': str(path), 'format': 'pdf', 'page': number}}
+
+
+def read_csv(path: Path, encoding: str = 'utf-8', text_columns: List[str] = None) -> Iterator[Dict]:
+    """Yield one document per CSV row, as "column: value" lines or the chosen columns"""
+    delimiter = '\t' if path.suffix.lower() == '.tsv' else ','
+    with open(path, encoding=encoding, errors='replace', newline='') as source:
+        reader = csv.DictReader(source, delimiter=delimiter)
+        for number, row in enumerate(reader, 1):
+            if text_columns:
+                text = '\n'.join(str(row.get(column) or '') for column in text_columns)
+            else:
+                text = '\n'.join(f"{column}: {value}" for column, value in row.items() if column)
+            yield {'text': text + '\n\n', 'metadata': {'source': str(path), 'format': 'csv', 'row': number}}
+
+
+@register_stream
+class DocumentStream(LazyStream):
+    """Documents of the files at ``config['path']``, read lazily on iteration"""
+    kind = 'documents'
+
+    def generate(self) -> Iterator[Dict]:
+        config = self.config
+        encoding = config.get('encoding', 'utf-8')
+        block_size = config.get('block_size') or getattr(settings, 'WORKFLOW_DOCUMENT_BLOCK_SIZE', 65536)
+        root = resolve_document_path(config['path'])
+        for path in iter_document_files(root, config.get('pattern') or '*', config.get('recursive', True)):
+            extension = path.suffix.lower()
+            logger.debug(f"Loading document {path}")
+            if extension in PDF_EXTENSIONS:
+                yield from read_pdf(path)
+            elif extension in CSV_EXTENSIONS:
+                yield from read_csv(path, encoding, get_text_columns(config.get('text_columns')))
+            else:
+                yield from read_text(path, encoding, block_size, markdown=extension in MARKDOWN_EXTENSIONS)
+
+
+class RegexTokenizer:
+    """Words and punctuation marks with their leading whitespace; lossless"""
+    pattern = re.compile(r'\s*(?:\w+|[^\w\s])|\s+')
+
+    def encode(self, text: str) -> List[str]:
+        return self.pattern.findall(text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return ''.join(tokens)
+
+
+class TiktokenTokenizer:
+    """Model tokens of a tiktoken encoding"""
+    def __init__(self, encoding: str = 'cl100k_base'):
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.encoding.decode(tokens)
+
+
+_tokenizers = {}
+
+
+def get_tokenizer(name: str = 'auto'):
+    """
+    Tokenizer by name: "tiktoken", "regex", or "auto" for tiktoken when it
+    is installed
+    """
+    if name == 'auto':
+        name = 'tiktoken' if tiktoken is not None else 'regex'
+    if name not in _tokenizers:
+        if name == 'tiktoken':
+            if tiktoken is None:
+                raise ImportError("tiktoken is required for the tiktoken tokenizer")
+            _tokenizers[name] = TiktokenTokenizer()
+        elif name == 'regex':
+            _tokenizers[name] = RegexTokenizer()
+        else:
+            raise NonRetryableNodeError(f"Unknown tokenizer: {name}")
+    return _tokenizers[name]
+
+
+def as_document(item) -> Dict:
+    if isinstance(item, dict) and 'text' in item:
+        return item
+    return {'text': item if isinstance(item, str) else str(item), 'metadata': {}}
+
+
+def chunk_documents(documents: Iterable, tokenizer, chunk_size: int, chunk_overlap: int) -> Iterator[Dict]:
+    """
+    Split documents into chunks of ``chunk_size`` tokens, consecutive chunks
+    sharing ``chunk_overlap`` tokens
+
+    Consecutive documents from the same source are chunked as one text; only
+    the tokens of the current window and the block being read are buffered.
+    Chunks carry the metadata of the document they start in.
+    """
+    step = chunk_size - chunk_overlap
+    buffer = []
+    start = 0  # position in the source of buffer[0]
+    emitted = 0  # position in the source up to which chunks were emitted
+    markers = deque()  # (position in the source, metadata) of each document
+    source = object()
+    index = 0
+
+    def make_chunk(tokens, position):
+        while len(markers) > 1 and markers[1][0] <= position:
+            markers.popleft()
+        metadata = dict(markers[0][1]) if markers else {}
+        metadata.update(chunk=index, tokens=len(tokens))
+        return {'text': tokenizer.decode(tokens), 'metadata': metadata}
+
+    for item in documents:
+        document = as_document(item)
+        metadata = document.get('metadata') or {}
+        if metadata.get('source') != source:
+            # A new source starts: emit what is left of the previous one
+            if start + len(buffer) > emitted and buffer:
+                yield make_chunk(buffer, start)
+            buffer, start, emitted, index = [], 0, 0, 0
+            markers.clear()
+            source = metadata.get('source')
+
+        tokens = tokenizer.encode(document['text'])
+        if not tokens:
+            continue
+        markers.append((start + len(buffer), metadata))
+        buffer.extend(tokens)
+
+        offset = 0
+        while len(buffer) - offset >= chunk_size:
+            yield make_chunk(buffer[offset:offset + chunk_size], start + offset)
+            emitted = start + offset + chunk_size
+            index += 1
+            offset += step
+        del buffer[:offset]
+        start += offset
+
+    if start + len(buffer) > emitted and buffer:
+        yield make_chunk(buffer, start)
+
+
+def get_chunk_settings(config: Dict):
+    """(chunk size, overlap) of a text_chunker config"""
+    chunk_size = config.get('chunk_size', 512)
+    chunk_overlap = config.get('chunk_overlap', 64)
+    if not isinstance(chunk_size, int) or not isinstance(chunk_overlap, int) \
+            or chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+        raise NonRetryableNodeError("Chunk overlap must be smaller than a positive chunk size")
+    return chunk_size, chunk_overlap
+
+
+@register_stream
+class ChunkStream(LazyStream):
+    """Token-aware chunks of an upstream document stream"""
+    kind = 'chunks'
+
+    def generate(self) -> Iterator[Dict]:
+        chunk_size, chunk_overlap = get_chunk_settings(self.config)
+        tokenizer = get_tokenizer(self.config.get('tokenizer', 'auto'))
+        return chunk_documents(self.source, tokenizer, chunk_size, chunk_overlap)
+
+
+def load_documents(config: Dict, input_data=None) -> DocumentStream:
+    """
+    document_loader node: a lazy stream of the documents at the configured
+    path, or at a path received as input
+    """
+    path = config.get('path')
+    if isinstance(input_data, dict) and isinstance(input_data.get('input'), str):
+        path = input_data['input']
+    if not path:
+        raise NonRetryableNodeError("Document loader requires a path")
+    # Fail on bad paths and settings now rather than when a downstream node iterates
+    root = resolve_document_path(path)
+    get_text_columns(config.get('text_columns'))
+    if PdfReader is None:
+        files = iter_document_files(root, config.get('pattern') or '*', config.get('recursive', True))
+        if any(file.suffix.lower() in PDF_EXTENSIONS for file in files):
+            raise NonRetryableNodeError(f"pypdf is required to load the PDF documents at {path}")
+    return DocumentStream({**config, 'path': path})
+
+
+def chunk_text(config: Dict, input_data=None) -> ChunkStream:
+    """text_chunker node: a lazy stream of chunks of its input documents or text"""
+    source = get_stream_input(input_data)
+    if source is None:
+        raise NonRetryableNodeError("Text chunker requires documents or text as input")
+    get_chunk_settings(config)
+    return ChunkStream(dict(config), source)
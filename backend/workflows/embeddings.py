@@ -0,0 +1,292 @@
+# workflows/embeddings.py
+import hashlib
+import itertools
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from InnoFlow.ai_integration.completion import get_config_provider
+from InnoFlow.ai_integration.models import AIModelConfig
+from InnoFlow.ai_integration.providers_registry import ProviderRegistry
+
+from .index_storage import LOCK, file_lock, get_index_directory, read_json, save_array, write_json
+from .retry import NonRetryableNodeError
+from .streams import STREAM_KEY, LazyStream, get_stream_input, register_stream
+
+logger = logging.getLogger(__name__)
+
+# Embeddings are cached by content hash, per model, in a directory of
+# memory-mapped files so re-embedding a corpus only calls the provider for
+# chunks whose text changed:
+#   index.npy    (key, row) records sorted by key: 32-character hashes
+#                ('S32'), binary searched, and the row of each in
+#                vectors.f32. One file replaced atomically, so readers never
+#                pair keys with the rows of another flush.
+#   vectors.f32  float32 vectors, appended in insertion order
+#   meta.json    dimension and model identity
+
+META = 'meta.json'
+INDEX = 'index.npy'
+VECTORS = 'vectors.f32'
+KEY_DTYPE = 'S32'
+INDEX_DTYPE = np.dtype([('key', KEY_DTYPE), ('row', np.int64)])
+
+
+def content_key(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+class EmbeddingCache:
+    """
+    Embeddings of one model by content hash
+
+    New vectors are kept in memory and appended to disk in batches of
+    WORKFLOW_EMBEDDING_FLUSH_SIZE, or when ``flush`` is called.
+    """
+    def __init__(self, directory: Path, namespace: str):
+        self.directory = directory
+        self.namespace = namespace
+        self.pending: Dict[str, np.ndarray] = {}
+        self.flush_size = getattr(settings, 'WORKFLOW_EMBEDDING_FLUSH_SIZE', 4096)
+        self.lock = threading.RLock()
+        self.dim = None
+        self._load()
+
+    def _load(self) -> None:
+        meta_path = self.directory / META
+        meta = read_json(meta_path, {})
+        self.loaded_mtime = meta_path.stat().st_mtime_ns if meta_path.exists() else None
+        self.dim = meta.get('dim', self.dim)
+        if self.loaded_mtime is None:
+            self.keys = np.empty(0, dtype=KEY_DTYPE)
+            self.rows = np.empty(0, dtype=np.int64)
+            self.vectors = np.empty((0, self.dim or 0), dtype=np.float32)
+            return
+        index = np.load(self.directory / INDEX, mmap_mode='r')
+        self.keys = index['key']
+        self.rows = index['row']
+        # Every key has its own row, so rows past len(keys) may be mid-write
+        count = len(self.rows)
+        if count:
+            self.vectors = np.memmap(self.directory / VECTORS, dtype=np.float32, mode='r', shape=(count, self.dim))
+        else:
+            self.vectors = np.empty((0, self.dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys) + len(self.pending)
+
+    def refresh(self) -> None:
+        """Pick up vectors another process flushed since the cache was loaded"""
+        meta_path = self.directory / META
+        mtime = meta_path.stat().st_mtime_ns if meta_path.exists() else None
+        if mtime != self.loaded_mtime:
+            with self.lock:
+                self._load()
+
+    def _lookup(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mask of the keys stored on disk and their rows"""
+        if not len(self.keys) or not len(keys):
+            return np.zeros(len(keys), dtype=bool), np.empty(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[positions] == keys
+        return found, self.rows[positions[found]]
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors of the given keys; missing keys are left out"""
+        with self.lock:
+            found = {key: self.pending[key] for key in keys if key in self.pending}
+            rest = [key for key in keys if key not in found]
+            mask, rows = self._lookup(np.asarray(rest, dtype=KEY_DTYPE))
+            if len(rows):
+                vectors = np.asarray(self.vectors[rows])
+                found.update(zip(itertools.compress(rest, mask), vectors))
+            return found
+
+    def put(self, keys: List[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(keys):
+            raise ValueError(f"Expected {len(keys)} embeddings, got an array of shape {vectors.shape}")
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise NonRetryableNodeError(
+                    f"Embedding dimension changed from {self.dim} to {vectors.shape[1]} for {self.namespace}"
+                )
+            self.pending.update(zip(keys, vectors))
+            if len(self.pending) >= self.flush_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Append pending vectors to disk, merging with what other processes wrote"""
+        with self.lock:
+            if not self.pending:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.directory / LOCK):
+                self._load()
+                keys = list(self.pending)
+                mask, _ = self._lookup(np.asarray(keys, dtype=KEY_DTYPE))
+                keys = list(itertools.compress(keys, ~mask))
+                if keys:
+                    self._append(keys)
+                self.pending.clear()
+
+    def _append(self, keys: List[str]) -> None:
+        vectors = np.stack([self.pending[key] for key in keys])
+        row_bytes = self.dim * vectors.itemsize
+        start = len(self.rows)
+        with open(self.directory / VECTORS, 'ab') as output:
+            # Drop rows of an interrupted flush that never got keys
+            output.truncate(start * row_bytes)
+            output.write(vectors.tobytes())
+
+        index = np.empty(len(self.keys) + len(keys), dtype=INDEX_DTYPE)
+        index['key'] = np.concatenate([self.keys, np.asarray(keys, dtype=KEY_DTYPE)])
+        index['row'] = np.concatenate([self.rows, np.arange(start, start + len(keys), dtype=np.int64)])
+        index.sort(order='key', kind='stable')
+        save_array(self.directory / INDEX, index)
+        # Written last: readers reload when it changes
+        write_json(self.directory / META, {'dim': self.dim, 'namespace': self.namespace, 'size': len(index)})
+        self._load()
+        logger.info(f"Embedding cache {self.namespace}: stored {len(keys)} vectors, {len(index)} in total")
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(namespace: str) -> EmbeddingCache:
+    """Process-wide EmbeddingCache of a model, refreshed when another process flushed it"""
+    name = hashlib.sha256(namespace.encode('utf-8')).hexdigest()[:32]
+    directory = get_index_directory('embeddings', name)
+    with _caches_lock:
+        cache = _caches.get(str(directory))
+        if cache is None:
+            cache = _caches[str(directory)] = EmbeddingCache(directory, namespace)
+            return cache
+    cache.refresh()
+    return cache
+
+
+def get_embedding_provider(config: Dict):
+    """
+    Provider of an embedding node and the identity of its model
+
+    ``model_config`` selects a configured provider (OpenAI, Ollama, ...) and
+    ``model`` a local Hugging Face model.
+    """
+    if config.get('model_config'):
+        try:
+            model_config = AIModelConfig.objects.get(pk=config['model_config'])
+        except (AIModelConfig.DoesNotExist, ValueError, TypeError):
+            raise NonRetryableNodeError(f"AI model config {config['model_config']} does not exist")
+        provider = get_config_provider(model_config)
+    elif config.get('model'):
+        provider = ProviderRegistry.get_provider('HUGGINGFACE', model_name=config['model'])
+    else:
+        raise NonRetryableNodeError("Embedding nodes require a model_config or a model configuration")
+    return provider, f"{type(provider).__name__}:{provider.model_name}"
+
+
+class Embedder:
+    """Embeds texts through a provider, computing each distinct uncached text once"""
+    def __init__(self, provider, namespace: str, batch_size: int = None):
+        self.provider = provider
+        limit = getattr(provider, 'max_embedding_batch', 16)
+        self.batch_size = max(1, min(int(batch_size), limit)) if batch_size else limit
+        self.cache = get_embedding_cache(namespace)
+        self.computed = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        keys = [content_key(text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch = missing_keys[start:start + self.batch_size]
+            vectors = self.provider.embed([missing[key] for key in batch])
+            if vectors is None or len(vectors) != len(batch):
+                raise ValueError(f"Embedding provider returned {len(vectors or [])} vectors for {len(batch)} texts")
+            vectors = np.asarray(vectors, dtype=np.float32)
+            self.cache.put(batch, vectors)
+            found.update(zip(batch, vectors))
+        self.computed += len(missing_keys)
+
+        if not keys:
+            return np.empty((0, self.cache.dim or 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+
+def get_embedder(config: Dict) -> Embedder:
+    provider, namespace = get_embedding_provider(config)
+    return Embedder(provider, namespace, config.get('batch_size'))
+
+
+def as_item(value) -> Dict:
+    if isinstance(value, str):
+        return {'text': value}
+    if isinstance(value, dict) and isinstance(value.get('text'), str):
+        return value
+    raise NonRetryableNodeError("Embedding input items must be text or chunks with a text")
+
+
+@register_stream
+class EmbeddingStream(LazyStream):
+    """Items of the source stream with their ``embedding``"""
+    kind = 'embeddings'
+
+    def batches(self, embedder: Embedder) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        iterator = iter(self.source)
+        batch_size = getattr(settings, 'WORKFLOW_EMBEDDING_STREAM_BATCH_SIZE', 256)
+        while True:
+            items = [as_item(value) for value in itertools.islice(iterator, batch_size)]
+            if not items:
+                return
+            yield items, embedder.embed([item['text'] for item in items])
+
+    def generate(self) -> Iterator:
+        for items, vectors in self.batches(get_embedder(self.config)):
+            for item, vector in zip(items, vectors):
+                yield {**item, 'embedding': vector.tolist()}
+
+
+def embed_text(config: Dict, text: str) -> List[float]:
+    """Embedding of a single text, such as a search query"""
+    embedder = get_embedder(config)
+    vector = embedder.embed([text])[0]
+    embedder.cache.flush()
+    return vector.tolist()
+
+
+def run_embedding(config: Dict, input_data=None):
+    """
+    embedding node: embed a text, or a stream of chunks
+
+    Chunks are embedded here, so provider errors are retried on this node,
+    and the output stream reads the vectors back from the cache.
+    """
+    value = input_data.get('input') if isinstance(input_data, dict) else input_data
+    if isinstance(value, str) or (isinstance(value, dict) and STREAM_KEY not in value and 'text' in value):
+        item = as_item(value)
+        return {**item, 'embedding': embed_text(config, item['text'])}
+
+    source = get_stream_input(input_data)
+    if source is None:
+        raise NonRetryableNodeError("Embedding nodes require text or chunks as input")
+    stream = EmbeddingStream(config, source)
+    embedder = get_embedder(config)
+    count = 0
+    for items, _ in stream.batches(embedder):
+        count += len(items)
+    embedder.cache.flush()
+    logger.info(f"Embedded {count} items, {embedder.computed} computed by the provider")
+    return stream
@@ -0,0 +1,183 @@
+# workflows/events.py
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Event:
+    """A single progress event published on a channel"""
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, event_id: int, event_type: str, data: Dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def to_dict(self):
+        return {"id": self.id, "type": self.type, "data": self.data}
+
+
+class LocalEventBroker:
+    """
+    In-process publish/subscribe broker for execution progress events.
+
+    Each channel keeps a bounded buffer of recent events so subscribers that
+    connect late (or reconnect with Last-Event-ID) can replay what they missed.
+    Only the most recently used channels are kept. Events published in other
+    processes are not visible; configure WORKFLOW_EVENT_BROKER with a shared
+    implementation exposing the same methods when workers run out of process.
+
+    Resetting a channel starts a new run of its execution: buffered events are
+    dropped while event ids keep counting up, so neither new subscribers nor
+    clients reconnecting with an old Last-Event-ID replay the previous run.
+    """
+    def __init__(self, buffer_size: int = 256, max_channels: int = 1024):
+        self.buffer_size = buffer_size
+        self.max_channels = max_channels
+        self._condition = threading.Condition()
+        self._channels: 'OrderedDict[str, deque]' = OrderedDict()
+        self._last_ids: Dict[str, int] = {}
+
+    def _get_channel(self, channel: str) -> deque:
+        events = self._channels.get(channel)
+        if events is None:
+            events = self._channels[channel] = deque(maxlen=self.buffer_size)
+            while len(self._channels) > self.max_channels:
+                evicted, _ = self._channels.popitem(last=False)
+                self._last_ids.pop(evicted, None)
+        else:
+            self._channels.move_to_end(channel)
+        return events
+
+    def publish(self, channel: str, event_type: str, data: Optional[Dict] = None) -> Event:
+        with self._condition:
+            event_id = self._last_ids.get(channel, 0) + 1
+            self._last_ids[channel] = event_id
+            event = Event(event_id, event_type, data or {})
+            self._get_channel(channel).append(event)
+            self._condition.notify_all()
+        return event
+
+    def reset(self, channel: str) -> None:
+        """Drop the buffered events of a channel, keeping its event ids"""
+        with self._condition:
+            events = self._channels.get(channel)
+            if events is not None:
+                events.clear()
+
+    def get_events(self, channel: str, after_id: int = 0) -> List[Event]:
+        """Buffered events of a channel published after the given event id"""
+        with self._condition:
+            return [event for event in self._channels.get(channel, ()) if event.id > after_id]
+
+    def listen(self, channel: str, after_id: int = 0, timeout: float = 15.0) -> List[Event]:
+        """Wait up to ``timeout`` seconds for events published after ``after_id``"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                events = [event for event in self._channels.get(channel, ()) if event.id > after_id]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._condition.wait(remaining)
+
+    def subscribe(self, channel: str, after_id: int = 0, timeout: float = 15.0) -> Iterator[Optional[Event]]:
+        """
+        Yield events of a channel as they are published.
+
+        ``None`` is yielded whenever ``timeout`` seconds pass without events so
+        callers can send keep-alives or give up.
+        """
+        while True:
+            events = self.listen(channel, after_id, timeout)
+            if not events:
+                yield None
+                continue
+            for event in events:
+                after_id = event.id
+                yield event
+
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_event_broker():
+    """Get the process-wide event broker configured by WORKFLOW_EVENT_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_path = getattr(settings, 'WORKFLOW_EVENT_BROKER', 'workflows.events.LocalEventBroker')
+                _broker = import_string(broker_path)()
+    return _broker
+
+
+def execution_channel(execution_id) -> str:
+    return f"execution:{execution_id}"
+
+
+def format_sse(event_type: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """Encode an event in the Server-Sent Events wire format"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def iter_execution_events(execution, after_id: int = 0) -> Iterator[str]:
+    """
+    Stream the progress events of an execution as SSE messages.
+
+    Ends after the execution finishes. Executions that already finished (or
+    whose events are no longer buffered) get a single synthetic
+    ``execution_finished`` event built from the stored record.
+
+    A stream holds a worker thread while it is open, so it also ends after
+    WORKFLOW_EVENT_STREAM_MAX_DURATION seconds; EventSource clients then
+    reconnect with Last-Event-ID and carry on where they left off.
+    """
+    broker = get_event_broker()
+    channel = execution_channel(execution.id)
+    keepalive = getattr(settings, 'WORKFLOW_EVENT_KEEPALIVE', 15.0)
+    max_duration = getattr(settings, 'WORKFLOW_EVENT_STREAM_MAX_DURATION', 120)
+    deadline = time.monotonic() + max_duration
+
+    yield f"retry: {int(keepalive * 1000)}\n\n"
+    if execution.status in FINISHED_STATUSES and not broker.get_events(channel, after_id):
+        yield format_sse('execution_finished', {"status": execution.status})
+        return
+
+    for event in broker.subscribe(channel, after_id, timeout=keepalive):
+        if event is not None:
+            yield format_sse(event.type, event.data, event.id)
+            if event.type == 'execution_finished':
+                return
+            continue
+
+        execution.refresh_from_db(fields=['status'])
+        if execution.status in FINISHED_STATUSES:
+            yield format_sse('execution_finished', {"status": execution.status})
+            return
+        if time.monotonic() >= deadline:
+            return
+        yield ": keep-alive\n\n"
+
+
+def preview_output(result, limit: int = None) -> str:
+    """Truncated text form of a node result, sent as partial output with events"""
+    if limit is None:
+        limit = getattr(settings, 'WORKFLOW_EVENT_OUTPUT_PREVIEW', 500)
+    text = result if isinstance(result, str) else json.dumps(result, default=str)
+    if len(text) > limit:
+        return text[:limit] + '...'
+    return text
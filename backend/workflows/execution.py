@@ -1,75 +1,232 @@
 import logging
+import time
 from celery import shared_task
 from django.utils import timezone
-from .models import WorkflowExecution, Node, NodeConnection
+from .models import WorkflowExecution, Node, NodeConnection, NodeExecutionResult
 from .utils import execute_node as execute_node_util
+from .retry import NodeRetryScheduled, get_retry_policy
+from .plan import ExecutionPlan
+from .events import get_event_broker, execution_channel, preview_output
+from .result_store import load_node_results, offload_execution_output, offload_node_results
+from .streams import restore_stream
 from typing import Any, Dict
 
 logger = logging.getLogger(__name__)
 
 class WorkflowExecutor:
-    def __init__(self, execution: WorkflowExecution):
+    def __init__(self, execution: WorkflowExecution, defer_retries: bool = False,
+                 plan: ExecutionPlan = None, persist: bool = True):
         self.execution = execution
         self.workflow = execution.workflow
+        # Batches share one compiled plan between all of their executions
+        self._plan = plan
+        # Streaming batches run rows without execution records
+        self.persist = persist
         self.results = {}
         self.error_logs = []
+        # When set, backoff waits are handed back to the caller (the Celery task)
+        # instead of sleeping in the worker
+        self.defer_retries = defer_retries
+        self.attempts = {}
+        self.sleep = time.sleep
+        self.events = get_event_broker()
+
+    def publish(self, event_type: str, **data) -> None:
+        """Publish a progress event for subscribers of this execution"""
+        if not self.persist or self.execution.id is None:
+            return
+        try:
+            self.events.publish(execution_channel(self.execution.id), event_type, data)
+        except Exception as e:
+            # Progress reporting must never fail the execution itself
+            logger.warning(f"Failed to publish {event_type} event: {str(e)}")
+
+    @property
+    def plan(self) -> ExecutionPlan:
+        if self._plan is None:
+            context = self.execution.execution_context or {}
+            if context.get('plan_source') == 'definition':
+                # Runs the editor document as saved, without Node rows
+                self._plan = ExecutionPlan.from_definition(self.workflow.definition)
+            else:
+                self._plan = ExecutionPlan.for_workflow(self.workflow)
+        return self._plan
+
+    @staticmethod
+    def checkpoint_key(node) -> str:
+        return str(node.id)
+
+    def get_fingerprints(self) -> dict:
+        """Plan fingerprint of every node, by checkpoint key"""
+        return {self.checkpoint_key(node): self.plan.fingerprints[node.id] for node in self.plan.nodes}
+
+    def load_checkpoints(self) -> dict:
+        """
+        Return results of nodes that already completed in a previous attempt
+        and restore the attempt counters of nodes waiting for a retry
+
+        Checkpoints of nodes edited since (or fed by edited nodes) are ignored.
+        """
+        checkpoints = {}
+        fingerprints = self.get_fingerprints()
+        rows = NodeExecutionResult.objects.filter(
+            execution=self.execution,
+            status__in=['completed', 'retrying']
+        ).values_list('node_key', 'fingerprint', 'status', 'result', 'attempts')
+        completed = []
+        for key, fingerprint, status, result, attempts in rows:
+            if fingerprints.get(key) != fingerprint:
+                continue
+            if status == 'completed':
+                completed.append((key, result))
+            else:
+                self.attempts[key] = attempts
+        results = load_node_results([(self.execution.id, result) for _, result in completed])
+        for (key, _), result in zip(completed, results):
+            checkpoints[key] = restore_stream(result)
+        return checkpoints
+
+    def save_checkpoint(self, node, result, duration: float) -> None:
+        """Persist a completed node result so retries and resumes can skip it"""
+        if not self.persist:
+            return
+        key = self.checkpoint_key(node)
+        stored, = offload_node_results([(self.execution.id, key, result)])
+        NodeExecutionResult.objects.update_or_create(
+            execution=self.execution,
+            node_key=key,
+            defaults={
+                'fingerprint': self.plan.fingerprints[node.id],
+                'status': 'completed',
+                'result': stored,
+                'error': None,
+                'attempts': self.attempts.get(self.checkpoint_key(node), 0),
+                'duration': duration,
+            }
+        )
+
+    def record_failure(self, node, error: Exception, status: str = 'failed') -> None:
+        """Persist a node failure and its attempt count on the execution"""
+        if not self.persist:
+            return
+        NodeExecutionResult.objects.update_or_create(
+            execution=self.execution,
+            node_key=self.checkpoint_key(node),
+            defaults={
+                'fingerprint': self.plan.fingerprints[node.id],
+                'status': status,
+                'result': None,
+                'error': str(error),
+                'attempts': self.attempts.get(self.checkpoint_key(node), 0),
+            }
+        )
+
+    def save_execution(self) -> None:
+        """Save the execution, moving large outputs to the result store"""
+        offload_execution_output([self.execution])
+        self.execution.save()
+
+    def is_blocked(self, node: Node, blocked_ids: set) -> bool:
+        """Whether any upstream node of this node is waiting for a retry"""
+        return bool(blocked_ids & self.plan.upstream_ids(node.id))
 
     def get_node_input(self, node: Node) -> dict:
         """Get input data for a node from its connections"""
-        input_data = {}
-        input_connections = node.inputs.all()
-        
-        if input_connections.exists():
-            for conn in input_connections:
-                if conn.source_node.id in self.results:
-                    input_data[conn.target_port] = self.results[conn.source_node.id]
-        
-        # Add variables to input data
-        if self.execution.variables:
-            input_data['variables'] = self.execution.variables
-            
-        return input_data or None
+        return self.plan.get_node_input(node.id, self.results, self.execution.variables)
 
-    def execute_node(self, node: Node, input_data=None, retry_count=0):
-        """Execute a single node with retry mechanism"""
-        try:
-            result = execute_node_util(node, input_data)
-            self.results[node.id] = result
-            return result
-        except Exception as e:
-            if retry_count < node.max_retries:
-                logger.info(f"Retrying node {node.id}, attempt {retry_count + 1}")
-                node.retry_count = retry_count + 1
-                node.save()
-                return self.execute_node(node, input_data, retry_count + 1)
-            
-            error_msg = f"Error executing node {node.id}: {str(e)}"
-            self.error_logs.append(error_msg)
-            self.execution.status = 'failed'
-            self.execution.error_logs = self.error_logs
-            self.execution.save()
-            raise
+    def execute_node(self, node: Node, input_data=None):
+        """Execute a single node, retrying transient failures with backoff"""
+        key = self.checkpoint_key(node)
+        policy = get_retry_policy(node.type)
+        while True:
+            try:
+                result = execute_node_util(node, input_data)
+                self.results[node.id] = result
+                return result
+            except Exception as e:
+                attempt = self.attempts.get(key, 0) + 1
+                if policy.is_retryable(e) and attempt <= node.max_retries:
+                    self.attempts[key] = attempt
+                    delay = policy.get_delay(attempt)
+                    self.record_failure(node, e, status='retrying')
+                    self.publish('node_retrying', node_id=node.id, attempt=attempt,
+                                 delay=round(delay, 3), error=str(e))
+                    if self.defer_retries:
+                        logger.info(f"Scheduling retry {attempt} of node {node.id} in {delay:.2f}s")
+                        raise NodeRetryScheduled(delay, [node.id]) from e
+                    logger.info(f"Retrying node {node.id}, attempt {attempt} in {delay:.2f}s")
+                    self.sleep(delay)
+                    continue
+
+                error_msg = f"Error executing node {node.id}: {str(e)}"
+                self.error_logs.append(error_msg)
+                self.record_failure(node, e)
+                self.publish('node_failed', node_id=node.id, error=str(e))
+                self.execution.status = 'failed'
+                self.execution.error_logs = self.error_logs
+                if self.persist:
+                    self.save_execution()
+                raise
 
     def execute_workflow(self):
-        """Execute the entire workflow"""
+        """Execute the entire workflow, skipping nodes checkpointed by earlier attempts"""
         try:
-            sorted_nodes = self.workflow.nodes.order_by('order')
+            sorted_nodes = self.plan.nodes
+            checkpoints = self.load_checkpoints()
             self.execution.status = 'running'
             self.execution.save()
+            self.publish('execution_started', workflow_id=self.workflow.id,
+                         total_nodes=len(sorted_nodes), restored_nodes=len(checkpoints))
             
+            # Nodes waiting for a backoff delay, and everything downstream of them
+            deferred = {}
+            blocked = set()
             for node in sorted_nodes:
+                key = self.checkpoint_key(node)
+                if key in checkpoints:
+                    logger.info(f"Skipping node {node.id}, result restored from checkpoint")
+                    self.results[node.id] = checkpoints[key]
+                    self.publish('node_skipped', node_id=node.id, reason='checkpoint')
+                    continue
+
+                if self.is_blocked(node, blocked):
+                    blocked.add(node.id)
+                    continue
+
                 input_data = self.get_node_input(node)
-                result = self.execute_node(node, input_data)
+                self.publish('node_started', node_id=node.id, node_type=node.type)
+                started = time.monotonic()
+                try:
+                    result = self.execute_node(node, input_data)
+                except NodeRetryScheduled as retry:
+                    # Keep running independent branches, retry this one later
+                    deferred[node.id] = retry.countdown
+                    blocked.add(node.id)
+                    continue
+                duration = time.monotonic() - started
                 self.results[node.id] = result
+                self.save_checkpoint(node, result, duration)
+                self.publish('node_finished', node_id=node.id, node_type=node.type,
+                             duration=round(duration, 4), output=preview_output(result))
+
+            if deferred:
+                self.execution.status = 'pending'
+                self.execution.save()
+                self.publish('execution_waiting', node_ids=list(deferred), countdown=min(deferred.values()))
+                raise NodeRetryScheduled(min(deferred.values()), deferred.keys())
             
             self.execution.status = 'completed'
             self.execution.results = self.results
             self.execution.completed_at = timezone.now()
-            self.execution.save()
+            self.save_execution()
+            self.publish('execution_finished', status='completed')
             
+        except NodeRetryScheduled:
+            raise
         except Exception as e:
             logger.error(f"Workflow execution failed: {str(e)}")
             self.execution.status = 'failed'
             self.execution.error_logs = self.error_logs
-            self.execution.save()
+            self.save_execution()
+            self.publish('execution_finished', status='failed', error=str(e))
             raise
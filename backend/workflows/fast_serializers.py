@@ -0,0 +1,152 @@
+# workflows/fast_serializers.py
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# DRF fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def compile_datetime(field: serializers.DateTimeField) -> Optional[Callable]:
+    """
+    Converter equivalent to DateTimeField.to_representation
+
+    The field's timezone is resolved once, when the converter is built,
+    instead of once per value.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    iso_8601 = output_format.lower() == ISO_8601
+
+    def convert(value):
+        if field_timezone is not None and value.tzinfo is not None:
+            value = value.astimezone(field_timezone)
+        else:
+            value = field.enforce_timezone(value)
+        if not iso_8601:
+            return value.strftime(output_format)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+class ValuesSerializer:
+    """
+    Read-only renderer of ``.values()`` rows for a ModelSerializer.
+
+    The field mapping (output name, values() column, converter) is compiled
+    once from the ModelSerializer, so output stays schema-compatible with it
+    while skipping per-row field binding and model instantiation. Only flat
+    fields backed by a model column are supported.
+    """
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.mapping: List[Tuple[str, str, serializers.Field]] = []
+        model = serializer_class.Meta.model
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                column = model._meta.get_field(field.source).attname
+            elif isinstance(field, serializers.Field) and not isinstance(field, serializers.BaseSerializer):
+                column = field.source
+                model._meta.get_field(column)
+            else:
+                raise TypeError(f"{serializer_class.__name__}.{name} cannot be rendered from values()")
+            self.mapping.append((name, column, field))
+
+    @staticmethod
+    def get_converter(field) -> Optional[Callable]:
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        if isinstance(field, serializers.ChoiceField) and all(
+            isinstance(key, str) for key in field.choices
+        ):
+            # Valid string choices are rendered as stored
+            return None
+        if isinstance(field, serializers.DateTimeField):
+            return compile_datetime(field)
+        return field.to_representation
+
+    def get_mapping(self, omitted=()) -> List[Tuple[str, str, Optional[Callable]]]:
+        """(output name, column, converter) of the rendered fields, built per request"""
+        return [
+            (name, column, self.get_converter(field))
+            for name, column, field in self.mapping if name not in omitted
+        ]
+
+    @staticmethod
+    def get_columns(mapping, extra=()) -> List[str]:
+        """values() columns needed to render ``mapping``, plus ``extra`` (e.g. ordering)"""
+        return list(dict.fromkeys([column for _, column, _ in mapping] + list(extra)))
+
+    @staticmethod
+    def render(rows, mapping) -> List[Dict]:
+        """Build output dicts from values() rows"""
+        output = []
+        append = output.append
+        for row in rows:
+            item = {}
+            for name, column, converter in mapping:
+                value = row[column]
+                item[name] = value if converter is None or value is None else converter(value)
+            append(item)
+        return output
+
+
+_compiled: Dict[type, ValuesSerializer] = {}
+
+
+def get_values_serializer(serializer_class) -> ValuesSerializer:
+    """Compiled ValuesSerializer for a ModelSerializer class, built once per process"""
+    values_serializer = _compiled.get(serializer_class)
+    if values_serializer is None:
+        values_serializer = _compiled[serializer_class] = ValuesSerializer(serializer_class)
+    return values_serializer
+
+
+class FastListModelMixin:
+    """
+    ``list`` for read-heavy viewsets: renders ``.values()`` rows through a
+    compiled ValuesSerializer instead of instantiating the ModelSerializer
+    per row. Honours the sparse fieldsets of SparseFieldsetMixin serializers
+    and the view's pagination.
+
+    Views can post-process a page of rows in ``prepare_rows``, reading the
+    columns they name in ``row_columns`` besides the rendered ones.
+    """
+    row_columns = ()
+
+    def prepare_rows(self, rows):
+        return rows
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        values_serializer = get_values_serializer(serializer_class)
+        omitted = set()
+        if hasattr(serializer_class, 'get_omitted_fields'):
+            field_names = [name for name, _, _ in values_serializer.mapping]
+            omitted = serializer_class.get_omitted_fields(request, self, field_names)
+        mapping = values_serializer.get_mapping(omitted)
+
+        # Cursor pagination reads its position from the ordering columns
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        extra = [field.lstrip('-') for field in ordering] + list(self.row_columns)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*values_serializer.get_columns(mapping, extra))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.render(self.prepare_rows(page), mapping))
+        return Response(values_serializer.render(self.prepare_rows(rows), mapping))
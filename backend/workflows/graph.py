@@ -0,0 +1,186 @@
+# workflows/graph.py
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+# Graph helpers shared by the workflow validators. Node ids are mapped to
+# dense indexes once so every pass runs over plain adjacency lists in O(V+E)
+# without recursion.
+
+
+def build_adjacency(node_ids: Iterable[Hashable], edges: Iterable[Tuple]) -> Tuple[List, Dict, List[List[int]]]:
+    """
+    Index a graph for the traversals below
+
+    Args:
+        node_ids: Ids of the nodes in the graph
+        edges: (source id, target id) pairs; edges to unknown nodes are ignored
+
+    Returns:
+        (ids by index, index by id, adjacency lists of indexes)
+    """
+    ids = list(dict.fromkeys(node_ids))
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    adjacency = [[] for _ in ids]
+    for source, target, *_ in edges:
+        source_index = index.get(source)
+        target_index = index.get(target)
+        if source_index is not None and target_index is not None:
+            adjacency[source_index].append(target_index)
+    return ids, index, adjacency
+
+
+def topological_order(node_ids: Iterable[Hashable], edges: Iterable[Tuple]) -> Tuple[List, List]:
+    """
+    Order nodes so that every node comes after its upstream nodes (Kahn)
+
+    Ties keep the order of ``node_ids``.
+
+    Returns:
+        (ordered ids, ids that could not be ordered because they are on or
+        downstream of a cycle)
+    """
+    ids, _, adjacency = build_adjacency(node_ids, edges)
+    order = _kahn(adjacency)
+    ordered = set(order)
+    remaining = [ids[i] for i in range(len(ids)) if i not in ordered]
+    return [ids[i] for i in order], remaining
+
+
+def _kahn(adjacency: List[List[int]]) -> List[int]:
+    in_degree = [0] * len(adjacency)
+    for targets in adjacency:
+        for target in targets:
+            in_degree[target] += 1
+
+    ready = deque(i for i, degree in enumerate(in_degree) if degree == 0)
+    order = []
+    while ready:
+        current = ready.popleft()
+        order.append(current)
+        for target in adjacency[current]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                ready.append(target)
+    return order
+
+
+def has_cycle(node_ids: Iterable[Hashable], edges: Iterable[Tuple]) -> bool:
+    """Iterative three-colour DFS that stops at the first back edge"""
+    _, _, adjacency = build_adjacency(node_ids, edges)
+    WHITE, GREY, BLACK = 0, 1, 2
+    colour = [WHITE] * len(adjacency)
+    for root in range(len(adjacency)):
+        if colour[root] != WHITE:
+            continue
+        colour[root] = GREY
+        work = [(root, 0)]
+        while work:
+            current, position = work[-1]
+            targets = adjacency[current]
+            if position < len(targets):
+                work[-1] = (current, position + 1)
+                target = targets[position]
+                if colour[target] == GREY:
+                    return True
+                if colour[target] == WHITE:
+                    colour[target] = GREY
+                    work.append((target, 0))
+                continue
+            colour[current] = BLACK
+            work.pop()
+    return False
+
+
+def strongly_connected_components(adjacency: List[List[int]]) -> List[List[int]]:
+    """Iterative Tarjan over an adjacency list of indexes"""
+    count = len(adjacency)
+    order = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(count):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            current, position = work[-1]
+            targets = adjacency[current]
+            if position < len(targets):
+                work[-1] = (current, position + 1)
+                target = targets[position]
+                if order[target] == -1:
+                    order[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, 0))
+                elif on_stack[target]:
+                    low[current] = min(low[current], order[target])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[current])
+            if low[current] == order[current]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == current:
+                        break
+                components.append(component)
+
+    return components
+
+
+def _cycle_through(start: int, members: set, adjacency: List[List[int]]) -> List[int]:
+    """Shortest cycle from ``start`` back to itself inside one component"""
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        for target in adjacency[current]:
+            if target == start:
+                path = [current]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                path.reverse()
+                return path + [start]
+            if target in members and target not in parents:
+                parents[target] = current
+                queue.append(target)
+    return [start]
+
+
+def find_cycles(node_ids: Iterable[Hashable], edges: Iterable[Tuple]) -> List[List]:
+    """
+    Find the cycles of a graph, one per strongly connected component
+
+    Cycles that share nodes are reported once, through their lowest node,
+    so a single pass surfaces every independent loop.
+
+    Returns:
+        Cycles as lists of node ids starting and ending with the same node
+    """
+    ids, _, adjacency = build_adjacency(node_ids, edges)
+    # Acyclic graphs, the common case, are settled by the topological sort
+    if len(_kahn(adjacency)) == len(ids):
+        return []
+
+    cycles = []
+    for component in strongly_connected_components(adjacency):
+        start = min(component)
+        if len(component) == 1 and start not in adjacency[start]:
+            continue
+        cycles.append(_cycle_through(start, set(component), adjacency))
+    cycles.sort()
+    return [[ids[i] for i in cycle] for cycle in cycles]
@@ -0,0 +1,210 @@
+# workflows/graph_save.py
+import logging
+from collections import Counter
+from typing import Dict, List
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from InnoFlow.ai_integration.node_port_inntegration import sync_node_ports
+from .graph import find_cycles
+from .models import Node, NodeConnection, Workflow
+from .node_types import NodeTypeRegistry
+
+logger = logging.getLogger(__name__)
+
+# Node fields the editor may set
+NODE_FIELDS = ['type', 'config', 'order', 'is_enabled', 'max_retries']
+
+
+def get_port_definitions(node_type: str) -> List:
+    """Port definitions of a registered node type, empty for unregistered types"""
+    definition = NodeTypeRegistry.get_all_node_types().get(node_type)
+    return list(definition.ports) if definition else []
+
+
+def _resolve_nodes(workflow: Workflow, nodes: List[Dict], existing: Dict, errors: List[str]):
+    """
+    Match submitted nodes against the stored ones
+
+    Existing nodes can be referenced by their id and by an optional ``key``.
+
+    Returns:
+        (nodes by key, nodes to create, nodes to update, updated fields,
+        ids of retyped nodes)
+    """
+    by_key = {}
+    resolved = []
+    to_create = []
+    to_update = []
+    updated_fields = set()
+    retyped = set()
+
+    for data in nodes:
+        if not isinstance(data, dict):
+            errors.append("Each node must be an object")
+            continue
+
+        node_id = data.get('id')
+        if node_id is not None:
+            node = existing.get(node_id)
+            if node is None:
+                errors.append(f"Node {node_id} does not belong to workflow {workflow.id}")
+                continue
+            changed = [field for field in NODE_FIELDS if field in data and getattr(node, field) != data[field]]
+            for field in changed:
+                setattr(node, field, data[field])
+            if changed:
+                to_update.append(node)
+                updated_fields.update(changed)
+            if 'type' in changed:
+                retyped.add(node.id)
+            keys = {str(node_id), str(data.get('key', node_id))}
+        else:
+            node = Node(workflow=workflow, **{field: data[field] for field in NODE_FIELDS if field in data})
+            to_create.append(node)
+            keys = {str(data.get('key', ''))}
+            if keys == {''}:
+                errors.append("New nodes require a 'key' to reference them from connections")
+                continue
+
+        duplicates = keys & by_key.keys()
+        if duplicates:
+            errors.append(f"Duplicate node key '{duplicates.pop()}'")
+            continue
+        key = str(data.get('key', node_id))
+        for alias in keys:
+            by_key[alias] = node
+        resolved.append(node)
+
+        try:
+            node.clean_fields(exclude=['workflow'])
+            node.clean_definition()
+        except ValidationError as e:
+            errors.extend(f"Node {key}: {message}" for message in e.messages)
+
+    # The submitted graph is complete, so order uniqueness is checked in memory
+    orders = Counter(node.order for node in resolved if node.order is not None)
+    for order, count in orders.items():
+        if count > 1:
+            errors.append(f"Duplicate node order in workflow: {order}")
+
+    return by_key, to_create, to_update, updated_fields, retyped
+
+
+def _resolve_connections(connections: List[Dict], by_key: Dict, errors: List[str]) -> List:
+    """Map submitted connections to (source key, target key, source port, target port)"""
+    resolved = []
+    for data in connections:
+        if not isinstance(data, dict):
+            errors.append("Each connection must be an object")
+            continue
+        source_key, target_key = str(data.get('source')), str(data.get('target'))
+        source_port = data.get('source_port', 'output')
+        target_port = data.get('target_port', 'input')
+        source, target = by_key.get(source_key), by_key.get(target_key)
+        if source is None or target is None:
+            missing = source_key if source is None else target_key
+            errors.append(f"Connection references unknown node '{missing}'")
+            continue
+
+        # Port names can only be checked for registered node types
+        source_ports = get_port_definitions(source.type)
+        if source_ports and not any(p.name == source_port and p.port_type == 'output' for p in source_ports):
+            errors.append(f"Source port '{source_port}' not found on node {source_key}")
+        target_ports = get_port_definitions(target.type)
+        if target_ports and not any(p.name == target_port and p.port_type == 'input' for p in target_ports):
+            errors.append(f"Target port '{target_port}' not found on node {target_key}")
+
+        resolved.append((source_key, target_key, source_port, target_port))
+
+    # Cycles are checked on node identities since one node may have two keys
+    keys = {id(node): key for key, node in by_key.items()}
+    edges = [(id(by_key[source]), id(by_key[target])) for source, target, _, _ in resolved]
+    for cycle in find_cycles(list(keys), edges):
+        errors.append(f"Workflow contains a cycle: {' -> '.join(keys[node] for node in cycle)}")
+    return resolved
+
+
+def save_workflow_graph(workflow: Workflow, nodes: List[Dict], connections: List[Dict]) -> Dict:
+    """
+    Replace the graph of a workflow with the submitted one in a single transaction
+
+    Existing nodes are referenced by ``id``, new nodes by a client ``key``;
+    connections reference nodes by either. Stored nodes and connections that
+    are not submitted are deleted. Changes are written with a constant number
+    of bulk queries regardless of graph size.
+
+    Args:
+        workflow: The workflow to update
+        nodes: Node objects with ``id`` or ``key`` and the fields in NODE_FIELDS
+        connections: Objects with ``source``, ``target`` and optional ports
+
+    Returns:
+        Counts of the applied changes and the ids assigned to node keys
+
+    Raises:
+        ValidationError: With every problem found; nothing is written
+    """
+    if not isinstance(nodes, list) or not isinstance(connections, list):
+        raise ValidationError("'nodes' and 'connections' must be lists")
+
+    with transaction.atomic():
+        existing = {node.id: node for node in Node.objects.select_for_update().filter(workflow=workflow)}
+        errors = []
+        by_key, to_create, to_update, updated_fields, retyped = _resolve_nodes(workflow, nodes, existing, errors)
+        resolved = _resolve_connections(connections, by_key, errors)
+        if errors:
+            raise ValidationError(errors)
+
+        kept_ids = {node.id for node in by_key.values()}
+        stale_ids = [node_id for node_id in existing if node_id not in kept_ids]
+        if stale_ids:
+            # Cascades to their connections and ports
+            Node.objects.filter(id__in=stale_ids).delete()
+        if to_update:
+            Node.objects.bulk_update(to_update, [f for f in NODE_FIELDS if f in updated_fields])
+        if to_create:
+            Node.objects.bulk_create(to_create)
+
+        # Ports of new and retyped nodes follow their type definition
+        sync_node_ports(to_create + [node for node in to_update if node.id in retyped])
+
+        desired = {
+            (by_key[source].id, by_key[target].id, source_port, target_port)
+            for source, target, source_port, target_port in resolved
+        }
+        stored = {}
+        for conn_id, *fields in NodeConnection.objects.filter(target_node__workflow=workflow).values_list(
+            'id', 'source_node_id', 'target_node_id', 'source_port', 'target_port'
+        ):
+            stored.setdefault(tuple(fields), []).append(conn_id)
+
+        # Duplicate stored connections collapse into one
+        stale_connections = [
+            conn_id for fields, ids in stored.items()
+            for conn_id in (ids if fields not in desired else ids[1:])
+        ]
+        if stale_connections:
+            NodeConnection.objects.filter(id__in=stale_connections).delete()
+        new_connections = [
+            NodeConnection(
+                source_node_id=source_id,
+                target_node_id=target_id,
+                source_port=source_port,
+                target_port=target_port
+            )
+            for source_id, target_id, source_port, target_port in desired - stored.keys()
+        ]
+        NodeConnection.objects.bulk_create(new_connections)
+
+        Workflow.objects.filter(id=workflow.id).update(updated_at=timezone.now())
+
+    logger.info(f"Saved graph of workflow {workflow.id}: {len(to_create)} nodes created, "
+                f"{len(to_update)} updated, {len(stale_ids)} deleted")
+    return {
+        "nodes": {"created": len(to_create), "updated": len(to_update), "deleted": len(stale_ids)},
+        "connections": {"created": len(new_connections), "deleted": len(stale_connections)},
+        "node_ids": {key: node.id for key, node in by_key.items()},
+    }
@@ -0,0 +1,149 @@
+# workflows/index_storage.py
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+from django.conf import settings
+
+from .retry import NonRetryableNodeError
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; writers in several processes are then not serialized
+    fcntl = None
+
+# On-disk layout shared by the retrieval indexes: one directory per index
+# under WORKFLOW_INDEX_ROOT/<kind>/<name>, a JSON manifest written
+# atomically, and immutable segment files that are memory-mapped on open.
+
+INDEX_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,99}$')
+LOCK = '.lock'
+
+
+def get_index_directory(kind: str, name: str) -> Path:
+    """Directory of a named index; names are restricted so they cannot escape the root"""
+    if not isinstance(name, str) or not INDEX_NAME_PATTERN.match(name) or '..' in name:
+        raise NonRetryableNodeError(f"Invalid index name: {name!r}")
+    root = getattr(settings, 'WORKFLOW_INDEX_ROOT', None) or Path(settings.MEDIA_ROOT) / 'indexes'
+    return Path(root) / kind / name
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False):
+    """
+    Lock held across processes on ``path``: exclusive while files are
+    rewritten, shared while readers need them to stay consistent
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def write_json(path: Path, data) -> None:
+    """Write JSON so readers see either the old or the new file, never a partial one"""
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as output:
+        json.dump(data, output)
+    os.replace(temporary, path)
+
+
+def read_json(path: Path, default=None):
+    if not path.exists():
+        return default
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def save_array(path: Path, array: np.ndarray) -> None:
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'wb') as output:
+        np.save(output, array)
+    os.replace(temporary, path)
+
+
+def write_records(path: Path, records: Iterable) -> np.ndarray:
+    """
+    Write records as JSON lines
+
+    Returns:
+        Byte offset of every record, for random access with RecordFile
+    """
+    offsets = []
+    position = 0
+    with open(path, 'wb') as output:
+        for record in records:
+            line = json.dumps(record, default=str).encode('utf-8') + b'\n'
+            offsets.append(position)
+            output.write(line)
+            position += len(line)
+    return np.asarray(offsets, dtype=np.int64)
+
+
+class RecordFile:
+    """
+    JSON-lines file read one record at a time through memory-mapped offsets
+
+    The file is kept open, like the memory-mapped arrays next to it, so
+    searches of an older snapshot still read it after a save has replaced
+    and unlinked it.
+    """
+    def __init__(self, path: Path, offsets_path: Path):
+        self.path = path
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self.source = open(path, 'rb')
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, row: int):
+        return self.get_many([row])[0]
+
+    def get_many(self, rows: List[int]) -> List:
+        records = []
+        with self._lock:
+            for row in rows:
+                self.source.seek(int(self.offsets[row]))
+                records.append(json.loads(self.source.readline()))
+        return records
+
+    def __iter__(self):
+        for start in range(0, len(self), 1024):
+            yield from self.get_many(range(start, min(start + 1024, len(self))))
+
+    def __del__(self):
+        source = getattr(self, 'source', None)
+        if source is not None:
+            source.close()
+
+
+def document_id(item: Dict) -> str:
+    """
+    Stable id of an indexed chunk
+
+    Chunks keep their position in their source (so re-ingesting an updated
+    file replaces its chunks); other items are identified by their text.
+    """
+    if item.get('id') is not None:
+        return str(item['id'])
+    metadata = item.get('metadata') or {}
+    if metadata.get('source') is not None and metadata.get('chunk') is not None:
+        return f"{metadata['source']}#{metadata['chunk']}"
+    return hashlib.sha256(str(item.get('text', '')).encode('utf-8')).hexdigest()
+
+
+def get_payload(item: Dict) -> Dict:
+    """The part of an indexed item returned with search results"""
+    return {'text': item.get('text', ''), 'metadata': item.get('metadata') or {}}
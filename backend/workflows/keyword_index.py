@@ -0,0 +1,591 @@
+# workflows/keyword_index.py
+import itertools
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .index_storage import (
+    LOCK, RecordFile, document_id, file_lock, get_index_directory, get_payload, read_json, save_array,
+    write_json, write_records
+)
+from .retry import NonRetryableNodeError
+from .streams import LazyStream, get_stream_input
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+# Postings are decoded in blocks of this many entries when only some of
+# their documents are needed
+POSTINGS_BLOCK = 128
+MANIFEST = 'index.json'
+OPERATIONS = ('upsert', 'search', 'delete')
+UPSERT_BATCH_SIZE = 1024
+SEGMENT_ARRAYS = ('vocabulary', 'offsets', 'deltas', 'tfs', 'block_offsets', 'block_last', 'max_tf', 'lengths')
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercased word terms of a text"""
+    return [term[:MAX_TERM_LENGTH] for term in TOKEN_PATTERN.findall(text.lower())]
+
+
+def smallest_uint(values: np.ndarray) -> np.ndarray:
+    """Store non-negative integers in the narrowest unsigned dtype that holds them"""
+    return values.astype(np.min_scalar_type(int(values.max()) if values.size else 0))
+
+
+def decode_runs(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Prefix sums restarting at every run, for runs of ``counts`` entries at ``starts``"""
+    sums = np.cumsum(values, dtype=np.int64)
+    before = np.where(starts > 0, sums[np.maximum(starts - 1, 0)], 0) if sums.size else sums
+    return sums - np.repeat(before, counts)
+
+
+def pack_postings(vocabulary: np.ndarray, term_ids: np.ndarray, docs: np.ndarray, tfs: np.ndarray,
+                  lengths: np.ndarray, ids: List[str], payloads) -> 'KeywordSegment':
+    """
+    Build a segment from (term, doc, tf) entries sorted by term, then doc
+
+    Doc ids of each postings list are stored as gaps from the previous doc,
+    in the narrowest dtype that fits. The last doc of every block of
+    POSTINGS_BLOCK entries is kept as a skip pointer.
+    """
+    # Drop terms left without postings (by deletes during a merge)
+    used, term_ids = np.unique(term_ids, return_inverse=True)
+    vocabulary = vocabulary[used]
+    counts = np.bincount(term_ids, minlength=len(vocabulary))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    starts = offsets[:-1]
+
+    deltas = np.diff(docs, prepend=0)
+    deltas[starts[counts > 0]] = docs[starts[counts > 0]]
+
+    position = np.arange(len(docs)) - np.repeat(starts, counts)
+    block_end = ((position + 1) % POSTINGS_BLOCK == 0) | (position == np.repeat(counts, counts) - 1)
+    block_counts = -(-counts // POSTINGS_BLOCK)
+    block_offsets = np.concatenate([[0], np.cumsum(block_counts)]).astype(np.int64)
+    max_tf = np.maximum.reduceat(tfs, starts) if len(docs) else np.zeros(0, dtype=np.int64)
+
+    arrays = {
+        'vocabulary': vocabulary,
+        'offsets': offsets,
+        'deltas': smallest_uint(deltas),
+        'tfs': smallest_uint(tfs),
+        'block_offsets': block_offsets,
+        'block_last': smallest_uint(docs[block_end]),
+        'max_tf': smallest_uint(max_tf),
+        'lengths': smallest_uint(lengths),
+    }
+    return KeywordSegment(arrays, list(ids), payloads)
+
+
+def build_segment(documents: List[Tuple[str, Counter, Dict]]) -> 'KeywordSegment':
+    """Build an in-memory segment from (id, term counts, payload) documents"""
+    vocabulary = {}
+    term_ids, docs, tfs = [], [], []
+    for doc, (_, counts, _) in enumerate(documents):
+        for term, tf in counts.items():
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            docs.append(doc)
+            tfs.append(tf)
+    terms = np.array(list(vocabulary), dtype=str)
+    order = np.argsort(terms, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    term_ids = rank[np.asarray(term_ids, dtype=np.int64)]
+    docs = np.asarray(docs, dtype=np.int64)
+    entries = np.lexsort((docs, term_ids))
+    lengths = np.array([sum(counts.values()) for _, counts, _ in documents], dtype=np.int64)
+    return pack_postings(
+        terms[order], term_ids[entries], docs[entries], np.asarray(tfs, dtype=np.int64)[entries],
+        lengths, [doc_id for doc_id, _, _ in documents], [payload for _, _, payload in documents]
+    )
+
+
+def merge_segments(segments: List['KeywordSegment'], keeps: List[np.ndarray]) -> 'KeywordSegment':
+    """Merge segments into one, dropping the documents not kept"""
+    vocabulary = np.unique(np.concatenate([segment.vocabulary for segment in segments]))
+    all_terms, all_docs, all_tfs, all_lengths, ids, payloads = [], [], [], [], [], []
+    doc_offset = 0
+    for segment, keep in zip(segments, keeps):
+        counts = np.diff(segment.offsets)
+        terms = np.repeat(np.searchsorted(vocabulary, segment.vocabulary), counts)
+        docs = decode_runs(segment.deltas, segment.offsets[:-1], counts)
+        renumbered = np.cumsum(keep) - 1 + doc_offset
+        kept = keep[docs]
+        all_terms.append(terms[kept])
+        all_docs.append(renumbered[docs[kept]])
+        all_tfs.append(np.asarray(segment.tfs, dtype=np.int64)[kept])
+        all_lengths.append(np.asarray(segment.lengths, dtype=np.int64)[keep])
+        ids.extend(doc_id for doc_id, kept_doc in zip(segment.ids, keep) if kept_doc)
+        payloads.append(payload for payload, kept_doc in zip(segment.payloads, keep) if kept_doc)
+        doc_offset += int(keep.sum())
+
+    terms = np.concatenate(all_terms)
+    docs = np.concatenate(all_docs)
+    entries = np.lexsort((docs, terms))
+    return pack_postings(
+        vocabulary, terms[entries], docs[entries], np.concatenate(all_tfs)[entries],
+        np.concatenate(all_lengths), ids, itertools.chain.from_iterable(payloads)
+    )
+
+
+class KeywordSegment:
+    """
+    Inverted index over a group of documents
+
+    The vocabulary is a sorted string array, so terms are looked up with a
+    binary search and saved segments need no per-term objects in memory.
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray], ids: List[str], payloads, name: str = None):
+        for key in SEGMENT_ARRAYS:
+            setattr(self, key, arrays[key])
+        self.ids = ids
+        self.payloads = payloads
+        self.name = name
+        self.size = len(self.lengths)
+        self.total_length = int(np.asarray(self.lengths, dtype=np.int64).sum())
+        self.min_length = int(self.lengths.min()) if self.size else 0
+
+    @property
+    def saved(self) -> bool:
+        return self.name is not None
+
+    def term_index(self, term: str) -> Optional[int]:
+        position = int(np.searchsorted(self.vocabulary, term))
+        if position < len(self.vocabulary) and self.vocabulary[position] == term:
+            return position
+        return None
+
+    def df(self, term: str) -> int:
+        t = self.term_index(term)
+        return 0 if t is None else int(self.offsets[t + 1] - self.offsets[t])
+
+    def postings(self, t: int) -> Tuple[np.ndarray, np.ndarray]:
+        """All (docs, tfs) of a term"""
+        start, end = self.offsets[t], self.offsets[t + 1]
+        return np.cumsum(self.deltas[start:end], dtype=np.int64), self.tfs[start:end]
+
+    def lookup(self, t: int, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Which sorted candidate docs contain a term, and their tfs
+
+        Only the postings blocks that may hold a candidate are decoded.
+        """
+        start, end = self.offsets[t], self.offsets[t + 1]
+        block_last = np.asarray(self.block_last[self.block_offsets[t]:self.block_offsets[t + 1]], dtype=np.int64)
+        blocks = np.searchsorted(block_last, candidates)
+        blocks = np.unique(blocks[blocks < len(block_last)])
+        if not blocks.size:
+            return np.zeros(len(candidates), dtype=bool), np.zeros(0, dtype=np.int64)
+
+        block_starts = start + blocks * POSTINGS_BLOCK
+        block_counts = np.minimum(block_starts + POSTINGS_BLOCK, end) - block_starts
+        run_starts = np.concatenate([[0], np.cumsum(block_counts)[:-1]])
+        entries = np.repeat(block_starts - run_starts, block_counts) + np.arange(block_counts.sum())
+        bases = np.where(blocks > 0, block_last[np.maximum(blocks - 1, 0)], 0)
+        docs = np.repeat(bases, block_counts) + decode_runs(self.deltas[entries], run_starts, block_counts)
+
+        positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+        matched = docs[positions] == candidates
+        return matched, self.tfs[entries][positions[matched]]
+
+    def search(self, terms: List[str], idfs: List[float], avgdl: float, k: int, theta: float,
+               dead: np.ndarray, k1: float, b: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k docs of this segment by BM25, with MaxScore pruning
+
+        Terms are scored in order of their score upper bound. Once the bounds
+        of the remaining terms add up to no more than the k-th best score
+        (``theta``, starting from the best of earlier segments), documents
+        matching only those terms cannot reach the top k: the remaining
+        terms only update existing candidates, through skip pointers,
+        and candidates that can no longer reach ``theta`` are dropped.
+        """
+        lengths = self.lengths
+        norm = k1 * (1 - b + b * self.min_length / avgdl)
+        scored = []
+        for term, idf in zip(terms, idfs):
+            t = self.term_index(term)
+            if t is not None:
+                max_tf = float(self.max_tf[t])
+                scored.append((idf * (k1 + 1) * max_tf / (max_tf + norm), t, idf))
+        if not scored:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        scored.sort(reverse=True)
+        remaining = np.cumsum([bound for bound, _, _ in scored][::-1])[::-1].tolist() + [0.0]
+
+        def bm25(idf, tfs, docs):
+            tfs = np.asarray(tfs, dtype=np.float32)
+            return idf * tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * lengths[docs] / avgdl))
+
+        dead_docs = np.flatnonzero(dead)
+        scores = np.zeros(self.size, dtype=np.float32)
+        candidates = None
+        for i, (_, t, idf) in enumerate(scored):
+            if candidates is None:
+                # Any document of this term's postings may still reach the top k
+                docs, tfs = self.postings(t)
+                scores[docs] += bm25(idf, tfs, docs)
+                scores[dead_docs] = 0
+                if remaining[i + 1] > theta and self.size >= k:
+                    # Partial scores are lower bounds of final scores
+                    theta = max(theta, float(np.partition(scores, -k)[-k]))
+                if remaining[i + 1] <= theta:
+                    candidates = np.flatnonzero(scores)
+            else:
+                candidates = candidates[scores[candidates] + remaining[i] > theta]
+                if not candidates.size:
+                    break
+                matched, tfs = self.lookup(t, candidates)
+                docs = candidates[matched]
+                scores[docs] += bm25(idf, tfs, docs)
+
+        if candidates is None:
+            candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        return candidates, scores[candidates]
+
+    def get_payloads(self, rows: List[int]) -> List[Dict]:
+        if isinstance(self.payloads, RecordFile):
+            return self.payloads.get_many(rows)
+        return [self.payloads[row] for row in rows]
+
+    def write(self, directory: Path, name: str) -> 'KeywordSegment':
+        """Save the segment and return it reopened from disk"""
+        for key in SEGMENT_ARRAYS:
+            save_array(directory / f'{name}.{key}.npy', np.asarray(getattr(self, key)))
+        offsets = write_records(directory / f'{name}.payloads.jsonl', self.payloads)
+        save_array(directory / f'{name}.payload_offsets.npy', offsets)
+        write_json(directory / f'{name}.ids.json', self.ids)
+        return KeywordSegment.open(directory, name)
+
+    @classmethod
+    def open(cls, directory: Path, name: str) -> 'KeywordSegment':
+        arrays = {key: np.load(directory / f'{name}.{key}.npy', mmap_mode='r') for key in SEGMENT_ARRAYS}
+        payloads = RecordFile(directory / f'{name}.payloads.jsonl', directory / f'{name}.payload_offsets.npy')
+        return cls(arrays, read_json(directory / f'{name}.ids.json', []), payloads, name)
+
+
+class KeywordIndex:
+    """
+    BM25 keyword index made of immutable segments.
+
+    Added documents are buffered and turned into an in-memory segment on the
+    next search or save; saving writes it to disk, where segments are
+    memory-mapped. Replaced and deleted documents are tombstoned; merges of
+    the newest segments past WORKFLOW_KEYWORD_MAX_SEGMENTS, and compaction
+    once WORKFLOW_KEYWORD_COMPACT_RATIO of the rows are tombstones, drop
+    them. Document frequencies count tombstoned rows until they are merged
+    away.
+
+    Writers in every process hold the index's file lock from reopening it to
+    saving it (see ``keyword_index_writer``); readers in other processes
+    reopen it when its manifest changes.
+    """
+    def __init__(self, directory: Path = None):
+        self.directory = directory
+        self.k1 = getattr(settings, 'WORKFLOW_BM25_K1', 1.2)
+        self.b = getattr(settings, 'WORKFLOW_BM25_B', 0.75)
+        self.max_segments = getattr(settings, 'WORKFLOW_KEYWORD_MAX_SEGMENTS', 8)
+        self.compact_ratio = getattr(settings, 'WORKFLOW_KEYWORD_COMPACT_RATIO', 0.25)
+        self.segments: List[KeywordSegment] = []
+        self.deleted = np.zeros(0, dtype=bool)
+        self.id_rows: Dict[str, int] = {}
+        self.saved_mtime = None
+        self._pending: List[Tuple[str, Counter, Dict]] = []
+        self._next_segment = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.id_rows)
+
+    @property
+    def size(self) -> int:
+        """Rows stored, including tombstoned and buffered ones"""
+        return sum(segment.size for segment in self.segments) + len(self._pending)
+
+    def add(self, ids: List[str], texts: List[str], payloads: List[Dict] = None) -> None:
+        """Add documents, replacing documents with the same ids"""
+        payloads = payloads if payloads is not None else [{'text': text} for text in texts]
+        documents = [(doc_id, Counter(analyze(text)), payload) for doc_id, text, payload in zip(ids, texts, payloads)]
+        with self._lock:
+            start = self.size
+            self._pending.extend(documents)
+            self.deleted = np.concatenate([self.deleted, np.zeros(len(documents), dtype=bool)])
+            for row, doc_id in enumerate(ids, start):
+                previous = self.id_rows.get(doc_id)
+                if previous is not None:
+                    self.deleted[previous] = True
+                self.id_rows[doc_id] = row
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Tombstone documents by id; returns the number of documents deleted"""
+        deleted = 0
+        with self._lock:
+            for doc_id in ids:
+                row = self.id_rows.pop(doc_id, None)
+                if row is not None:
+                    self.deleted[row] = True
+                    deleted += 1
+        return deleted
+
+    def _flush(self) -> None:
+        if self._pending:
+            self.segments.append(build_segment(self._pending))
+            self._pending = []
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        """
+        Documents best matching a query by BM25
+
+        Returns:
+            [{"id", "score", "text", "metadata"}], best first
+        """
+        terms = sorted(set(analyze(query)))
+        with self._lock:
+            self._flush()
+            segments = list(self.segments)
+            deleted = self.deleted
+        rows = sum(segment.size for segment in segments)
+        if not terms or not rows or k <= 0:
+            return []
+
+        avgdl = max(sum(segment.total_length for segment in segments) / rows, 1e-9)
+        idfs = []
+        for term in terms:
+            df = sum(segment.df(term) for segment in segments)
+            idfs.append(math.log(1 + (rows - df + 0.5) / (df + 0.5)))
+
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        theta = 0.0
+        offset = 0
+        for segment in segments:
+            docs, scores = segment.search(
+                terms, idfs, avgdl, k, theta, deleted[offset:offset + segment.size], self.k1, self.b
+            )
+            best_rows = np.concatenate([best_rows, docs + offset])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+            if len(best_scores) == k:
+                theta = float(best_scores.min())
+            offset += segment.size
+
+        order = np.argsort(-best_scores, kind='stable')
+        return self._resolve(segments, best_rows[order], best_scores[order])
+
+    @staticmethod
+    def _resolve(segments, rows: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        bounds = np.cumsum([0] + [segment.size for segment in segments])
+        located = {}
+        for position, row in enumerate(rows.tolist()):
+            index = int(np.searchsorted(bounds, row, side='right')) - 1
+            located.setdefault(index, []).append((position, row - int(bounds[index])))
+        results = [None] * len(rows)
+        for index, entries in located.items():
+            segment = segments[index]
+            payloads = segment.get_payloads([local for _, local in entries])
+            for (position, local), payload in zip(entries, payloads):
+                results[position] = {'id': segment.ids[local], 'score': float(scores[position]), **payload}
+        return results
+
+    def _segment_name(self) -> str:
+        name = f'segment-{self._next_segment:06d}'
+        self._next_segment += 1
+        return name
+
+    def _merge(self, start: int) -> None:
+        """Merge segments from ``start`` on into one, dropping their tombstones"""
+        offset = sum(segment.size for segment in self.segments[:start])
+        keeps = []
+        position = offset
+        for segment in self.segments[start:]:
+            keeps.append(~self.deleted[position:position + segment.size])
+            position += segment.size
+        kept = int(sum(keep.sum() for keep in keeps))
+        if kept:
+            merged = merge_segments(self.segments[start:], keeps).write(self.directory, self._segment_name())
+            self.segments[start:] = [merged]
+        else:
+            del self.segments[start:]
+        self.deleted = np.concatenate([self.deleted[:offset], np.zeros(kept, dtype=bool)])
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self.id_rows = {}
+        row = 0
+        for segment in self.segments:
+            for doc_id in segment.ids:
+                if not self.deleted[row]:
+                    self.id_rows[doc_id] = row
+                row += 1
+
+    def compact(self) -> None:
+        """Rewrite the index as one segment without tombstoned documents"""
+        with self._lock:
+            self._flush()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._merge(0)
+            self.save()
+
+    def save(self) -> None:
+        """Write buffered documents as a new segment, merge, and update the manifest"""
+        with self._lock:
+            self._flush()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for position, segment in enumerate(self.segments):
+                if not segment.saved:
+                    self.segments[position] = segment.write(self.directory, self._segment_name())
+            if self.size and self.deleted.sum() > self.compact_ratio * self.size:
+                self._merge(0)
+            elif len(self.segments) > self.max_segments:
+                self._merge(self.max_segments - 1)
+            save_array(self.directory / 'deleted.npy', self.deleted)
+            manifest_path = self.directory / MANIFEST
+            write_json(manifest_path, {
+                'segments': [segment.name for segment in self.segments],
+                'next_segment': self._next_segment,
+            })
+            self.saved_mtime = manifest_path.stat().st_mtime_ns
+            names = {segment.name for segment in self.segments}
+            for path in self.directory.glob('segment-*'):
+                if path.name.split('.')[0] not in names:
+                    # Snapshots still searching the file keep it open until they are dropped
+                    path.unlink(missing_ok=True)
+
+    @classmethod
+    def open(cls, directory: Path) -> Optional['KeywordIndex']:
+        """Open a saved index with its segments memory-mapped, or None if there is none"""
+        manifest_path = directory / MANIFEST
+        manifest = read_json(manifest_path)
+        if manifest is None:
+            return None
+        index = cls(directory)
+        index.segments = [KeywordSegment.open(directory, name) for name in manifest['segments']]
+        index._next_segment = manifest['next_segment']
+        deleted_path = directory / 'deleted.npy'
+        index.deleted = np.load(deleted_path) if deleted_path.exists() else np.zeros(index.size, dtype=bool)
+        index._reindex()
+        index.saved_mtime = manifest_path.stat().st_mtime_ns
+        return index
+
+
+_indexes: Dict[str, KeywordIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_keyword_index(name: str, create: bool = False) -> Optional[KeywordIndex]:
+    """
+    Process-wide KeywordIndex by name, reopened when another process saved it
+
+    Returns None for unknown names unless ``create`` is set.
+    """
+    directory = get_index_directory('keywords', name)
+    manifest_path = directory / MANIFEST
+    with _indexes_lock:
+        mtime = manifest_path.stat().st_mtime_ns if manifest_path.exists() else None
+        index = _indexes.get(str(directory))
+        if index is not None and index.saved_mtime == mtime:
+            return index
+        index = KeywordIndex.open(directory) if mtime is not None else None
+        if index is None:
+            if not create:
+                return None
+            index = KeywordIndex(directory)
+        _indexes[str(directory)] = index
+        return index
+
+
+@contextmanager
+def keyword_index_writer(name: str):
+    """
+    Hold a keyword index's file lock across processes while it is changed
+
+    Open the index with ``get_keyword_index`` inside the block, so changes
+    saved by another process are loaded first, and save it before leaving.
+    """
+    with file_lock(get_index_directory('keywords', name) / LOCK):
+        yield
+
+
+def get_query_text(value) -> str:
+    """Query text from a node input: text, an item with text, or a stream of one"""
+    if isinstance(value, LazyStream):
+        value = next(iter(value), None)
+    if isinstance(value, dict):
+        value = value.get('text')
+    if not isinstance(value, str) or not value.strip():
+        raise NonRetryableNodeError("Keyword search requires query text as input")
+    return value
+
+
+def run_keyword_search(config: Dict, input_data=None):
+    """
+    keyword_search node: upsert chunks into, delete ids from, or search a
+    named BM25 index
+    """
+    name = config.get('index')
+    operation = config.get('operation', 'search')
+    if operation not in OPERATIONS:
+        raise NonRetryableNodeError(f"Unknown keyword search operation: {operation}")
+
+    if operation == 'search':
+        if isinstance(input_data, dict):
+            value = input_data.get('query', input_data.get('input'))
+        else:
+            value = input_data
+        query = get_query_text(value)
+        index = get_keyword_index(name)
+        if index is None:
+            raise NonRetryableNodeError(f"Keyword index {name} does not exist")
+        return index.search(query, int(config.get('top_k', 5)))
+
+    items = get_stream_input(input_data)
+    if items is None:
+        raise NonRetryableNodeError(f"Keyword search {operation} requires items as input")
+
+    with keyword_index_writer(name):
+        if operation == 'delete':
+            return delete_keywords(name, items)
+        return upsert_keywords(name, items)
+
+
+def delete_keywords(name: str, items: Iterable) -> Dict:
+    index = get_keyword_index(name)
+    if index is None:
+        return {'index': name, 'deleted': 0, 'size': 0}
+    ids = [document_id(item) if isinstance(item, dict) else str(item) for item in items]
+    deleted = index.delete(ids)
+    index.save()
+    return {'index': name, 'deleted': deleted, 'size': len(index)}
+
+
+def upsert_keywords(name: str, items: Iterable) -> Dict:
+    index = get_keyword_index(name, create=True)
+    upserted = 0
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, UPSERT_BATCH_SIZE))
+        if not batch:
+            break
+        batch = [item if isinstance(item, dict) else {'text': str(item)} for item in batch]
+        index.add(
+            [document_id(item) for item in batch],
+            [str(item.get('text', '')) for item in batch],
+            [get_payload(item) for item in batch]
+        )
+        upserted += len(batch)
+    index.save()
+    return {'index': name, 'upserted': upserted, 'size': len(index)}
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0006_alter_workflow_options_workflow_definition_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeExecutionResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_key', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, help_text='Execution time in seconds', null=True)),
+                ('completed_at', models.DateTimeField(auto_now=True)),
+                ('execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='node_results', to='workflows.workflowexecution')),
+            ],
+            options={
+                'unique_together': {('execution', 'node_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0007_nodeexecutionresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nodeexecutionresult',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='nodeexecutionresult',
+            name='status',
+            field=models.CharField(choices=[('completed', 'Completed'), ('retrying', 'Retrying'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+    ]
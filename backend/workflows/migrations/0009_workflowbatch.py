@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0008_nodeexecutionresult_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('concurrency', models.PositiveIntegerField(default=4)),
+                ('total_rows', models.IntegerField(default=0)),
+                ('completed_rows', models.IntegerField(default=0)),
+                ('failed_rows', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='workflows.workflow')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='workflowexecution',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='executions', to='workflows.workflowbatch'),
+        ),
+    ]
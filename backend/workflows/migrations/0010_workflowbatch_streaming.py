@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0009_workflowbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowbatch',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowbatch',
+            name='input_file',
+            field=models.FileField(blank=True, null=True, upload_to='workflow_batches/inputs/'),
+        ),
+        migrations.AddField(
+            model_name='workflowbatch',
+            name='output_file',
+            field=models.FileField(blank=True, null=True, upload_to='workflow_batches/outputs/'),
+        ),
+        migrations.AddField(
+            model_name='workflowbatch',
+            name='streaming',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:26
+
+import django.db.models.constraints
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def renumber_duplicate_orders(apps, schema_editor):
+    """Move nodes that share an order to the end of their workflow"""
+    Node = apps.get_model('workflows', 'Node')
+    duplicates = (
+        Node.objects.values('workflow_id', 'order')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in list(duplicates):
+        workflow_nodes = Node.objects.filter(workflow_id=duplicate['workflow_id'])
+        next_order = workflow_nodes.aggregate(Max('order'))['order__max'] + 1
+        for node in workflow_nodes.filter(order=duplicate['order']).order_by('id')[1:]:
+            node.order = next_order
+            node.save(update_fields=['order'])
+            next_order += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0010_workflowbatch_streaming'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicate_orders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='node',
+            constraint=models.UniqueConstraint(deferrable=django.db.models.constraints.Deferrable['DEFERRED'], fields=('workflow', 'order'), name='unique_node_order_per_workflow'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0011_node_unique_order'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nodeconnection',
+            index=models.Index(fields=['target_node', 'target_port'], name='wf_connection_target_port'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(fields=['workflow', 'status'], name='wf_execution_workflow_status'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(fields=['started_at', 'id'], name='wf_execution_started'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(condition=models.Q(('status', 'running')), fields=['started_at'], name='wf_execution_running'),
+        ),
+    ]
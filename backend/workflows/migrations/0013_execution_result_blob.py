@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionResultBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('data', models.BinaryField()),
+                ('size', models.IntegerField(help_text='Uncompressed size in bytes')),
+                ('execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_blobs', to='workflows.workflowexecution')),
+            ],
+            options={
+                'unique_together': {('execution', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0013_execution_result_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nodeexecutionresult',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0014_nodeexecutionresult_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowbatch',
+            name='output_parts',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
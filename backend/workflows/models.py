@@ -3,15 +3,31 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 import json
 from django.core.exceptions import ValidationError
+from .documents import get_text_columns
+from .prompt_templates import TemplateError, get_node_template
+from .retry import NonRetryableNodeError
 
 User = get_user_model()
 
 class Workflow(models.Model):
     name = models.CharField(max_length=100)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    description = models.TextField(blank=True, null=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workflows')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     config = models.JSONField(default=dict)
+    definition = models.JSONField(
+        default=dict,
+        help_text="ReactFlow workflow definition (nodes, edges, viewport)"
+    )
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at']),
+            models.Index(fields=['user', 'is_active']),
+        ]
 
     def __str__(self):
         return self.name
@@ -20,7 +36,14 @@ class Node(models.Model):
     VALID_NODE_TYPES = [
         'text_input',
         'openai_tts',
-        'huggingface_summarization'
+        'huggingface_summarization',
+        'document_loader',
+        'text_chunker',
+        'vector_store',
+        'keyword_search',
+        'hybrid_retriever',
+        'embedding',
+        'prompt_template'
     ]
 
     workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='nodes')
@@ -31,10 +54,33 @@ class Node(models.Model):
     retry_count = models.IntegerField(default=0)
     max_retries = models.IntegerField(default=3)
 
+    # Fields internal code updates without re-validating the node
+    TRUSTED_UPDATE_FIELDS = {'retry_count', 'max_retries', 'is_enabled'}
+
+    class Meta:
+        constraints = [
+            # Deferred so that reordering nodes within a transaction may pass
+            # through intermediate duplicates
+            models.UniqueConstraint(
+                fields=['workflow', 'order'],
+                name='unique_node_order_per_workflow',
+                deferrable=models.Deferrable.DEFERRED,
+            ),
+        ]
+
     def __str__(self):
         return f'{self.type} (Workflow: {self.workflow.name})'
     
     def clean(self):
+        self.clean_definition()
+
+    def unique_error_message(self, model_class, unique_check):
+        if tuple(unique_check) == ('workflow', 'order'):
+            return ValidationError("Duplicate node order in workflow", code='unique_together')
+        return super().unique_error_message(model_class, unique_check)
+
+    def clean_definition(self):
+        """Validate the node type and config without touching the database"""
         if self.type not in self.VALID_NODE_TYPES:
             raise ValidationError(f"Invalid node type: {self.type}")
         
@@ -47,17 +93,100 @@ class Node(models.Model):
             
         if self.type == 'text_input' and 'text' not in self.config:
             raise ValidationError("Text input nodes require a text configuration")
-        
-        if Node.objects.exclude(id=self.id).filter(
-            workflow=self.workflow,
-            order=self.order
-        ).exists():
-            raise ValidationError("Duplicate node order in workflow")
-
-    def save(self, *args, **kwargs):
-        self.full_clean()
+
+        if self.type == 'document_loader':
+            if not self.config.get('path'):
+                raise ValidationError("Document loader nodes require a path configuration")
+            try:
+                get_text_columns(self.config.get('text_columns'))
+            except NonRetryableNodeError as e:
+                raise ValidationError(str(e))
+
+        if self.type == 'text_chunker':
+            chunk_size = self.config.get('chunk_size', 512)
+            chunk_overlap = self.config.get('chunk_overlap', 64)
+            if not isinstance(chunk_size, int) or chunk_size <= 0:
+                raise ValidationError("Text chunker chunk_size must be a positive integer")
+            if not isinstance(chunk_overlap, int) or not 0 <= chunk_overlap < chunk_size:
+                raise ValidationError("Text chunker chunk_overlap must be between 0 and chunk_size")
+
+        if self.type == 'vector_store':
+            if not self.config.get('index'):
+                raise ValidationError("Vector store nodes require an index configuration")
+            if self.config.get('operation', 'search') not in ('upsert', 'search', 'delete'):
+                raise ValidationError("Vector store operation must be upsert, search or delete")
+
+        if self.type == 'keyword_search':
+            if not self.config.get('index'):
+                raise ValidationError("Keyword search nodes require an index configuration")
+            if self.config.get('operation', 'search') not in ('upsert', 'search', 'delete'):
+                raise ValidationError("Keyword search operation must be upsert, search or delete")
+
+        if self.type == 'hybrid_retriever' and not (
+                self.config.get('keyword_index') or self.config.get('vector_index')):
+            raise ValidationError("Hybrid retriever nodes require a keyword_index or vector_index configuration")
+
+        if self.type == 'embedding':
+            if not (self.config.get('model_config') or self.config.get('model')):
+                raise ValidationError("Embedding nodes require a model_config or model configuration")
+            batch_size = self.config.get('batch_size')
+            if batch_size is not None and (not isinstance(batch_size, int) or batch_size <= 0):
+                raise ValidationError("Embedding batch_size must be a positive integer")
+
+        if self.type == 'prompt_template':
+            if not isinstance(self.config.get('template'), str):
+                raise ValidationError("Prompt template nodes require a template configuration")
+            try:
+                get_node_template(self.config)
+            except TemplateError as e:
+                raise ValidationError(f"Invalid prompt template: {e}")
+
+    def save(self, *args, validate=True, **kwargs):
+        """
+        Validate and save the node.
+
+        ``save(update_fields=[...])`` only validates the updated fields, and
+        updates limited to TRUSTED_UPDATE_FIELDS (or ``validate=False``) skip
+        validation entirely; the database still enforces order uniqueness.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) <= self.TRUSTED_UPDATE_FIELDS:
+            validate = False
+        if validate:
+            exclude = None
+            if update_fields is not None:
+                exclude = [f.name for f in self._meta.concrete_fields if f.name not in update_fields]
+            self.full_clean(exclude=exclude)
         super().save(*args, **kwargs)
 
+class WorkflowBatch(models.Model):
+    """A run of one workflow over many sets of input variables"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='batches')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    concurrency = models.PositiveIntegerField(default=4)
+    # Streaming batches read rows lazily from input_file and store their
+    # outputs as JSONL parts instead of creating one execution per row
+    streaming = models.BooleanField(default=False)
+    input_file = models.FileField(upload_to='workflow_batches/inputs/', null=True, blank=True)
+    output_file = models.FileField(upload_to='workflow_batches/outputs/', null=True, blank=True)
+    # Storage names of the output parts, one per chunk of rows, in row order
+    output_parts = models.JSONField(default=list, blank=True)
+    total_rows = models.IntegerField(default=0)
+    completed_rows = models.IntegerField(default=0)
+    failed_rows = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Batch of {self.workflow.name} ({self.total_rows} rows, {self.status})"
+
 class WorkflowExecution(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -73,13 +202,69 @@ class WorkflowExecution(models.Model):
     error_logs = models.TextField(null=True, blank=True)
     execution_context = models.JSONField(default=dict)  # Add this field
     variables = models.JSONField(default=dict)  # Add this field
+    batch = models.ForeignKey(WorkflowBatch, on_delete=models.CASCADE, related_name='executions', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workflow', 'status'], name='wf_execution_workflow_status'),
+            # Backs the (-started_at, -id) keyset of ExecutionCursorPagination
+            models.Index(fields=['started_at', 'id'], name='wf_execution_started'),
+            # Running executions are a small, constantly polled subset
+            models.Index(
+                fields=['started_at'],
+                name='wf_execution_running',
+                condition=models.Q(status='running'),
+            ),
+        ]
     
     def __str__(self):
         return f"Execution of {self.workflow.name} ({self.status.capitalize()})"
 
+class ExecutionResultBlob(models.Model):
+    """Compressed node output or error log stored outside the execution row"""
+    execution = models.ForeignKey(WorkflowExecution, on_delete=models.CASCADE, related_name='result_blobs')
+    key = models.CharField(max_length=100)
+    data = models.BinaryField()
+    size = models.IntegerField(help_text="Uncompressed size in bytes")
+
+    class Meta:
+        unique_together = ['execution', 'key']
+
+    def __str__(self):
+        return f"{self.key} ({self.size} bytes) of execution {self.execution_id}"
+
+class NodeExecutionResult(models.Model):
+    """Checkpoint of a single node's outcome within a workflow execution."""
+    STATUS_CHOICES = [
+        ('completed', 'Completed'),
+        ('retrying', 'Retrying'),
+        ('failed', 'Failed'),
+    ]
+    execution = models.ForeignKey(WorkflowExecution, on_delete=models.CASCADE, related_name='node_results')
+    node_key = models.CharField(max_length=100)
+    # ExecutionPlan fingerprint of the node when it ran; other fingerprints mean it was edited since
+    fingerprint = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='completed')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    duration = models.FloatField(null=True, blank=True, help_text="Execution time in seconds")
+    completed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['execution', 'node_key']
+
+    def __str__(self):
+        return f"{self.node_key} ({self.status}) in execution {self.execution_id}"
+
 class NodeConnection(models.Model):
     source_node = models.ForeignKey(Node, on_delete=models.CASCADE, related_name='outputs')
     target_node = models.ForeignKey(Node, on_delete=models.CASCADE, related_name='inputs')
     source_port = models.CharField(max_length=50, default='output')
     target_port = models.CharField(max_length=50, default='input')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['target_node', 'target_port'], name='wf_connection_target_port'),
+        ]
+
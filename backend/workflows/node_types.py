@@ -1,6 +1,7 @@
 # workflows/node_types.py
 from typing import Dict, List, Any, Optional, Union
 import json
+from .graph import has_cycle
 
 class NodeTypeRegistry:
     """Registry for available node types in the system"""
@@ -206,11 +207,163 @@ class TextOutputNode(NodeType):
         PortDefinition("input", "input", "string", False, "Text to display")
     ]
 
+@NodeTypeRegistry.register
+class DocumentLoaderNode(NodeType):
+    type_name = "document_loader"
+    category = "Input"
+    description = "Stream txt, Markdown, PDF and CSV documents from local files"
+    icon = "file"
+    
+    config_params = [
+        ConfigParam("path", "string", None, True, "File or directory inside the document roots"),
+        ConfigParam("pattern", "string", "*", False, "Glob pattern for files in a directory"),
+        ConfigParam("recursive", "boolean", True, False, "Include subdirectories"),
+        ConfigParam("encoding", "string", "utf-8", False, "Text encoding"),
+        ConfigParam("text_columns", "string", None, False, "Comma-separated CSV columns to use as text")
+    ]
+    
+    ports = [
+        PortDefinition("input", "input", "string", True, "Path overriding the configured one"),
+        PortDefinition("output", "output", "documents", False, "Stream of documents")
+    ]
+
+@NodeTypeRegistry.register
+class TextChunkerNode(NodeType):
+    type_name = "text_chunker"
+    category = "Processing"
+    description = "Split documents into overlapping token-sized chunks"
+    icon = "scissors"
+    
+    config_params = [
+        ConfigParam("chunk_size", "number", 512, True, "Tokens per chunk"),
+        ConfigParam("chunk_overlap", "number", 64, False, "Tokens shared by consecutive chunks"),
+        ConfigParam("tokenizer", "select", "auto", False, "Tokenizer used to count tokens",
+                    ["auto", "tiktoken", "regex"])
+    ]
+    
+    ports = [
+        PortDefinition("input", "input", "documents", False, "Documents or text to split"),
+        PortDefinition("output", "output", "chunks", False, "Stream of chunks")
+    ]
+
+@NodeTypeRegistry.register
+class VectorStoreNode(NodeType):
+    type_name = "vector_store"
+    category = "Retrieval"
+    description = "Store chunk embeddings and search them by similarity"
+    icon = "database"
+    
+    config_params = [
+        ConfigParam("index", "string", None, True, "Name of the vector index"),
+        ConfigParam("operation", "select", "search", True, "Operation to perform",
+                    ["upsert", "search", "delete"]),
+        ConfigParam("top_k", "number", 5, False, "Number of results to return"),
+        ConfigParam("metric", "select", "cosine", False, "Similarity metric of a new index",
+                    ["cosine", "dot"])
+    ]
+    
+    ports = [
+        PortDefinition("input", "input", "any", True, "Embedded chunks to upsert or ids to delete"),
+        PortDefinition("query", "input", "embedding", True, "Query embedding to search for"),
+        PortDefinition("output", "output", "any", False, "Search results or upsert summary")
+    ]
+
+@NodeTypeRegistry.register
+class KeywordSearchNode(NodeType):
+    type_name = "keyword_search"
+    category = "Retrieval"
+    description = "Index chunks and search them by keywords with BM25"
+    icon = "search"
+    
+    config_params = [
+        ConfigParam("index", "string", None, True, "Name of the keyword index"),
+        ConfigParam("operation", "select", "search", True, "Operation to perform",
+                    ["upsert", "search", "delete"]),
+        ConfigParam("top_k", "number", 5, False, "Number of results to return")
+    ]
+    
+    ports = [
+        PortDefinition("input", "input", "any", True, "Chunks to upsert or ids to delete"),
+        PortDefinition("query", "input", "string", True, "Query text to search for"),
+        PortDefinition("output", "output", "any", False, "Search results or upsert summary")
+    ]
+
+@NodeTypeRegistry.register
+class HybridRetrieverNode(NodeType):
+    type_name = "hybrid_retriever"
+    category = "Retrieval"
+    description = "Fuse keyword and vector search, rerank, and build a prompt context"
+    icon = "layers"
+    
+    config_params = [
+        ConfigParam("keyword_index", "string", None, False, "Name of the keyword index"),
+        ConfigParam("vector_index", "string", None, False, "Name of the vector index"),
+        ConfigParam("embedding_model_config", "number", None, False,
+                    "AI model config embedding the query when no embedding is connected"),
+        ConfigParam("embedding_model", "string", None, False, "Local Hugging Face model embedding the query"),
+        ConfigParam("candidates", "number", 50, False, "Results taken from each index"),
+        ConfigParam("rrf_k", "number", 60, False, "Reciprocal rank fusion constant"),
+        ConfigParam("rerank", "boolean", False, False, "Rerank with a local cross-encoder"),
+        ConfigParam("rerank_model", "string", None, False, "Cross-encoder model name"),
+        ConfigParam("rerank_top_n", "number", 20, False, "Fused results passed to the reranker"),
+        ConfigParam("top_k", "number", 10, False, "Results kept for the context"),
+        ConfigParam("max_context_tokens", "number", 2000, False, "Token budget of the context"),
+        ConfigParam("model_config", "number", None, False, "AI model config whose context window sizes the context"),
+        ConfigParam("prompt_reserve_tokens", "number", 256, False, "Tokens of the window left for the rest of the prompt")
+    ]
+    
+    ports = [
+        PortDefinition("query", "input", "string", False, "Query text"),
+        PortDefinition("embedding", "input", "embedding", True, "Query embedding for vector search"),
+        PortDefinition("output", "output", "context", False, "Context text with its ranked results")
+    ]
+
+@NodeTypeRegistry.register
+class EmbeddingNode(NodeType):
+    type_name = "embedding"
+    category = "Retrieval"
+    description = "Embed text or chunks, reusing cached vectors of unchanged text"
+    icon = "cpu"
+    
+    config_params = [
+        ConfigParam("model_config", "number", None, False, "AI model config of the embedding provider"),
+        ConfigParam("model", "string", None, False, "Local Hugging Face model used without a model config"),
+        ConfigParam("batch_size", "number", None, False, "Texts per provider call, capped by the provider")
+    ]
+    
+    ports = [
+        PortDefinition("input", "input", "any", False, "Text or chunks to embed"),
+        PortDefinition("output", "output", "embedding", False, "Embedded text or stream of embedded chunks")
+    ]
+
+@NodeTypeRegistry.register
+class PromptTemplateNode(NodeType):
+    type_name = "prompt_template"
+    category = "Processing"
+    description = "Render a prompt from variables, loops and conditions"
+    icon = "file-text"
+    
+    config_params = [
+        ConfigParam("template", "string", None, True, "Template with ${variables} and {% for %} / {% if %} blocks"),
+        ConfigParam("variables", "string", None, False, "Workflow variables the template may use"),
+        ConfigParam("defaults", "string", None, False, "Values of variables that are not provided")
+    ]
+    
+    ports = [
+        PortDefinition("input", "input", "any", True, "Available as ${input}"),
+        PortDefinition("context", "input", "context", True, "Retrieved context, available as ${context}"),
+        PortDefinition("query", "input", "string", True, "Available as ${query}"),
+        PortDefinition("output", "output", "string", False, "Rendered prompt")
+    ]
+
 # Function to validate a workflow structure
 def validate_workflow_structure(nodes, connections):
     """
     Validate a complete workflow structure
     
+    Runs in O(nodes + connections): nodes, node types and ports are indexed
+    once so the editor can validate large graphs on every edit.
+    
     Args:
         nodes: List of nodes in the workflow
         connections: List of connections between nodes
@@ -220,35 +373,14 @@ def validate_workflow_structure(nodes, connections):
     """
     errors = []
     
-    # Check for cycles
-    # This is a simple implementation - for a production system,
-    # you would want a more sophisticated cycle detection algorithm
-    visited = set()
-    
-    def has_cycle(node_id, path=None):
-        if path is None:
-            path = []
-        
-        if node_id in path:
-            return True
-        
-        path = path + [node_id]
-        visited.add(node_id)
-        
-        for conn in connections:
-            if conn['source_node'] == node_id:
-                if has_cycle(conn['target_node'], path):
-                    return True
-        
-        return False
-    
-    # Check each node
+    nodes_by_id = {}
     for node in nodes:
-        node_id = node['id']
-        if node_id not in visited:
-            if has_cycle(node_id):
-                errors.append(f"Workflow contains a cycle")
-                break
+        nodes_by_id.setdefault(node['id'], node)
+    
+    # Check for cycles
+    edges = [(conn['source_node'], conn['target_node']) for conn in connections]
+    if has_cycle(nodes_by_id, edges):
+        errors.append(f"Workflow contains a cycle")
     
     # Validate node configurations
     for node in nodes:
@@ -261,10 +393,19 @@ def validate_workflow_structure(nodes, connections):
         except ValueError as e:
             errors.append(str(e))
     
+    # Ports of each node type, by name
+    port_index = {}
+    
+    def get_ports(type_name):
+        if type_name not in port_index:
+            node_type = NodeTypeRegistry.get_all_node_types().get(type_name)
+            port_index[type_name] = {p.name: p for p in reversed(node_type.ports)} if node_type else None
+        return port_index[type_name]
+    
     # Validate connections
     for conn in connections:
-        source_node = next((n for n in nodes if n['id'] == conn['source_node']), None)
-        target_node = next((n for n in nodes if n['id'] == conn['target_node']), None)
+        source_node = nodes_by_id.get(conn['source_node'])
+        target_node = nodes_by_id.get(conn['target_node'])
         
         if not source_node:
             errors.append(f"Connection references non-existent source node {conn['source_node']}")
@@ -274,12 +415,15 @@ def validate_workflow_structure(nodes, connections):
             errors.append(f"Connection references non-existent target node {conn['target_node']}")
             continue
         
-        # Validate port existence
-        source_type = NodeTypeRegistry.get_node_type(source_node['type'])
-        target_type = NodeTypeRegistry.get_node_type(target_node['type'])
+        # Unknown node types are already reported above
+        source_ports = get_ports(source_node['type'])
+        target_ports = get_ports(target_node['type'])
+        if source_ports is None or target_ports is None:
+            continue
         
-        source_port = next((p for p in source_type.ports if p.name == conn['source_port']), None)
-        target_port = next((p for p in target_type.ports if p.name == conn['target_port']), None)
+        # Validate port existence
+        source_port = source_ports.get(conn['source_port'])
+        target_port = target_ports.get(conn['target_port'])
         
         if not source_port:
             errors.append(f"Connection references non-existent port {conn['source_port']} on source node")
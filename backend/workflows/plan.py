@@ -0,0 +1,179 @@
+# workflows/plan.py
+import hashlib
+import json
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from django.core.exceptions import ValidationError
+
+from .graph import find_cycles, topological_order
+from .models import Workflow, Node, NodeConnection
+
+
+class PlanNode:
+    """In-memory stand-in for a Node row, compiled from a workflow definition"""
+    __slots__ = ('id', 'type', 'config', 'order', 'max_retries')
+
+    def __init__(self, node_id: str, node_type: str, config: Dict, order: int, max_retries: int = 3):
+        self.id = node_id
+        self.type = node_type
+        self.config = config
+        self.order = order
+        self.max_retries = max_retries
+
+    def __repr__(self):
+        return f"PlanNode({self.id!r}, {self.type!r})"
+
+
+# Where an execution's plan is compiled from, kept in its execution_context
+PLAN_SOURCES = ('nodes', 'definition')
+
+# Keys the flow editor puts in a node's data that are not node settings
+EDITOR_DATA_KEYS = {'label', 'name', 'type', 'description', 'node_type', 'is_enabled', 'max_retries'}
+
+
+def get_definition_node_type(node: Dict) -> str:
+    """Backend node type of a ReactFlow node ("text-input" -> "text_input")"""
+    data = node.get('data') or {}
+    return str(data.get('node_type') or node.get('type') or '').replace('-', '_')
+
+
+def get_definition_node_config(node: Dict) -> Dict:
+    """
+    Config of a ReactFlow node: ``data.config`` when present, otherwise the
+    settings the flow editor keeps directly in ``data`` (``data.text``,
+    ``data.model``, ...)
+    """
+    data = node.get('data') or {}
+    if 'config' in data:
+        return data['config'] or {}
+    return {key: value for key, value in data.items() if key not in EDITOR_DATA_KEYS}
+
+
+class ExecutionPlan:
+    """
+    Compiled, read-only view of a workflow graph.
+
+    Loads the nodes and their connections once so that executors (and every
+    row of a batch) can resolve node inputs without further queries.
+    """
+    def __init__(self, nodes: List, connections: List[Tuple]):
+        self.nodes = list(nodes)
+        self.nodes_by_id = {node.id: node for node in self.nodes}
+        # target node id -> [(source node id, target port)]
+        self.inputs: Dict = defaultdict(list)
+        for source_id, target_id, target_port in connections:
+            self.inputs[target_id].append((source_id, target_port))
+        self.fingerprints = self.get_fingerprints()
+
+    def get_fingerprints(self) -> Dict:
+        """
+        Hash of each node's type, config and upstream fingerprints, by node id
+
+        A node's fingerprint changes when it or any node feeding it is edited,
+        so checkpoints saved under another fingerprint are stale.
+        """
+        fingerprints = {}
+        for node in self.nodes:
+            upstream = sorted(
+                (target_port, fingerprints.get(source_id, ''))
+                for source_id, target_port in self.inputs.get(node.id, ())
+            )
+            payload = json.dumps([node.type, node.config, upstream], sort_keys=True, default=str)
+            fingerprints[node.id] = hashlib.sha256(payload.encode()).hexdigest()
+        return fingerprints
+
+    @classmethod
+    def for_workflow(cls, workflow: Workflow) -> 'ExecutionPlan':
+        """Compile the plan of a workflow from its Node and NodeConnection rows"""
+        nodes = workflow.nodes.order_by('order')
+        connections = NodeConnection.objects.filter(
+            target_node__workflow=workflow
+        ).values_list('source_node_id', 'target_node_id', 'target_port')
+        return cls(nodes, connections)
+
+    @classmethod
+    def from_definition(cls, definition: Dict) -> 'ExecutionPlan':
+        """
+        Compile the plan of a workflow straight from its ReactFlow definition
+
+        Nodes take their type and config from ``data`` and keep their
+        ReactFlow ids; edges feed the source node's result into the
+        ``targetHandle`` port of their target. Nodes with
+        ``data.is_enabled`` false are left out along with their edges. No
+        queries are made.
+
+        Raises:
+            ValidationError: With every problem found in the definition
+        """
+        if not isinstance(definition, dict):
+            raise ValidationError("Workflow definition must be an object")
+        nodes = definition.get('nodes') or []
+        edges = definition.get('edges') or []
+        if not isinstance(nodes, list) or not isinstance(edges, list):
+            raise ValidationError("Workflow definition 'nodes' and 'edges' must be lists")
+
+        errors = []
+        plan_nodes = {}
+        disabled = set()
+        for position, node in enumerate(nodes):
+            if not isinstance(node, dict) or node.get('id') in (None, ''):
+                errors.append(f"Definition node {position} has no id")
+                continue
+            node_id = str(node['id'])
+            if node_id in plan_nodes or node_id in disabled:
+                errors.append(f"Duplicate node id '{node_id}'")
+                continue
+            data = node.get('data') or {}
+            if data.get('is_enabled', True) is False:
+                disabled.add(node_id)
+                continue
+            plan_node = PlanNode(
+                node_id, get_definition_node_type(node), get_definition_node_config(node), position,
+                data.get('max_retries', 3)
+            )
+            # Same checks as saving a Node row, none of which touch the database
+            try:
+                Node(type=plan_node.type, config=plan_node.config).clean_definition()
+            except ValidationError as e:
+                errors.extend(f"Node {node_id}: {message}" for message in e.messages)
+            plan_nodes[node_id] = plan_node
+
+        connections = []
+        for edge in edges:
+            if not isinstance(edge, dict):
+                errors.append("Each edge must be an object")
+                continue
+            source_id, target_id = str(edge.get('source')), str(edge.get('target'))
+            if source_id in disabled or target_id in disabled:
+                continue
+            missing = [node_id for node_id in (source_id, target_id) if node_id not in plan_nodes]
+            if missing:
+                errors.append(f"Edge references unknown node '{missing[0]}'")
+                continue
+            connections.append((source_id, target_id, edge.get('targetHandle') or 'input'))
+
+        if not plan_nodes and not errors:
+            errors.append("Workflow definition has no nodes")
+        order, remaining = topological_order(plan_nodes, connections)
+        if remaining:
+            for cycle in find_cycles(plan_nodes, connections):
+                errors.append(f"Workflow contains a cycle: {' -> '.join(cycle)}")
+        if errors:
+            raise ValidationError(errors)
+        return cls([plan_nodes[node_id] for node_id in order], connections)
+
+    def upstream_ids(self, node_id) -> set:
+        return {source_id for source_id, _ in self.inputs.get(node_id, ())}
+
+    def get_node_input(self, node_id, results: Dict, variables: Dict = None):
+        """Build the input data of a node from the results of its upstream nodes"""
+        input_data = {}
+        for source_id, target_port in self.inputs.get(node_id, ()):
+            if source_id in results:
+                input_data[target_port] = results[source_id]
+
+        if variables:
+            input_data['variables'] = variables
+
+        return input_data or None
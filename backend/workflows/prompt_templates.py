@@ -0,0 +1,352 @@
+# workflows/prompt_templates.py
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .retry import NonRetryableNodeError
+from .streams import LazyStream
+
+# Prompt templates are compiled once into a Python function that appends
+# literal text and variable values to a list, and cached by their source,
+# so rendering a template for every row of a batch does no parsing.
+#
+#   ${name} ${chunk.metadata.source}               variables, dotted into dicts and lists
+#   {% for chunk in context.results %}...{% endfor %}   loops; ${loop.index} counts from 1
+#   {% if name %}...{% elif not other %}...{% else %}...{% endif %}
+#
+# A block tag alone on its line is removed together with the line.
+
+TOKEN_PATTERN = re.compile(
+    r'\$\{\s*(?P<var>[^}]*?)\s*\}'
+    r'|^[ \t]*\{%\s*(?P<line_tag>[^%]*?)\s*%\}[ \t]*(?:\r?\n|\Z)'
+    r'|\{%\s*(?P<tag>[^%]*?)\s*%\}',
+    re.MULTILINE
+)
+PATH_PATTERN = re.compile(r'^[A-Za-z_]\w*(?:\.\w+)*$')
+FOR_PATTERN = re.compile(r'^for\s+([A-Za-z_]\w*)\s+in\s+(\S+)$')
+CONDITION_PATTERN = re.compile(r'^(not\s+)?(\S+)$')
+
+# Upstream results a prompt_template node receives, by input port
+TEMPLATE_PORTS = ('input', 'context', 'query')
+
+_MISSING = object()
+
+
+class TemplateError(NonRetryableNodeError):
+    """Invalid template, or a render missing required variables"""
+
+
+def _path(value, parts: Tuple[str, ...]):
+    for part in parts:
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, (list, tuple)) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return None
+    return value
+
+
+def _text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    if isinstance(value, dict) and isinstance(value.get('text'), str):
+        return value['text']
+    if isinstance(value, LazyStream):
+        return '\n'.join(_text(item) for item in value)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _placeholder(value, parts: Tuple[str, ...], source: str) -> str:
+    """Text of a variable, or its placeholder as written when it is missing"""
+    if value is _MISSING:
+        return source
+    return _text(_path(value, parts))
+
+
+def _iter(value) -> Iterable:
+    if value is None:
+        return ()
+    if isinstance(value, dict):
+        return value.values()
+    return value
+
+
+RUNTIME = {'_path': _path, '_text': _text, '_placeholder': _placeholder, '_iter': _iter, '_MISSING': _MISSING}
+
+
+class CompiledTemplate:
+    """A template compiled to a render function"""
+    def __init__(self, source: str, function: Callable, required: frozenset, names: frozenset,
+                 strict: bool, single_variable: Optional[str]):
+        self.source = source
+        self.function = function
+        # Variables every render needs; ones only used under an if testing them are optional
+        self.required = required
+        self.names = names
+        self.strict = strict
+        # Name of the variable when the template is nothing but ${name}
+        self.single_variable = single_variable
+
+    def render(self, context: Dict) -> str:
+        if self.strict:
+            missing = [name for name in self.required if name not in context]
+            if missing:
+                raise TemplateError(f"Missing template variables: {', '.join(sorted(missing))}")
+        return self.function(context)
+
+
+def parse_path(expression: str, line: int) -> Tuple[str, ...]:
+    if not PATH_PATTERN.match(expression):
+        raise TemplateError(f"Invalid variable {expression!r} on line {line}")
+    return tuple(expression.split('.'))
+
+
+def parse(source: str, strict: bool = True) -> List[Dict]:
+    """
+    Parse a template into a tree of text, var, for and if nodes
+
+    Outside strict mode, tokens that are not valid template syntax, such as
+    ``${price:.2f}`` or ``{% raw %}``, are kept as literal text.
+    """
+    root = []
+    stack = [({'type': 'root'}, root)]
+    position = 0
+    for match in TOKEN_PATTERN.finditer(source):
+        body = stack[-1][1]
+        if match.start() > position:
+            body.append({'type': 'text', 'text': source[position:match.start()]})
+        position = match.end()
+        try:
+            parse_token(match, source, stack)
+        except TemplateError:
+            if strict:
+                raise
+            body.append({'type': 'text', 'text': match.group(0)})
+
+    if len(stack) > 1:
+        raise TemplateError(f"Unclosed {stack[-1][0]['type']} block")
+    if position < len(source):
+        root.append({'type': 'text', 'text': source[position:]})
+    return root
+
+
+def parse_token(match, source: str, stack: List) -> None:
+    """Add a variable or block tag to the tree; raises before changing it when invalid"""
+    body = stack[-1][1]
+    line = source.count('\n', 0, match.start()) + 1
+
+    if match.group('var') is not None:
+        body.append({'type': 'var', 'path': parse_path(match.group('var'), line), 'source': match.group(0)})
+        return
+
+    tag = match.group('line_tag') if match.group('line_tag') is not None else match.group('tag')
+    keyword = tag.split(None, 1)[0] if tag else ''
+    block = stack[-1][0]
+    if keyword == 'for':
+        loop = FOR_PATTERN.match(tag)
+        if not loop:
+            raise TemplateError(f"Invalid for block {tag!r} on line {line}")
+        node = {'type': 'for', 'name': loop.group(1), 'path': parse_path(loop.group(2), line), 'body': []}
+        body.append(node)
+        stack.append((node, node['body']))
+    elif keyword in ('if', 'elif'):
+        condition = CONDITION_PATTERN.match(tag[len(keyword):].strip())
+        if not condition:
+            raise TemplateError(f"Invalid {keyword} condition {tag!r} on line {line}")
+        branch = (bool(condition.group(1)), parse_path(condition.group(2), line), [])
+        if keyword == 'if':
+            node = {'type': 'if', 'branches': [branch], 'else': None}
+            body.append(node)
+        elif block['type'] != 'if' or block['else'] is not None:
+            raise TemplateError(f"elif outside an if block on line {line}")
+        else:
+            node = block
+            node['branches'].append(branch)
+            stack.pop()
+        stack.append((node, branch[2]))
+    elif keyword == 'else':
+        if block['type'] != 'if' or block['else'] is not None:
+            raise TemplateError(f"else outside an if block on line {line}")
+        block['else'] = []
+        stack[-1] = (block, block['else'])
+    elif keyword in ('endfor', 'endif'):
+        if block['type'] != keyword[3:]:
+            raise TemplateError(f"Unexpected {keyword} on line {line}")
+        stack.pop()
+    else:
+        raise TemplateError(f"Unknown block {tag!r} on line {line}")
+
+
+class _CodeGenerator:
+    def __init__(self, strict: bool):
+        self.strict = strict
+        self.lines = ['def render(context):', '    get = context.get', '    out = []', '    append = out.append']
+        self.required = set()
+        self.names = set()
+        self.loops = 0
+
+    def emit(self, depth: int, line: str) -> None:
+        self.lines.append('    ' * depth + line)
+
+    def value(self, path: Tuple[str, ...], scope: Dict, guarded: frozenset, condition: bool = False) -> str:
+        """Python expression of a variable; loop variables are locals, others read from the context"""
+        root, rest = path[0], path[1:]
+        if root == 'loop' and 'loop' not in scope and scope.get('$loop'):
+            if rest != ('index',):
+                raise TemplateError(f"Unknown loop attribute {'.'.join(path)}")
+            return scope['$loop']
+        if root in scope:
+            base = scope[root]
+        else:
+            self.names.add(root)
+            if not condition and root not in guarded:
+                self.required.add(root)
+            base = f'get({root!r})'
+        return f'_path({base}, {rest!r})' if rest else base
+
+    def generate(self, nodes: List[Dict], depth: int, scope: Dict, guarded: frozenset) -> None:
+        if not nodes:
+            self.emit(depth, 'pass')
+        for node in nodes:
+            if node['type'] == 'text':
+                self.emit(depth, f"append({node['text']!r})")
+            elif node['type'] == 'var':
+                path = node['path']
+                if not self.strict and path[0] not in scope and path[0] != 'loop':
+                    self.names.add(path[0])
+                    self.emit(depth, f"append(_placeholder(get({path[0]!r}, _MISSING), {path[1:]!r}, "
+                                     f"{node['source']!r}))")
+                else:
+                    self.emit(depth, f"append(_text({self.value(path, scope, guarded)}))")
+            elif node['type'] == 'for':
+                self.loops += 1
+                item, index = f'item{self.loops}', f'index{self.loops}'
+                self.emit(depth, f"for {index}, {item} in enumerate(_iter({self.value(node['path'], scope, guarded)}), 1):")
+                inner = {key: name for key, name in scope.items() if key != node['name']}
+                self.generate(node['body'], depth + 1, {**inner, node['name']: item, '$loop': index}, guarded)
+            else:
+                for number, (negated, path, body) in enumerate(node['branches']):
+                    keyword = 'if' if number == 0 else 'elif'
+                    test = self.value(path, scope, guarded, condition=True)
+                    self.emit(depth, f"{keyword} {'not ' if negated else ''}{test}:")
+                    tested = guarded if negated or path[0] in scope else guarded | {path[0]}
+                    self.generate(body, depth + 1, scope, tested)
+                if node['else'] is not None:
+                    self.emit(depth, 'else:')
+                    self.generate(node['else'], depth + 1, scope, guarded)
+
+
+def compile_template(source: str, variables: Iterable[str] = None, strict: bool = True) -> CompiledTemplate:
+    """
+    Compile a template
+
+    With ``variables``, required variables outside that list are reported
+    here rather than on every render.
+    """
+    if not isinstance(source, str):
+        raise TemplateError("Template must be a string")
+    nodes = parse(source, strict)
+    generator = _CodeGenerator(strict)
+    generator.generate(nodes, 1, {}, frozenset())
+    generator.emit(1, "return ''.join(out)")
+
+    if variables is not None:
+        undeclared = generator.required.difference(variables)
+        if undeclared:
+            raise TemplateError(f"Template uses undeclared variables: {', '.join(sorted(undeclared))}")
+
+    namespace = dict(RUNTIME)
+    exec(compile('\n'.join(generator.lines), '<prompt template>', 'exec'), namespace)
+    single = nodes[0]['path'][0] if (
+        len(nodes) == 1 and nodes[0]['type'] == 'var' and len(nodes[0]['path']) == 1) else None
+    return CompiledTemplate(source, namespace['render'], frozenset(generator.required),
+                            frozenset(generator.names), strict, single)
+
+
+_templates: 'OrderedDict[tuple, CompiledTemplate]' = OrderedDict()
+_templates_lock = threading.Lock()
+
+
+def get_template(source: str, variables: Iterable[str] = None, strict: bool = True) -> CompiledTemplate:
+    """Compiled template, from a process-wide LRU keyed by the template config"""
+    key = (source, tuple(sorted(variables)) if variables is not None else None, strict)
+    with _templates_lock:
+        template = _templates.get(key)
+        if template is not None:
+            _templates.move_to_end(key)
+            return template
+
+    template = compile_template(source, variables, strict)
+    with _templates_lock:
+        _templates[key] = template
+        while len(_templates) > getattr(settings, 'WORKFLOW_TEMPLATE_CACHE_SIZE', 1024):
+            _templates.popitem(last=False)
+    return template
+
+
+def get_node_template(config: Dict) -> CompiledTemplate:
+    """
+    Compiled template of a prompt_template node
+
+    When the node declares its ``variables``, templates using anything else
+    than those, ``defaults`` and the input ports fail to compile.
+    """
+    declared = config.get('variables')
+    if declared is not None:
+        declared = [*declared, *(config.get('defaults') or {}), *TEMPLATE_PORTS]
+    return get_template(config.get('template'), declared)
+
+
+def template_context(config: Dict, input_data) -> Dict:
+    """Defaults, then workflow variables, then upstream results by port"""
+    context = dict(config.get('defaults') or {})
+    if isinstance(input_data, dict):
+        context.update(input_data.get('variables') or {})
+        context.update((port, value) for port, value in input_data.items() if port != 'variables')
+    elif input_data is not None:
+        context['input'] = input_data
+    return context
+
+
+def render_prompt_template(config: Dict, input_data=None) -> str:
+    """prompt_template node: render the compiled template with the node input"""
+    return get_node_template(config).render(template_context(config, input_data))
+
+
+def render_prompt_templates(config: Dict, inputs: List) -> List:
+    """Render one compiled template for many inputs; failed rows get their exception"""
+    template = get_node_template(config)
+    results = []
+    for input_data in inputs:
+        try:
+            results.append(template.render(template_context(config, input_data)))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def render_text(text: str, variables: Dict = None):
+    """
+    Substitute workflow variables into a text_input text
+
+    Missing variables keep their placeholder, and a text that is a single
+    placeholder yields the variable's value as is. Texts that are not valid
+    templates, like an unclosed ``{% if %}``, are returned unchanged.
+    """
+    try:
+        template = get_template(text, strict=False)
+    except TemplateError:
+        return text
+    variables = variables or {}
+    if template.single_variable is not None and template.single_variable in variables:
+        return variables[template.single_variable]
+    return template.render(variables)
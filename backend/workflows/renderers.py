@@ -0,0 +1,49 @@
+# workflows/renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional; FastJSONRenderer falls back to JSONRenderer
+    orjson = None
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets views answer ``Accept: text/event-stream`` requests (EventSource).
+
+    Event streams themselves are returned as StreamingHttpResponse; this only
+    renders error payloads such as a missing execution.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return f"event: error\ndata: {json.dumps(data, default=str)}\n\n".encode(self.charset)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Produces the same compact output as JSONRenderer. Indented (browsable or
+    ``; indent=``) responses, and values orjson cannot encode, go through
+    JSONRenderer; other types are encoded with DRF's encoder.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,246 @@
+# workflows/result_store.py
+import json
+import logging
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .streams import to_storable
+
+try:
+    import zstandard
+except ImportError:  # Optional; results are compressed with zlib instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Large node outputs are replaced in WorkflowExecution.results by a small
+# reference and kept compressed in a result store. Long error logs keep a
+# truncated head in the row, prefixed with ERROR_LOGS_REF.
+REF_KEY = '$result_ref'
+# Blob keys of node results carry a prefix, so no node id (definition node
+# ids are chosen by the editor) can collide with the error log blob
+RESULT_KEY_PREFIX = 'results/'
+ERROR_LOGS_KEY = 'error_logs'
+ERROR_LOGS_REF = '[error_logs stored in result store]\n'
+
+# The first byte of a blob names its codec
+CODEC_ZSTD = b'z'
+CODEC_ZLIB = b'd'
+
+
+def compress(raw: bytes) -> bytes:
+    """Compress with zstd when available, zlib otherwise"""
+    if zstandard is not None:
+        return CODEC_ZSTD + zstandard.ZstdCompressor(level=3).compress(raw)
+    return CODEC_ZLIB + zlib.compress(raw, 6)
+
+
+def decompress(data: bytes) -> bytes:
+    data = bytes(data)
+    codec, payload = data[:1], data[1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Result was compressed with zstd but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown result codec {codec!r}")
+
+
+class DatabaseResultStore:
+    """
+    Result store backed by the ExecutionResultBlob table.
+
+    Blobs are deleted with their execution. Configure WORKFLOW_RESULT_STORE
+    with another class exposing ``save`` and ``load`` to keep them elsewhere.
+    """
+    def save(self, blobs: List[Tuple[int, str, bytes, int]]) -> None:
+        """Write (execution id, key, compressed data, raw size) blobs in one query"""
+        from .models import ExecutionResultBlob
+        if not blobs:
+            return
+        ExecutionResultBlob.objects.bulk_create(
+            [
+                ExecutionResultBlob(execution_id=execution_id, key=key, data=data, size=size)
+                for execution_id, key, data, size in blobs
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['execution', 'key'],
+            update_fields=['data', 'size']
+        )
+
+    def load(self, refs: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], bytes]:
+        """Compressed data of the requested (execution id, key) pairs, in one query"""
+        from .models import ExecutionResultBlob
+        refs = set(refs)
+        if not refs:
+            return {}
+        rows = ExecutionResultBlob.objects.filter(
+            execution_id__in={execution_id for execution_id, _ in refs},
+            key__in={key for _, key in refs}
+        ).values_list('execution_id', 'key', 'data')
+        return {
+            (execution_id, key): data
+            for execution_id, key, data in rows if (execution_id, key) in refs
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Get the process-wide result store configured by WORKFLOW_RESULT_STORE"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store_path = getattr(settings, 'WORKFLOW_RESULT_STORE', 'workflows.result_store.DatabaseResultStore')
+                _store = import_string(store_path)()
+    return _store
+
+
+def is_result_ref(value) -> bool:
+    return isinstance(value, dict) and REF_KEY in value
+
+
+def pack_result(execution_id: int, node_key, value, inline_limit: int, blobs: List):
+    """Storable form of a node result, or a reference to it once it is large and added to ``blobs``"""
+    value = to_storable(value)
+    if is_result_ref(value):
+        return value
+    raw = json.dumps(value, default=str).encode('utf-8')
+    if len(raw) <= inline_limit:
+        return value
+    key = f'{RESULT_KEY_PREFIX}{node_key}'
+    blobs.append((execution_id, key, compress(raw), len(raw)))
+    return {REF_KEY: key, 'size': len(raw)}
+
+
+def pack_output(execution_id: int, results: Optional[Dict], error_logs, inline_limit: int, blobs: List):
+    """
+    Move the large parts of an execution's output to ``blobs``
+
+    Returns:
+        (results with references, error logs as stored in the row)
+    """
+    if isinstance(results, dict):
+        results = {
+            node_key: pack_result(execution_id, node_key, value, inline_limit, blobs)
+            for node_key, value in results.items()
+        }
+
+    if error_logs is not None and not isinstance(error_logs, str):
+        error_logs = '\n'.join(map(str, error_logs))
+    if error_logs and not error_logs.startswith(ERROR_LOGS_REF):
+        raw = error_logs.encode('utf-8')
+        if len(raw) > inline_limit:
+            blobs.append((execution_id, ERROR_LOGS_KEY, compress(raw), len(raw)))
+            error_logs = ERROR_LOGS_REF + error_logs[:inline_limit]
+    return results, error_logs
+
+
+def offload_execution_output(executions: List) -> None:
+    """
+    Store the large node outputs and error logs of executions in the result
+    store and replace them on the instances with references, ready to be saved
+
+    Outputs up to WORKFLOW_RESULT_INLINE_LIMIT bytes of JSON stay inline.
+    """
+    inline_limit = getattr(settings, 'WORKFLOW_RESULT_INLINE_LIMIT', 2048)
+    blobs = []
+    for execution in executions:
+        execution.results, execution.error_logs = pack_output(
+            execution.id, execution.results, execution.error_logs, inline_limit, blobs
+        )
+    get_result_store().save(blobs)
+    if blobs:
+        logger.debug(f"Offloaded {len(blobs)} results of {len(executions)} executions")
+
+
+def offload_node_results(results: List[Tuple[int, str, Any]]) -> List:
+    """
+    Storable forms of (execution id, node key, result) checkpoints, with
+    large results moved to the result store in one query
+
+    Checkpoints share the blob key of the node's entry in the execution
+    results, so a completed execution keeps each large output once.
+    """
+    inline_limit = getattr(settings, 'WORKFLOW_RESULT_INLINE_LIMIT', 2048)
+    blobs = []
+    packed = [
+        pack_result(execution_id, node_key, value, inline_limit, blobs)
+        for execution_id, node_key, value in results
+    ]
+    get_result_store().save(blobs)
+    return packed
+
+
+def load_node_results(results: List[Tuple[int, Any]]) -> List:
+    """Stored (execution id, result) checkpoints with references replaced by the output, in one query"""
+    refs = [(execution_id, value[REF_KEY]) for execution_id, value in results if is_result_ref(value)]
+    blobs = get_result_store().load(refs) if refs else {}
+    return [
+        json.loads(decompress(blobs[(execution_id, value[REF_KEY])]))
+        if is_result_ref(value) and (execution_id, value[REF_KEY]) in blobs else value
+        for execution_id, value in results
+    ]
+
+
+def _get_refs(execution_id: int, results, error_logs) -> List[Tuple[int, str]]:
+    refs = []
+    if isinstance(results, dict):
+        refs.extend((execution_id, value[REF_KEY]) for value in results.values() if is_result_ref(value))
+    if isinstance(error_logs, str) and error_logs.startswith(ERROR_LOGS_REF):
+        refs.append((execution_id, ERROR_LOGS_KEY))
+    return refs
+
+
+def _unpack(execution_id: int, results, error_logs, blobs: Dict):
+    if isinstance(results, dict):
+        results = {
+            node_key: json.loads(decompress(blobs[(execution_id, value[REF_KEY])]))
+            if is_result_ref(value) and (execution_id, value[REF_KEY]) in blobs else value
+            for node_key, value in results.items()
+        }
+    if (execution_id, ERROR_LOGS_KEY) in blobs and isinstance(error_logs, str) \
+            and error_logs.startswith(ERROR_LOGS_REF):
+        error_logs = decompress(blobs[(execution_id, ERROR_LOGS_KEY)]).decode('utf-8')
+    return results, error_logs
+
+
+def load_execution_output(executions: List) -> None:
+    """
+    Replace result references on execution instances with the stored output
+
+    Deferred fields are left alone. Executions without references cost no
+    query; the others share one.
+    """
+    rows = []
+    for execution in executions:
+        deferred = execution.get_deferred_fields()
+        rows.append({
+            'id': execution.id,
+            'results': None if 'results' in deferred else execution.results,
+            'error_logs': None if 'error_logs' in deferred else execution.error_logs,
+        })
+    load_output_rows(rows)
+    for execution, row in zip(executions, rows):
+        for field in ('results', 'error_logs'):
+            if row[field] is not None:
+                setattr(execution, field, row[field])
+
+
+def load_output_rows(rows: List[Dict]) -> List[Dict]:
+    """load_execution_output for ``values()`` rows with id, results and error_logs"""
+    refs = [ref for row in rows for ref in _get_refs(row['id'], row['results'], row['error_logs'])]
+    if refs:
+        blobs = get_result_store().load(refs)
+        for row in rows:
+            row['results'], row['error_logs'] = _unpack(row['id'], row['results'], row['error_logs'], blobs)
+    return rows
@@ -0,0 +1,208 @@
+# workflows/retrieval.py
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import caches
+
+from InnoFlow.ai_integration.models import AIModelConfig
+from InnoFlow.ai_integration.tokens import get_prompt_budget, get_tokenizer as get_model_tokenizer
+
+from .documents import get_tokenizer
+from .embeddings import embed_text
+from .keyword_index import get_keyword_index, get_query_text
+from .retry import NonRetryableNodeError
+from .vector_store import get_query_vector, get_vector_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+CONTEXT_SEPARATOR = '\n\n'
+
+# Cross-encoders are loaded lazily, once per model
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(model_name: str):
+    """Local cross-encoder scoring (query, text) pairs"""
+    if model_name not in _rerankers:
+        with _rerankers_lock:
+            if model_name not in _rerankers:
+                try:
+                    from sentence_transformers import CrossEncoder
+                except ImportError:
+                    raise ImportError("sentence-transformers is required for reranking")
+                _rerankers[model_name] = CrossEncoder(model_name)
+    return _rerankers[model_name]
+
+
+def reciprocal_rank_fusion(result_lists: Dict[str, List[Dict]], k: int = 60) -> List[Dict]:
+    """
+    Fuse ranked result lists by reciprocal rank: sum of 1 / (k + rank)
+
+    Returns:
+        Results best first, with the fused ``score`` and the score of each
+        retriever that found them in ``scores``
+    """
+    fused = {}
+    for source, results in result_lists.items():
+        for rank, result in enumerate(results, 1):
+            entry = fused.get(result['id'])
+            if entry is None:
+                entry = fused[result['id']] = {**result, 'score': 0.0, 'scores': {}}
+            entry['score'] += 1.0 / (k + rank)
+            entry['scores'][source] = result['score']
+    return sorted(fused.values(), key=lambda entry: entry['score'], reverse=True)
+
+
+def pair_key(model_name: str, query: str, text: str) -> str:
+    query_hash = hashlib.sha256(query.encode('utf-8')).hexdigest()
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return f"rerank:{hashlib.sha256(model_name.encode('utf-8')).hexdigest()[:16]}:{query_hash}:{text_hash}"
+
+
+def rerank(query: str, results: List[Dict], model_name: str = DEFAULT_RERANK_MODEL) -> List[Dict]:
+    """
+    Reorder results by cross-encoder score
+
+    Pairs scored before are read from the cache in one round trip and the
+    rest are scored in batches of WORKFLOW_RERANK_BATCH_SIZE.
+    """
+    if not results:
+        return results
+    cache = caches[getattr(settings, 'WORKFLOW_RERANK_CACHE', 'default')]
+    keys = [pair_key(model_name, query, result.get('text', '')) for result in results]
+    try:
+        cached = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Rerank score cache unavailable: {str(e)}")
+        cached = {}
+
+    missing = [position for position, key in enumerate(keys) if key not in cached]
+    if missing:
+        reranker = get_reranker(model_name)
+        pairs = [(query, results[position].get('text', '')) for position in missing]
+        scores = reranker.predict(pairs, batch_size=getattr(settings, 'WORKFLOW_RERANK_BATCH_SIZE', 32))
+        computed = {keys[position]: float(score) for position, score in zip(missing, scores)}
+        cached.update(computed)
+        try:
+            cache.set_many(computed, getattr(settings, 'WORKFLOW_RERANK_CACHE_TTL', 86400))
+        except Exception as e:
+            logger.warning(f"Failed to cache rerank scores: {str(e)}")
+
+    reranked = [{**result, 'rerank_score': cached[key]} for result, key in zip(results, keys)]
+    return sorted(reranked, key=lambda result: result['rerank_score'], reverse=True)
+
+
+def build_context(results: List[Dict], max_tokens: int, tokenizer='auto') -> Dict:
+    """
+    Join result texts, best first, into at most ``max_tokens`` tokens
+
+    Results that do not fit are skipped, except the best one, which is
+    trimmed to the budget rather than leaving the context empty.
+    """
+    if isinstance(tokenizer, str):
+        tokenizer = get_tokenizer(tokenizer)
+    separator_tokens = len(tokenizer.encode(CONTEXT_SEPARATOR))
+    texts, used, total = [], [], 0
+    for result in results:
+        text = result.get('text', '')
+        encoded = tokenizer.encode(text)
+        tokens = len(encoded) + (separator_tokens if texts else 0)
+        if total + tokens > max_tokens:
+            if texts or max_tokens <= 0:
+                continue
+            text = tokenizer.decode(encoded[:max_tokens])
+            result = {**result, 'text': text, 'truncated': True}
+            tokens = max_tokens
+        texts.append(text)
+        used.append(result)
+        total += tokens
+    return {'text': CONTEXT_SEPARATOR.join(texts), 'results': used, 'tokens': total}
+
+
+def get_context_budget(config: Dict):
+    """
+    Token budget and tokenizer of a retriever's context
+
+    With a ``model_config``, the context is counted with that model's
+    tokenizer and fits its window, leaving ``prompt_reserve_tokens`` for the
+    rest of the prompt and room for the completion.
+    """
+    max_tokens = config.get('max_context_tokens')
+    if not config.get('model_config'):
+        return int(max_tokens or 2000), config.get('tokenizer', 'auto')
+    model_config = AIModelConfig.objects.filter(pk=config['model_config']).first()
+    if model_config is None:
+        raise NonRetryableNodeError(f"AI model config {config['model_config']} does not exist")
+    budget = get_prompt_budget(model_config) - int(config.get('prompt_reserve_tokens', 256))
+    if max_tokens:
+        budget = min(budget, int(max_tokens))
+    return budget, get_model_tokenizer(model_config)
+
+
+def run_hybrid_retriever(config: Dict, input_data=None) -> Dict:
+    """
+    hybrid_retriever node: keyword and vector search run concurrently, fused
+    with reciprocal rank fusion, optionally reranked, and packed into a
+    context of at most ``max_context_tokens`` tokens, or sized to the window
+    of ``model_config``
+
+    Vector search needs a query embedding as input, or embeds the query
+    itself with ``embedding_model_config`` or ``embedding_model``. A
+    configured index that does not exist, or a vector index without a query
+    embedding, fails the node instead of leaving that search out.
+    """
+    if not isinstance(input_data, dict):
+        input_data = {'query': input_data}
+    query = get_query_text(input_data.get('query', input_data.get('input')))
+    embedding = input_data.get('embedding')
+    if embedding is None and config.get('vector_index') and (
+            config.get('embedding_model_config') or config.get('embedding_model')):
+        embedding = embed_text({
+            'model_config': config.get('embedding_model_config'),
+            'model': config.get('embedding_model'),
+        }, query)
+    candidates = int(config.get('candidates', 50))
+
+    searches = {}
+    if config.get('keyword_index'):
+        keyword_index = get_keyword_index(config['keyword_index'])
+        if keyword_index is None:
+            raise NonRetryableNodeError(f"Keyword index {config['keyword_index']} does not exist")
+        searches['keyword'] = lambda: keyword_index.search(query, candidates)
+    if config.get('vector_index'):
+        vector_index = get_vector_index(config['vector_index'])
+        if vector_index is None:
+            raise NonRetryableNodeError(f"Vector index {config['vector_index']} does not exist")
+        if embedding is None:
+            raise NonRetryableNodeError(
+                "Hybrid retriever with a vector_index requires a query embedding as input, "
+                "or an embedding_model_config or embedding_model to embed the query"
+            )
+        vector = get_query_vector(embedding)
+        searches['vector'] = lambda: vector_index.search(vector, candidates)
+    if not searches:
+        raise NonRetryableNodeError("Hybrid retriever has no index to search")
+
+    if len(searches) > 1:
+        # Both searches spend their time in numpy, outside the GIL
+        with ThreadPoolExecutor(max_workers=len(searches)) as pool:
+            futures = {source: pool.submit(search) for source, search in searches.items()}
+            result_lists = {source: future.result() for source, future in futures.items()}
+    else:
+        result_lists = {source: search() for source, search in searches.items()}
+
+    results = reciprocal_rank_fusion(result_lists, int(config.get('rrf_k', 60)))
+    rerank_model = config.get('rerank_model')
+    if config.get('rerank') or rerank_model:
+        top_n = int(config.get('rerank_top_n', 20))
+        results = rerank(query, results[:top_n], rerank_model or DEFAULT_RERANK_MODEL) + results[top_n:]
+
+    results = results[:int(config.get('top_k', 10))]
+    context = build_context(results, *get_context_budget(config))
+    return {'query': query, **context}
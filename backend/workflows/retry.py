@@ -0,0 +1,100 @@
+# workflows/retry.py
+import random
+from typing import Dict, Optional, Tuple, Type
+
+from django.core.exceptions import ValidationError
+
+
+class NonRetryableNodeError(Exception):
+    """Raised by node implementations for failures that retrying cannot fix"""
+
+
+class NodeRetryScheduled(Exception):
+    """
+    Raised by the executor when failed nodes are waiting for a backoff delay.
+
+    The caller is expected to re-run the execution after ``countdown`` seconds;
+    completed nodes are restored from their checkpoints.
+    """
+    def __init__(self, countdown: float, node_ids=None):
+        self.countdown = countdown
+        self.node_ids = list(node_ids or [])
+        super().__init__(f"Retry of nodes {self.node_ids} scheduled in {countdown:.2f}s")
+
+
+# HTTP status codes worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter and retryable error classification"""
+    def __init__(self,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 multiplier: float = 2.0,
+                 jitter: bool = True,
+                 non_retryable: Tuple[Type[BaseException], ...] = ()):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.non_retryable = (
+            NonRetryableNodeError,
+            ValidationError,
+            ImportError,
+            TypeError,
+            NotImplementedError,
+        ) + tuple(non_retryable)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Classify an error raised by a node as transient or permanent"""
+        if isinstance(error, self.non_retryable):
+            return False
+
+        status_code = getattr(error, 'status_code', None)
+        if status_code is None:
+            response = getattr(error, 'response', None)
+            status_code = getattr(response, 'status_code', None)
+        if isinstance(status_code, int) and 400 <= status_code < 600:
+            return status_code in RETRYABLE_STATUS_CODES
+
+        return True
+
+    def get_delay(self, attempt: int) -> float:
+        """Delay in seconds before the given retry attempt (1-based)"""
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** max(attempt - 1, 0)))
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+_retry_policies: Dict[str, RetryPolicy] = {
+    # Model downloads and inference are slow to recover, back off harder
+    'huggingface_summarization': RetryPolicy(base_delay=2.0, max_delay=120.0),
+    # Provider calls are usually rate limited
+    'openai_tts': RetryPolicy(base_delay=2.0, max_delay=60.0),
+    'openai_completion': RetryPolicy(base_delay=2.0, max_delay=60.0),
+    'embedding': RetryPolicy(base_delay=2.0, max_delay=60.0),
+    # Local nodes have no upstream service to wait for
+    'text_input': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'text_transformation': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'prompt_template': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'document_loader': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'text_chunker': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'vector_store': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'keyword_search': RetryPolicy(base_delay=0.1, max_delay=1.0),
+    'hybrid_retriever': RetryPolicy(base_delay=0.1, max_delay=1.0),
+}
+
+
+def register_retry_policy(node_type: str, policy: RetryPolicy) -> RetryPolicy:
+    """Register the retry policy used for a node type"""
+    _retry_policies[node_type] = policy
+    return policy
+
+
+def get_retry_policy(node_type: Optional[str]) -> RetryPolicy:
+    """Get the retry policy for a node type, falling back to the default policy"""
+    return _retry_policies.get(node_type, DEFAULT_RETRY_POLICY)
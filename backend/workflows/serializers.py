@@ -1,5 +1,69 @@
+from copy import copy
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Workflow, Node, WorkflowExecution
+from .models import Workflow, Node, WorkflowExecution, WorkflowBatch
+from .plan import ExecutionPlan
+
+def _split_param(value) -> set:
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets and eager loading for ModelSerializers.
+
+    ``?fields=id,status`` limits the output to the listed fields. Fields named
+    in ``Meta.heavy_fields`` are left out of list responses unless asked for
+    with ``?include=`` (or listed in ``?fields=``); detail responses render
+    them by default.
+
+    ``Meta.select_related`` and ``Meta.prefetch_related`` map field names to
+    the related lookups they need; ``prepare_queryset`` applies them only for
+    fields that are rendered, so nested fields cost one query per relation
+    rather than one per row.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        omitted = self.get_omitted_fields(
+            self.context.get('request'), self.context.get('view'), self.fields.keys()
+        )
+        for name in omitted:
+            self.fields.pop(name)
+
+    @classmethod
+    def get_omitted_fields(cls, request, view=None, field_names=None) -> set:
+        """Names out of ``field_names`` (default: the heavy fields) that are not rendered"""
+        heavy = set(getattr(cls.Meta, 'heavy_fields', ()))
+        field_names = set(heavy if field_names is None else field_names)
+        params = getattr(request, 'query_params', None)
+        if params is None:
+            return set()
+
+        fields = _split_param(params.get('fields'))
+        include = _split_param(params.get('include'))
+        if fields:
+            return field_names - fields - include
+        if getattr(view, 'detail', False):
+            return set()
+        return (field_names & heavy) - include
+
+    @classmethod
+    def prepare_queryset(cls, queryset, request, view=None):
+        """Eager load what the rendered fields need and defer what they do not"""
+        field_names = cls.Meta.fields if isinstance(cls.Meta.fields, (list, tuple)) else None
+        omitted = cls.get_omitted_fields(request, view, field_names)
+
+        select = getattr(cls.Meta, 'select_related', {})
+        prefetch = getattr(cls.Meta, 'prefetch_related', {})
+        select_lookups = [lookup for name, lookup in select.items() if name not in omitted]
+        prefetch_lookups = [lookup for name, lookup in prefetch.items() if name not in omitted]
+        if select_lookups:
+            queryset = queryset.select_related(*select_lookups)
+        if prefetch_lookups:
+            queryset = queryset.prefetch_related(*prefetch_lookups)
+
+        model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+        deferred = omitted & set(getattr(cls.Meta, 'heavy_fields', ())) & model_fields
+        return queryset.defer(*deferred) if deferred else queryset
 
 class NodeSerializer(serializers.ModelSerializer):
     workflow = serializers.PrimaryKeyRelatedField(
@@ -11,13 +75,13 @@ class NodeSerializer(serializers.ModelSerializer):
         fields = ['id','workflow', 'type', 'config', 'order']
     
     def validate_workflow(self, value):
-        if value.user != self.context['request'].user:
+        # Compare ids so validation does not load the workflow's user
+        if value.user_id != self.context['request'].user.id:
             raise serializers.ValidationError("You do not have permission to create nodes for this workflow.")
         return value
 
     def validate_type(self, value):
-        valid_types = ["text_input", "openai_tts", "huggingface_summarization"]
-        if value not in valid_types:
+        if value not in Node.VALID_NODE_TYPES:
             raise serializers.ValidationError(f"Invalid node type: {value}")
         return value
 
@@ -27,22 +91,70 @@ class NodeSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Missing 'voice' in config")
         return value
 
-class WorkflowSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        # The workflow is loaded and order uniqueness checked by the field
+        # validators, so only the node definition is left to check here and
+        # saving can skip model validation
+        node = copy(self.instance) if self.instance else Node()
+        for attr, value in attrs.items():
+            setattr(node, attr, value)
+        try:
+            node.clean_definition()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
+
+    def create(self, validated_data):
+        node = Node(**validated_data)
+        node.save(validate=False)
+        return node
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(validate=False)
+        return instance
+
+class WorkflowSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Workflow objects.
     
-    Includes all workflow fields and nested nodes.
+    Includes all workflow fields, nested nodes and the editor's ReactFlow
+    definition. Lists only include the nodes and definition with
+    ``?include=nodes,definition``.
     """
     nodes = NodeSerializer(many=True, read_only=True)  # Include nodes in workflow response
 
     class Meta:
         model = Workflow
-        fields = ['id', 'name', 'user', 'created_at', 'updated_at', 'nodes','config']
+        fields = ['id', 'name', 'user', 'created_at', 'updated_at', 'nodes', 'config', 'definition']
+        heavy_fields = ['nodes', 'definition']
+        prefetch_related = {'nodes': 'nodes'}
 
-class WorkflowExecutionSerializer(serializers.ModelSerializer):
+    def validate_definition(self, value):
+        # An empty canvas can be saved; a graph with nodes must compile to a plan
+        if isinstance(value, dict) and not value.get('nodes') and not value.get('edges'):
+            return value
+        try:
+            ExecutionPlan.from_definition(value)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return value
+
+class WorkflowExecutionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = WorkflowExecution
         fields = [
             'id', 'workflow', 'started_at',
             'completed_at', 'status', 'results', 'error_logs'
-        ]
\ No newline at end of file
+        ]
+        # Only rendered in lists with ?include=results,error_logs
+        heavy_fields = ['results', 'error_logs']
+
+class WorkflowBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkflowBatch
+        fields = [
+            'id', 'workflow', 'status', 'concurrency', 'streaming', 'total_rows',
+            'completed_rows', 'failed_rows', 'error', 'created_at', 'completed_at'
+        ]
@@ -0,0 +1,99 @@
+# workflows/streams.py
+from typing import Any, Dict, Iterator, Optional
+
+# Node outputs that are too large to materialize (documents, chunks) flow
+# between nodes as LazyStreams: re-iterable descriptions of how to produce
+# the items. Results and checkpoints store the description, and restored
+# checkpoints rebuild the stream from it.
+
+STREAM_KEY = '$stream'
+
+_stream_types: Dict[str, type] = {}
+
+
+def register_stream(stream_class):
+    """Register a LazyStream subclass so stored descriptions can be rebuilt"""
+    _stream_types[stream_class.kind] = stream_class
+    return stream_class
+
+
+class LazyStream:
+    """
+    Re-iterable lazy sequence produced by a node.
+
+    Every iteration starts a new generator, so several downstream nodes can
+    consume the same stream independently and nothing is held in memory.
+    Subclasses implement ``generate`` and describe themselves with ``config``
+    and an optional upstream ``source`` stream.
+    """
+    kind = None
+
+    def __init__(self, config: Dict, source: 'LazyStream' = None):
+        self.config = config
+        self.source = source
+
+    def generate(self) -> Iterator:
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator:
+        return self.generate()
+
+    def to_json(self) -> Dict:
+        data = {STREAM_KEY: self.kind, 'config': self.config}
+        if self.source is not None:
+            data['source'] = self.source.to_json()
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'LazyStream':
+        source = data.get('source')
+        return cls(data.get('config') or {}, restore_stream(source) if source is not None else None)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.config}>"
+
+
+def to_storable(value: Any) -> Any:
+    """JSON-storable form of a node result; streams are stored as their description"""
+    if isinstance(value, LazyStream):
+        return value.to_json()
+    return value
+
+
+def restore_stream(value: Any) -> Any:
+    """Rebuild a stream from its stored description; other values pass through"""
+    if isinstance(value, dict) and value.get(STREAM_KEY) in _stream_types:
+        return _stream_types[value[STREAM_KEY]].from_json(value)
+    return value
+
+
+@register_stream
+class ValuesStream(LazyStream):
+    """Stream over values passed inline, such as text from an input node"""
+    kind = 'values'
+
+    def generate(self) -> Iterator:
+        return iter(self.config.get('values', []))
+
+
+def as_stream(value: Any) -> LazyStream:
+    """Stream over a node input: streams as they are, text and lists inline"""
+    if isinstance(value, LazyStream):
+        return value
+    if isinstance(value, (list, tuple)):
+        return ValuesStream({'values': list(value)})
+    return ValuesStream({'values': [value]})
+
+
+def get_stream_input(input_data, port: str = 'input') -> Optional[LazyStream]:
+    """
+    The stream a node should consume from its input data
+
+    Reads ``port`` when connected, otherwise the first upstream result.
+    """
+    if not isinstance(input_data, dict):
+        return as_stream(input_data) if input_data is not None else None
+    value = input_data.get(port)
+    if value is None:
+        value = next((v for key, v in input_data.items() if key != 'variables' and v is not None), None)
+    return as_stream(value) if value is not None else None
@@ -1,21 +1,44 @@
 from celery import shared_task
-from .models import Workflow, WorkflowExecution
+from .models import Workflow, WorkflowExecution, WorkflowBatch
 from .execution import WorkflowExecutor
+from .retry import NodeRetryScheduled
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3})
+@shared_task(bind=True)
 def run_workflow(self, workflow_id, execution_id):
     try:
         workflow = Workflow.objects.get(id=workflow_id)
         execution = WorkflowExecution.objects.get(id=execution_id)
-        executor = WorkflowExecutor(execution)
+        execution.workflow = workflow
+        # Eager tasks have no broker to schedule a delayed retry on
+        executor = WorkflowExecutor(execution, defer_retries=not self.request.is_eager)
         executor.execute_workflow()
+    except NodeRetryScheduled as e:
+        logger.info(f"Execution {execution_id}: {str(e)}")
+        # Node retry policies bound the number of attempts, so the task-level
+        # limit must not cut a scheduled backoff short
+        raise self.retry(countdown=e.countdown, max_retries=self.request.retries + 1)
     except Workflow.DoesNotExist:
         logger.error(f"Workflow {workflow_id} not found")
     except WorkflowExecution.DoesNotExist:
         logger.error(f"WorkflowExecution {execution_id} not found")
     except Exception as e:
+        # Node failures reaching here are terminal: the node's retry policy is
+        # spent or rejected the error, and the executor marked the execution
+        # failed. Re-running the task would only restart the node's budget.
         logger.critical(f"Critical workflow error: {str(e)}", exc_info=True)
-        raise self.retry(exc=e)
\ No newline at end of file
+        raise
+
+@shared_task
+def run_workflow_batch(batch_id):
+    try:
+        batch = WorkflowBatch.objects.select_related('workflow').get(id=batch_id)
+    except WorkflowBatch.DoesNotExist:
+        logger.error(f"WorkflowBatch {batch_id} not found")
+        return
+    # Imported lazily to keep the thread pool machinery out of plain workflow runs
+    from .batch import BatchRunner, StreamingBatchRunner
+    runner_class = StreamingBatchRunner if batch.streaming else BatchRunner
+    runner_class(batch).run()
@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """Assertions on the number of queries an API endpoint runs"""
+
+    def count_queries(self, url, params=None, method='get', **kwargs) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, params, **kwargs)
+        self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+        return len(context.captured_queries)
+
+    def assertEndpointQueries(self, url, expected, params=None, method='get', **kwargs):
+        """Assert the exact number of queries one request to ``url`` runs"""
+        count = self.count_queries(url, params, method, **kwargs)
+        self.assertEqual(count, expected, f"{method.upper()} {url} ran {count} queries, expected {expected}")
+
+    def assertConstantQueries(self, url, add_rows, params=None, method='get', **kwargs):
+        """
+        Assert that ``url`` runs as many queries after ``add_rows()`` as before
+
+        Catches N+1 patterns that an exact count on a small fixture can hide.
+        """
+        before = self.count_queries(url, params, method, **kwargs)
+        add_rows()
+        after = self.count_queries(url, params, method, **kwargs)
+        self.assertEqual(before, after, f"{method.upper()} {url} went from {before} to {after} queries")
+        return after
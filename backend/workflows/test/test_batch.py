@@ -0,0 +1,211 @@
+import json
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from workflows.models import Workflow, Node, NodeConnection, WorkflowBatch, WorkflowExecution
+from workflows.batch import BatchRunner, StreamingBatchRunner, create_batch, iter_batch_output, iter_batch_rows
+from workflows.streams import ValuesStream
+
+User = get_user_model()
+
+
+class WorkflowBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='batchuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Batch Workflow', user=self.user)
+        self.input_node = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': '${document}'}, order=1
+        )
+        self.summarize_node = Node.objects.create(
+            workflow=self.workflow, type='huggingface_summarization', config={'model': 'bart'}, order=2
+        )
+        NodeConnection.objects.create(source_node=self.input_node, target_node=self.summarize_node)
+        self.url = reverse('workflow-batch', args=[self.workflow.id])
+
+    def test_iter_batch_rows_parses_jsonl_and_csv(self):
+        jsonl = ['{"document": "a"}\n', '\n', '{"document": "b"}\n']
+        csv_lines = ['document,lang\n', 'a,en\n', 'b,fr\n']
+        self.assertEqual(list(iter_batch_rows(jsonl, 'jsonl')), [{'document': 'a'}, {'document': 'b'}])
+        self.assertEqual(
+            list(iter_batch_rows(csv_lines, 'csv')),
+            [{'document': 'a', 'lang': 'en'}, {'document': 'b', 'lang': 'fr'}]
+        )
+        with self.assertRaises(ValueError):
+            list(iter_batch_rows(['[1, 2]'], 'jsonl'))
+
+    @patch('workflows.batch.execute_node_batch')
+    def test_batch_feeds_whole_batches_to_batch_capable_nodes(self, mock_batch):
+        mock_batch.side_effect = lambda node, inputs: [f"summary of {data['input']}" for data in inputs]
+        inputs = [{'document': f'doc {i}'} for i in range(5)]
+
+        response = self.client.post(self.url, {'inputs': inputs, 'concurrency': 1}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        batch = WorkflowBatch.objects.get(id=response.data['batch_id'])
+        self.assertEqual(batch.status, 'completed')
+        self.assertEqual(batch.completed_rows, 5)
+        mock_batch.assert_called_once()
+        self.assertEqual(len(mock_batch.call_args.args[1]), 5)
+
+        execution = batch.executions.order_by('id').first()
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.results[str(self.summarize_node.id)], 'summary of doc 0')
+        self.assertEqual(execution.node_results.count(), 2)
+
+    @patch('workflows.batch.execute_node_batch')
+    def test_failed_rows_do_not_fail_the_batch(self, mock_batch):
+        mock_batch.side_effect = lambda node, inputs: [
+            ValueError("too short") if data['input'] == 'bad' else 'ok' for data in inputs
+        ]
+        upload = SimpleUploadedFile('rows.csv', b'document\ngood\nbad\ngood\n', content_type='text/csv')
+
+        response = self.client.post(self.url, {'file': upload, 'concurrency': 1}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        batch = WorkflowBatch.objects.get(id=response.data['batch_id'])
+        self.assertEqual((batch.completed_rows, batch.failed_rows), (2, 1))
+        failed = batch.executions.get(status='failed')
+        self.assertEqual(failed.variables, {'document': 'bad'})
+        self.assertIn('too short', failed.error_logs)
+
+    @patch('workflows.execution.time.sleep')
+    @patch('workflows.batch.execute_node_batch')
+    @patch('workflows.execution.execute_node_util')
+    def test_row_retries_wait_in_the_runner_not_the_pool(self, mock_execute, mock_batch, executor_sleep):
+        failures = {'flaky': 2}
+
+        def flaky_input(node, input_data):
+            document = input_data['variables']['document']
+            if failures.get(document):
+                failures[document] -= 1
+                raise ConnectionError("reset by peer")
+            return document
+        mock_execute.side_effect = flaky_input
+        mock_batch.side_effect = lambda node, inputs: [f"summary of {data['input']}" for data in inputs]
+        batch = create_batch(self.workflow, [{'document': 'flaky'}, {'document': 'steady'}], concurrency=1)
+
+        runner = BatchRunner(batch)
+        runner.sleep = MagicMock()
+        runner.run()
+        self.assertEqual(batch.completed_rows, 2)
+        self.assertEqual(runner.sleep.call_count, 2)
+        executor_sleep.assert_not_called()
+        # Only the failing row was run again
+        self.assertEqual(mock_execute.call_count, 4)
+
+    def test_invalid_batch_input_is_rejected(self):
+        response = self.client.post(self.url, {'inputs': 'not a list'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = SimpleUploadedFile('rows.txt', b'hello', content_type='text/plain')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(WorkflowExecution.objects.exists())
+
+    @patch('workflows.batch.STREAM_CHUNK_SIZE', 2)
+    @patch('workflows.batch.execute_node_batch')
+    def test_streaming_batch_writes_jsonl_artifact(self, mock_batch):
+        mock_batch.side_effect = lambda node, inputs: [data['input'].upper() for data in inputs]
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        lines = b''.join(json.dumps({'document': f'doc {i}'}).encode() + b'\n' for i in range(5))
+        upload = SimpleUploadedFile('rows.jsonl', lines, content_type='application/x-ndjson')
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(
+                self.url, {'file': upload, 'stream': 'true', 'concurrency': 1}, format='multipart'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            batch = WorkflowBatch.objects.get(id=response.data['batch_id'])
+            self.assertTrue(batch.streaming)
+            self.assertEqual((batch.status, batch.total_rows, batch.completed_rows), ('completed', 5, 5))
+            # Rows are fed to batch-capable nodes chunk by chunk
+            self.assertEqual([len(call.args[1]) for call in mock_batch.call_args_list], [2, 2, 1])
+            self.assertFalse(WorkflowExecution.objects.exists())
+
+            download = self.client.get(reverse('workflowbatch-output', args=[batch.id]))
+            self.assertEqual(download.status_code, status.HTTP_200_OK)
+            rows = [json.loads(line) for line in b''.join(download.streaming_content).splitlines()]
+
+        self.assertEqual([row['row'] for row in rows], [0, 1, 2, 3, 4])
+        self.assertEqual(rows[3]['results'][str(self.summarize_node.id)], 'DOC 3')
+
+    @patch('workflows.batch.STREAM_CHUNK_SIZE', 2)
+    @patch('workflows.batch.execute_node_batch')
+    def test_streaming_batch_failures_are_recorded(self, mock_batch):
+        mock_batch.side_effect = lambda node, inputs: [data['input'].upper() for data in inputs]
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        lines = b''.join(json.dumps({'document': f'doc {i}'}).encode() + b'\n' for i in range(4))
+        upload = SimpleUploadedFile('rows.jsonl', lines, content_type='application/x-ndjson')
+        run_nodes = BatchRunner.run_nodes
+        chunks = []
+
+        def fail_second_chunk(runner, pool, executors, checkpoints=None):
+            chunks.append(len(executors))
+            if len(chunks) == 2:
+                raise RuntimeError("pool broke")
+            return run_nodes(runner, pool, executors, checkpoints)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            with patch.object(StreamingBatchRunner, 'run_nodes', fail_second_chunk):
+                response = self.client.post(
+                    self.url, {'file': upload, 'stream': 'true', 'concurrency': 1}, format='multipart'
+                )
+            batch = WorkflowBatch.objects.get(id=response.data['batch_id'])
+            rows = [json.loads(line) for line in iter_batch_output(batch)]
+
+        self.assertEqual((batch.status, batch.error), ('failed', 'pool broke'))
+        # Rows of the chunk that finished were stored before the failure
+        self.assertEqual([row['row'] for row in rows], [0, 1])
+        self.assertEqual((len(batch.output_parts), batch.total_rows), (1, 2))
+
+    @patch('workflows.batch.STREAM_CHUNK_SIZE', 2)
+    @patch('workflows.batch.execute_node_batch')
+    def test_streaming_batch_output_is_stored_per_chunk(self, mock_batch):
+        mock_batch.side_effect = lambda node, inputs: [ValuesStream({'values': [data['input']]}) for data in inputs]
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        lines = b''.join(json.dumps({'document': f'doc {i}'}).encode() + b'\n' for i in range(3))
+        stored = []
+
+        with override_settings(MEDIA_ROOT=media_root):
+            batch = WorkflowBatch.objects.create(
+                workflow=self.workflow, streaming=True, concurrency=1,
+                input_file=SimpleUploadedFile('rows.jsonl', lines)
+            )
+            store_part = StreamingBatchRunner.store_part
+
+            def record_rows_stored(runner, part):
+                stored.append(WorkflowBatch.objects.get(id=batch.id).total_rows)
+                return store_part(runner, part)
+
+            with patch.object(StreamingBatchRunner, 'store_part', record_rows_stored):
+                StreamingBatchRunner(batch).run()
+            rows = [json.loads(line) for line in iter_batch_output(batch)]
+
+        # Each chunk is stored as it finishes, not when the batch ends
+        self.assertEqual(stored, [0, 2])
+        self.assertEqual(len(batch.output_parts), 2)
+        self.assertEqual(rows[2]['results'][str(self.summarize_node.id)], {
+            '$stream': 'values', 'config': {'values': ['doc 2']}
+        })
+
+    @patch('workflows.batch.execute_node_batch')
+    def test_batch_output_streams_execution_records(self, mock_batch):
+        mock_batch.side_effect = lambda node, inputs: ['summary'] * len(inputs)
+        response = self.client.post(
+            self.url, {'inputs': [{'document': 'a'}, {'document': 'b'}], 'concurrency': 1}, format='json'
+        )
+
+        download = self.client.get(reverse('workflowbatch-output', args=[response.data['batch_id']]))
+
+        rows = [json.loads(line) for line in b''.join(download.streaming_content).splitlines()]
+        self.assertEqual([row['variables'] for row in rows], [{'document': 'a'}, {'document': 'b'}])
+        self.assertTrue(all(row['status'] == 'completed' for row in rows))
@@ -0,0 +1,153 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from workflows.execution import WorkflowExecutor
+from workflows.models import Workflow, WorkflowExecution
+from workflows.plan import ExecutionPlan
+
+User = get_user_model()
+
+
+def editor_node(node_id, node_type, name, **settings):
+    """A node as the flow editor saves it: reactFlowInstance.toObject() of getNodeData()"""
+    editor_type = node_type.replace('_', '-')
+    return {
+        'id': node_id,
+        'type': editor_type,
+        'position': {'x': 0, 'y': 0},
+        'positionAbsolute': {'x': 0, 'y': 0},
+        'width': 256,
+        'height': 120,
+        'selected': False,
+        'dragging': False,
+        'data': {'label': name, 'name': name, 'type': editor_type, 'description': f'{name} component', **settings},
+    }
+
+
+DEFINITION = {
+    'nodes': [
+        # Listed out of execution order on purpose
+        editor_node('summary-2', 'huggingface_summarization', 'Summarize', model='bart'),
+        editor_node('input-1', 'text_input', 'Chat Input', text='hello', inputs={'text': 'hello'}),
+        editor_node('muted-3', 'openai_tts', 'Speak', voice='en', is_enabled=False),
+    ],
+    'edges': [
+        {'id': 'e1', 'source': 'input-1', 'target': 'summary-2', 'sourceHandle': 'output', 'targetHandle': 'text'},
+        {'id': 'e2', 'source': 'summary-2', 'target': 'muted-3', 'sourceHandle': None, 'targetHandle': None},
+    ],
+    'viewport': {'x': 0, 'y': 0, 'zoom': 1},
+}
+
+
+class DefinitionPlanTests(TestCase):
+    def test_compiles_nodes_in_dependency_order(self):
+        with self.assertNumQueries(0):
+            plan = ExecutionPlan.from_definition(DEFINITION)
+
+        self.assertEqual([node.id for node in plan.nodes], ['input-1', 'summary-2'])
+        self.assertEqual(plan.nodes_by_id['summary-2'].type, 'huggingface_summarization')
+        self.assertEqual(plan.nodes_by_id['summary-2'].config, {'model': 'bart'})
+        self.assertEqual(plan.nodes_by_id['input-1'].config, {'text': 'hello', 'inputs': {'text': 'hello'}})
+        self.assertEqual(plan.get_node_input('summary-2', {'input-1': 'hello'}), {'text': 'hello'})
+
+    def test_node_type_falls_back_to_reactflow_type(self):
+        node = {'id': 'a', 'type': 'text-input', 'data': {'config': {'text': 'x'}}}
+        plan = ExecutionPlan.from_definition({'nodes': [node], 'edges': []})
+        self.assertEqual(plan.nodes[0].type, 'text_input')
+        # An explicit config takes precedence over the settings kept in data
+        self.assertEqual(plan.nodes[0].config, {'text': 'x'})
+
+    def test_reports_every_problem(self):
+        definition = {
+            'nodes': [
+                editor_node('a', 'text_input', 'A', text='x'),
+                editor_node('b', 'text_input', 'B', text='y'),
+                editor_node('c', 'not_a_node', 'C', x=1),
+                editor_node('d', 'text_input', 'D', inputs={'text': ''}),
+            ],
+            'edges': [
+                {'source': 'a', 'target': 'b'},
+                {'source': 'b', 'target': 'a'},
+                {'source': 'a', 'target': 'missing'},
+            ],
+        }
+        with self.assertRaises(ValidationError) as raised:
+            ExecutionPlan.from_definition(definition)
+        self.assertEqual(raised.exception.messages, [
+            "Node c: Invalid node type: not_a_node",
+            "Node d: Text input nodes require a text configuration",
+            "Edge references unknown node 'missing'",
+            "Workflow contains a cycle: a -> b -> a",
+        ])
+
+    def test_empty_definition_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            ExecutionPlan.from_definition({})
+
+
+class DefinitionExecutionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='definitionuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Editor Workflow', user=self.user, definition=DEFINITION)
+
+    @patch('workflows.execution.execute_node_util')
+    def test_executes_definition_without_node_rows(self, mock_execute):
+        mock_execute.side_effect = lambda node, input_data: f"{node.id} got {input_data}"
+        execution = WorkflowExecution.objects.create(
+            workflow=self.workflow, execution_context={'plan_source': 'definition'}
+        )
+
+        WorkflowExecutor(execution).execute_workflow()
+
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.results['summary-2'], "summary-2 got {'text': 'input-1 got None'}")
+        self.assertFalse(self.workflow.nodes.exists())
+
+    @patch('workflows.tasks.run_workflow.delay')
+    def test_execute_endpoint_validates_the_definition(self, mock_delay):
+        url = reverse('workflow-execute', args=[self.workflow.id])
+        response = self.client.post(url, {'source': 'definition'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        execution = WorkflowExecution.objects.get(id=response.data['execution_id'])
+        self.assertEqual(execution.execution_context, {'plan_source': 'definition'})
+
+        self.workflow.definition = {'nodes': [], 'edges': []}
+        self.workflow.save()
+        response = self.client.post(url, {'source': 'definition'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], ["Workflow definition has no nodes"])
+
+        response = self.client.post(url, {'source': 'rows'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('workflows.tasks.run_workflow.delay')
+    def test_editor_saves_a_definition_it_can_execute(self, mock_delay):
+        workflow = Workflow.objects.create(name='Unsaved Canvas', user=self.user)
+        detail_url = reverse('workflow-detail', args=[workflow.id])
+
+        response = self.client.patch(detail_url, {'definition': DEFINITION}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['definition'], DEFINITION)
+        response = self.client.post(
+            reverse('workflow-execute', args=[workflow.id]), {'source': 'definition'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_delay.assert_called_once_with(workflow.id, response.data['execution_id'])
+
+        # Graphs that cannot run are rejected when saved
+        cyclic = {
+            'nodes': DEFINITION['nodes'][:2],
+            'edges': DEFINITION['edges'][:1] + [{'id': 'e3', 'source': 'summary-2', 'target': 'input-1'}],
+        }
+        response = self.client.patch(detail_url, {'definition': cyclic}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cycle', response.data['definition'][0])
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.definition, DEFINITION)
@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from workflows.documents import (
+    ChunkStream, DocumentStream, RegexTokenizer, chunk_documents, chunk_text, load_documents
+)
+from workflows.execution import WorkflowExecutor
+from workflows.models import Node, NodeExecutionResult, Workflow, WorkflowExecution
+from workflows.retry import NonRetryableNodeError
+from workflows.streams import STREAM_KEY, restore_stream
+
+User = get_user_model()
+
+
+class DocumentTestCase(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(WORKFLOW_DOCUMENT_ROOTS=[self.root], WORKFLOW_DOCUMENT_BLOCK_SIZE=64)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        (self.root / 'notes.txt').write_text(''.join(f"Line {i} of the notes.\n" for i in range(20)))
+        (self.root / 'guide.md').write_text("# Intro\nWelcome.\n## Setup\nInstall it.\n")
+        (self.root / 'people.csv').write_text("name,role\nAda,engineer\nGrace,admiral\n")
+
+
+class DocumentLoaderTests(DocumentTestCase):
+    def test_streams_text_in_blocks(self):
+        documents = list(load_documents({'path': 'notes.txt'}))
+        self.assertGreater(len(documents), 1)
+        self.assertTrue(all(len(document['text']) < 64 + 30 for document in documents))
+        self.assertEqual(''.join(d['text'] for d in documents), (self.root / 'notes.txt').read_text())
+        self.assertEqual(documents[0]['metadata']['format'], 'text')
+
+    def test_markdown_sections_and_csv_rows(self):
+        markdown = list(load_documents({'path': 'guide.md'}))
+        self.assertEqual([d['metadata']['section'] for d in markdown], ['Intro', 'Setup'])
+
+        rows = list(load_documents({'path': 'people.csv'}))
+        self.assertEqual(rows[1]['text'], "name: Grace\nrole: admiral\n\n")
+        self.assertEqual(rows[1]['metadata']['row'], 2)
+        rows = list(load_documents({'path': 'people.csv', 'text_columns': ['name']}))
+        self.assertEqual(rows[0]['text'], "Ada\n\n")
+
+    def test_text_columns_may_be_a_comma_separated_string(self):
+        rows = list(load_documents({'path': 'people.csv', 'text_columns': 'name'}))
+        self.assertEqual(rows[0]['text'], "Ada\n\n")
+        rows = list(load_documents({'path': 'people.csv', 'text_columns': 'role, name'}))
+        self.assertEqual(rows[1]['text'], "admiral\nGrace\n\n")
+        with self.assertRaises(NonRetryableNodeError):
+            load_documents({'path': 'people.csv', 'text_columns': {'name': True}})
+
+        user = User.objects.create_user(username='columnsuser', password='testpass')
+        workflow = Workflow.objects.create(name='Columns', user=user)
+        with self.assertRaises(ValidationError):
+            Node.objects.create(workflow=workflow, type='document_loader', order=1,
+                                config={'path': 'people.csv', 'text_columns': [1, 2]})
+
+    def test_pdfs_without_pypdf_fail_when_loading(self):
+        (self.root / 'manual.pdf').write_bytes(b'%PDF-1.4')
+        with patch('workflows.documents.PdfReader', None):
+            with self.assertRaisesMessage(NonRetryableNodeError, 'pypdf is required'):
+                load_documents({'path': '.'})
+            # Paths without PDFs load as before
+            load_documents({'path': 'notes.txt'})
+
+    def test_directories_are_read_in_name_order(self):
+        sources = {Path(d['metadata']['source']).name for d in load_documents({'path': '.', 'pattern': '*.md'})}
+        self.assertEqual(sources, {'guide.md'})
+        first = next(iter(load_documents({'path': str(self.root)})))
+        self.assertEqual(Path(first['metadata']['source']).name, 'guide.md')
+
+    def test_paths_outside_the_roots_are_rejected(self):
+        with self.assertRaises(NonRetryableNodeError):
+            load_documents({'path': '../etc/passwd'})
+        with self.assertRaises(NonRetryableNodeError):
+            load_documents({'path': 'missing.txt'})
+
+
+class ChunkerTests(DocumentTestCase):
+    def test_chunks_overlap_and_cover_the_text(self):
+        tokenizer = RegexTokenizer()
+        text = ' '.join(f"word{i}" for i in range(50))
+        chunks = list(chunk_documents([{'text': text, 'metadata': {'source': 'a'}}], tokenizer, 20, 5))
+
+        self.assertEqual([chunk['metadata']['tokens'] for chunk in chunks], [20, 20, 20])
+        self.assertEqual([chunk['metadata']['chunk'] for chunk in chunks], [0, 1, 2])
+        tokens = [tokenizer.encode(chunk['text']) for chunk in chunks]
+        self.assertEqual(tokens[0][-5:], tokens[1][:5])
+        self.assertEqual(tokenizer.decode(tokens[0] + tokens[1][5:] + tokens[2][5:]), text)
+
+    def test_blocks_of_one_source_are_chunked_together(self):
+        documents = [
+            {'text': 'one two three', 'metadata': {'source': 'a', 'page': 1}},
+            {'text': ' four five six', 'metadata': {'source': 'a', 'page': 2}},
+            {'text': 'seven', 'metadata': {'source': 'b'}},
+        ]
+        chunks = list(chunk_documents(documents, RegexTokenizer(), 4, 1))
+        self.assertEqual([chunk['text'] for chunk in chunks], ['one two three four', ' four five six', 'seven'])
+        self.assertEqual([chunk['metadata'].get('page') for chunk in chunks], [1, 2, None])
+
+    def test_chunker_is_lazy_and_reiterable(self):
+        stream = chunk_text({'chunk_size': 16, 'chunk_overlap': 4, 'tokenizer': 'regex'},
+                            {'input': load_documents({'path': 'notes.txt'})})
+        self.assertIsInstance(stream, ChunkStream)
+        self.assertEqual(list(stream), list(stream))
+
+        restored = restore_stream(stream.to_json())
+        self.assertIsInstance(restored.source, DocumentStream)
+        self.assertEqual(list(restored), list(stream))
+
+    def test_plain_text_input(self):
+        chunks = list(chunk_text({'chunk_size': 3, 'chunk_overlap': 0, 'tokenizer': 'regex'}, {'input': 'a b c d'}))
+        self.assertEqual([chunk['text'] for chunk in chunks], ['a b c', ' d'])
+
+    def test_overlap_must_be_smaller_than_chunk(self):
+        with self.assertRaises(NonRetryableNodeError):
+            chunk_text({'chunk_size': 10, 'chunk_overlap': 10}, {'input': 'text'})
+
+
+class DocumentWorkflowTests(DocumentTestCase):
+    def test_executes_loader_and_chunker(self):
+        user = User.objects.create_user(username='documentuser', password='testpass')
+        definition = {
+            'nodes': [
+                {'id': 'load', 'type': 'document-loader', 'data': {'config': {'path': 'notes.txt'}}},
+                {'id': 'chunk', 'type': 'text-chunker',
+                 'data': {'config': {'chunk_size': 32, 'chunk_overlap': 8, 'tokenizer': 'regex'}}},
+            ],
+            'edges': [{'source': 'load', 'target': 'chunk'}],
+        }
+        workflow = Workflow.objects.create(name='Documents', user=user, definition=definition)
+        execution = WorkflowExecution.objects.create(workflow=workflow, execution_context={'plan_source': 'definition'})
+
+        executor = WorkflowExecutor(execution)
+        executor.execute_workflow()
+
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.results['chunk'][STREAM_KEY], 'chunks')
+        checkpoint = NodeExecutionResult.objects.get(execution=execution, node_key='chunk')
+        self.assertEqual(list(restore_stream(checkpoint.result)), list(executor.results['chunk']))
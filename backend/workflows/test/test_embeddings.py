@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase, override_settings
+from InnoFlow.ai_integration.models import AIModelConfig
+from InnoFlow.ai_integration.utils.mock_provider import MockProvider
+from workflows.embeddings import EmbeddingCache, content_key, run_embedding
+from workflows.keyword_index import run_keyword_search
+from workflows.retrieval import run_hybrid_retriever
+from workflows.retry import NonRetryableNodeError
+from workflows.streams import restore_stream, to_storable
+from workflows.vector_store import run_vector_store
+
+
+class EmbeddingCacheTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_flushed_vectors_are_found_by_other_instances(self):
+        cache = EmbeddingCache(self.directory, 'model')
+        keys = [content_key(f'text {i}') for i in range(50)]
+        vectors = np.arange(150, dtype=np.float32).reshape(50, 3)
+        cache.put(keys[:30], vectors[:30])
+        cache.flush()
+        cache.put(keys[30:], vectors[30:])
+        cache.flush()
+
+        other = EmbeddingCache(self.directory, 'model')
+        found = other.get_many(keys + [content_key('unknown')])
+        self.assertEqual(len(found), 50)
+        np.testing.assert_array_equal(np.stack([found[key] for key in keys]), vectors)
+        self.assertIsInstance(other.vectors, np.memmap)
+
+        # A flush from another instance merges with what is already on disk
+        other.put([keys[0], content_key('new')], np.ones((2, 3), dtype=np.float32))
+        other.flush()
+        cache.refresh()
+        self.assertEqual(len(cache), 51)
+        np.testing.assert_array_equal(cache.get_many([keys[0]])[keys[0]], vectors[0])
+
+    def test_interrupted_flush_keeps_keys_paired_with_their_rows(self):
+        cache = EmbeddingCache(self.directory, 'model')
+        keys = [content_key(f'text {i}') for i in range(20)]
+        vectors = np.arange(60, dtype=np.float32).reshape(20, 3)
+        cache.put(keys[:10], vectors[:10])
+        cache.flush()
+
+        # Stopped after the index was replaced, before meta.json was
+        cache.put(keys[10:], vectors[10:])
+        with patch('workflows.embeddings.write_json', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                cache.flush()
+
+        found = EmbeddingCache(self.directory, 'model').get_many(keys)
+        for key, vector in zip(keys, vectors):
+            if key in found:
+                np.testing.assert_array_equal(found[key], vector)
+        self.assertTrue(set(keys[:10]) <= set(found))
+
+
+@patch.object(MockProvider, 'max_embedding_batch', 4)
+class EmbeddingNodeTests(TestCase):
+    def setUp(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(WORKFLOW_INDEX_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.model_config = AIModelConfig.objects.create(
+            name='Embeddings', provider='OPENAI', model_name='text-embedding-3-small',
+            api_key='test-key', model_type='embedding'
+        )
+        self.config = {'model_config': self.model_config.pk}
+        self.chunks = [
+            {'text': text, 'metadata': {'source': 'kb.txt', 'chunk': number}}
+            for number, text in enumerate([
+                'Invoices exported as CSV are missing the tax column',
+                'Tax rates are configured per country',
+                'Password reset emails arrive late',
+                'The mobile app crashes on login',
+                'Password reset emails arrive late',
+                'Exports can be scheduled weekly',
+            ])
+        ]
+
+    def test_embeds_distinct_uncached_texts_in_provider_batches(self):
+        with patch.object(MockProvider, 'embed', autospec=True, side_effect=MockProvider.embed) as embed:
+            output = run_embedding(self.config, {'input': self.chunks})
+            # Five distinct texts in batches of at most four
+            self.assertEqual([len(call.args[1]) for call in embed.call_args_list], [4, 1])
+
+            items = list(restore_stream(to_storable(output)))
+            self.assertEqual(len(items), 6)
+            self.assertEqual(items[2]['embedding'], items[4]['embedding'])
+            self.assertEqual(items[0]['metadata'], {'source': 'kb.txt', 'chunk': 0})
+
+            # Re-embedding an updated corpus only computes the changed chunk
+            embed.reset_mock()
+            self.chunks[1]['text'] = 'Tax rates are configured per region'
+            run_embedding(self.config, {'input': self.chunks})
+            self.assertEqual([call.args[1] for call in embed.call_args_list], [[self.chunks[1]['text']]])
+
+    def test_embedded_chunks_feed_the_retrieval_nodes(self):
+        run_vector_store({'index': 'kb', 'operation': 'upsert'}, {'input': run_embedding(self.config, {'input': self.chunks})})
+        run_keyword_search({'index': 'kb', 'operation': 'upsert'}, {'input': self.chunks})
+
+        query = run_embedding(self.config, {'input': 'password reset'})
+        results = run_vector_store({'index': 'kb', 'top_k': 1}, {'query': query})
+        self.assertEqual(results[0]['text'], 'Password reset emails arrive late')
+
+        output = run_hybrid_retriever(
+            {'keyword_index': 'kb', 'vector_index': 'kb', 'embedding_model_config': self.model_config.pk,
+             'tokenizer': 'regex'},
+            {'query': 'mobile crashes'}
+        )
+        self.assertEqual(output['results'][0]['id'], 'kb.txt#3')
+        self.assertEqual(set(output['results'][0]['scores']), {'keyword', 'vector'})
+
+    def test_requires_a_model(self):
+        with self.assertRaises(NonRetryableNodeError):
+            run_embedding({}, {'input': 'text'})
+        with self.assertRaises(NonRetryableNodeError):
+            run_embedding({'model_config': 999999}, {'input': 'text'})
@@ -0,0 +1,144 @@
+import json
+import threading
+from unittest import TestCase as SimpleTestCase
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from workflows.models import Workflow, Node, NodeConnection, WorkflowExecution
+from workflows.events import LocalEventBroker, get_event_broker, execution_channel
+from workflows.execution import WorkflowExecutor
+from workflows.retry import NonRetryableNodeError
+
+User = get_user_model()
+
+
+def parse_sse(content):
+    """Parse an SSE body into (event, data) pairs, ignoring comments and retry hints"""
+    events = []
+    for message in content.decode().split('\n\n'):
+        fields = dict(
+            line.split(': ', 1) for line in message.splitlines()
+            if ': ' in line and not line.startswith(':')
+        )
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class LocalEventBrokerTests(SimpleTestCase):
+    def test_replays_buffered_events_after_id(self):
+        broker = LocalEventBroker(buffer_size=2)
+        for n in range(3):
+            broker.publish('chan', 'tick', {'n': n})
+        self.assertEqual([e.data['n'] for e in broker.get_events('chan')], [1, 2])
+        self.assertEqual([e.id for e in broker.get_events('chan', after_id=2)], [3])
+
+    def test_listen_wakes_on_publish(self):
+        broker = LocalEventBroker()
+        timer = threading.Timer(0.05, broker.publish, args=('chan', 'tick'))
+        timer.start()
+        events = broker.listen('chan', timeout=5)
+        timer.join()
+        self.assertEqual([e.type for e in events], ['tick'])
+        self.assertEqual(broker.listen('chan', after_id=1, timeout=0.01), [])
+
+    def test_evicts_least_recently_used_channels(self):
+        broker = LocalEventBroker(max_channels=2)
+        for channel in ('a', 'b', 'c'):
+            broker.publish(channel, 'tick')
+        self.assertEqual(broker.get_events('a'), [])
+        self.assertEqual(len(broker.get_events('c')), 1)
+
+    def test_reset_drops_events_but_keeps_ids(self):
+        broker = LocalEventBroker()
+        broker.publish('chan', 'execution_finished')
+        broker.reset('chan')
+        self.assertEqual(broker.get_events('chan'), [])
+        self.assertEqual(broker.publish('chan', 'execution_started').id, 2)
+
+
+class ExecutionEventsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='eventsuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Events Workflow', user=self.user)
+        self.input_node = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': 'hello'}, order=1
+        )
+        self.summarize_node = Node.objects.create(
+            workflow=self.workflow, type='huggingface_summarization', config={'model': 'bart'}, order=2
+        )
+        NodeConnection.objects.create(source_node=self.input_node, target_node=self.summarize_node)
+        # Execution ids are reused between tests, so each test gets its own broker
+        broker_patcher = patch('workflows.events._broker', LocalEventBroker())
+        broker_patcher.start()
+        self.addCleanup(broker_patcher.stop)
+
+    @patch('workflows.execution.execute_node_util')
+    def test_executor_publishes_node_progress(self, mock_execute):
+        mock_execute.side_effect = lambda node, input_data, **kwargs: 'x' * 2000
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+
+        WorkflowExecutor(execution).execute_workflow()
+
+        events = get_event_broker().get_events(execution_channel(execution.id))
+        self.assertEqual(
+            [event.type for event in events],
+            ['execution_started', 'node_started', 'node_finished',
+             'node_started', 'node_finished', 'execution_finished']
+        )
+        finished = events[2].data
+        self.assertEqual(finished['node_id'], self.input_node.id)
+        self.assertIn('duration', finished)
+        self.assertLess(len(finished['output']), 2000)
+
+    @patch('workflows.execution.execute_node_util')
+    def test_events_endpoint_streams_until_execution_finishes(self, mock_execute):
+        mock_execute.side_effect = ['hello', 'summary']
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        WorkflowExecutor(execution).execute_workflow()
+        url = reverse('workflowexecution-events', args=[execution.id])
+
+        response = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = parse_sse(b''.join(response.streaming_content))
+        self.assertEqual(events[-1], ('execution_finished', {'status': 'completed'}))
+        self.assertEqual(events[4][1]['output'], 'summary')
+
+        # Reconnecting after the last event only reports the final state
+        response = self.client.get(url, HTTP_LAST_EVENT_ID='6')
+        events = parse_sse(b''.join(response.streaming_content))
+        self.assertEqual(events, [('execution_finished', {'status': 'completed'})])
+
+    @patch('workflows.views.run_workflow.delay')
+    @patch('workflows.execution.execute_node_util')
+    def test_resume_does_not_replay_the_previous_run(self, mock_execute, mock_delay):
+        def execute(node, input_data, **kwargs):
+            if node.type != 'text_input':
+                raise NonRetryableNodeError('model offline')
+            return 'hello'
+        mock_execute.side_effect = execute
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        with self.assertRaises(NonRetryableNodeError):
+            WorkflowExecutor(execution).execute_workflow()
+        last_id = get_event_broker().get_events(execution_channel(execution.id))[-1].id
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(reverse('workflowexecution-resume', args=[execution.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_delay.assert_called_once_with(self.workflow.id, execution.id)
+        broker = get_event_broker()
+        channel = execution_channel(execution.id)
+        self.assertEqual(broker.get_events(channel), [])
+        # Events of the resumed run come after any id a client already saw
+        self.assertEqual(broker.publish(channel, 'execution_started').id, last_id + 1)
+
+    def test_events_endpoint_unknown_execution(self):
+        response = self.client.get(
+            reverse('workflowexecution-events', args=[999]), HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
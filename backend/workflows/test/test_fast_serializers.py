@@ -0,0 +1,66 @@
+import datetime
+import decimal
+import json
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.request import Request
+from InnoFlow.analytics.models import WorkflowAnalytics
+from InnoFlow.analytics.serializers import WorkflowAnalyticsSerializer
+from workflows.fast_serializers import get_values_serializer
+from workflows.models import Workflow, WorkflowExecution
+from workflows.renderers import FastJSONRenderer
+from workflows.serializers import WorkflowExecutionSerializer
+
+User = get_user_model()
+
+
+class FastSerializerCompatibilityTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='fastuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Fast Workflow', user=self.user)
+        WorkflowExecution.objects.create(
+            workflow=self.workflow, status='completed', results={'1': ['a', 1.5, None]},
+            error_logs='boom', completed_at=datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, datetime.timezone.utc)
+        )
+        WorkflowExecution.objects.create(workflow=self.workflow, status='pending')
+        WorkflowAnalytics.objects.create(workflow=self.workflow, execution_time=0.25, success_rate=1.0, error_count=2)
+
+    def model_serializer_rows(self, serializer_class, queryset, params=None):
+        request = Request(APIRequestFactory().get('/', params or {}))
+        data = serializer_class(queryset, many=True, context={'request': request}).data
+        return json.loads(JSONRenderer().render(data))
+
+    def fast_rows(self, url, params=None):
+        response = self.client.get(url, params or {})
+        return json.loads(response.content)['results']
+
+    def test_execution_list_matches_model_serializer(self):
+        queryset = WorkflowExecution.objects.order_by('-started_at', '-id')
+        url = reverse('workflowexecution-list')
+        for params in ({}, {'include': 'results,error_logs'}, {'fields': 'id,completed_at'}):
+            self.assertEqual(
+                self.fast_rows(url, params),
+                self.model_serializer_rows(WorkflowExecutionSerializer, queryset, params)
+            )
+
+    def test_analytics_list_matches_model_serializer(self):
+        self.assertEqual(
+            self.fast_rows(reverse('analytics:analytics-list')),
+            self.model_serializer_rows(WorkflowAnalyticsSerializer, WorkflowAnalytics.objects.all())
+        )
+
+    def test_nested_serializers_are_rejected(self):
+        from workflows.serializers import WorkflowSerializer
+        with self.assertRaises(TypeError):
+            get_values_serializer(WorkflowSerializer)
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'when': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            'amount': decimal.Decimal('1.5'),
+            'text': 'naïve ✓',
+            'nested': [{'a': None, 'b': True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
@@ -0,0 +1,102 @@
+from unittest import TestCase as SimpleTestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from InnoFlow.ai_integration.models import NodePort
+from workflows.models import Workflow, Node, NodeConnection
+from workflows.connection_handlers import ConnectionManager
+from workflows.graph import find_cycles, has_cycle, topological_order
+from workflows.node_types import validate_workflow_structure
+
+User = get_user_model()
+
+
+class GraphAlgorithmTests(SimpleTestCase):
+    def test_topological_order_keeps_input_order_for_ties(self):
+        order, remaining = topological_order([3, 1, 2], [(1, 2), (3, 2)])
+        self.assertEqual(order, [3, 1, 2])
+        self.assertEqual(remaining, [])
+
+    def test_topological_order_reports_unorderable_nodes(self):
+        order, remaining = topological_order([1, 2, 3, 4], [(1, 2), (2, 3), (3, 2), (3, 4)])
+        self.assertEqual(order, [1])
+        self.assertEqual(remaining, [2, 3, 4])
+
+    def test_find_cycles_reports_every_independent_cycle(self):
+        edges = [(1, 2), (2, 3), (3, 1), (4, 5), (5, 4), (6, 6), (3, 4), (7, 8)]
+        self.assertEqual(find_cycles(range(1, 9), edges), [[1, 2, 3, 1], [4, 5, 4], [6, 6]])
+        self.assertEqual(find_cycles([1, 2, 3], [(1, 2), (2, 3), (1, 3)]), [])
+
+    def test_deep_chains_do_not_recurse(self):
+        size = 20000
+        edges = [(i, i + 1) for i in range(size)] + [(size, 0)]
+        cycles = find_cycles(range(size + 1), edges)
+        self.assertEqual(len(cycles), 1)
+        self.assertEqual(len(cycles[0]), size + 2)
+        self.assertTrue(has_cycle(range(size + 1), edges))
+        self.assertFalse(has_cycle(range(size + 1), edges[:-1]))
+
+
+class ValidateWorkflowStructureTests(SimpleTestCase):
+    def connection(self, source, target, source_port='output', target_port='input'):
+        return {'source_node': source, 'target_node': target,
+                'source_port': source_port, 'target_port': target_port}
+
+    def test_long_chain_is_valid(self):
+        nodes = [{'id': 0, 'type': 'text_input', 'config': {}}] + [
+            {'id': i, 'type': 'text_transformation', 'config': {'operation': 'trim'}}
+            for i in range(1, 10000)
+        ]
+        connections = [self.connection(i, i + 1) for i in range(9999)]
+        self.assertEqual(validate_workflow_structure(nodes, connections), [])
+
+        connections.append(self.connection(9999, 1))
+        self.assertEqual(validate_workflow_structure(nodes, connections), ["Workflow contains a cycle"])
+
+    def test_reports_node_and_port_errors(self):
+        nodes = [
+            {'id': 'a', 'type': 'text_input', 'config': {}},
+            {'id': 'b', 'type': 'text_transformation', 'config': {}},
+            {'id': 'c', 'type': 'no_such_type', 'config': {}},
+        ]
+        connections = [
+            self.connection('a', 'b', target_port='output'),
+            self.connection('a', 'missing'),
+            self.connection('a', 'c'),
+        ]
+        self.assertEqual(validate_workflow_structure(nodes, connections), [
+            "Node b: Required parameter 'operation' is missing",
+            "Unknown node type: no_such_type",
+            "Connection target port output is not an input port",
+            "Connection references non-existent target node missing",
+        ])
+
+
+class ValidateWorkflowConnectionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='graphuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Graph Workflow', user=self.user)
+        self.nodes = [
+            Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'x'}, order=i)
+            for i in range(4)
+        ]
+        for node in self.nodes:
+            NodePort.objects.create(node=node, name='input', port_type='input')
+
+    def connect(self, source, target, target_port='input'):
+        NodeConnection.objects.create(source_node=source, target_node=target, target_port=target_port)
+
+    def test_reports_all_problems_with_constant_queries(self):
+        a, b, c, d = self.nodes
+        self.connect(a, b)
+        self.connect(b, a)
+        self.connect(a, c)
+        self.connect(b, c)
+
+        with self.assertNumQueries(4):
+            errors = ConnectionManager.validate_workflow_connections(self.workflow.id)
+
+        self.assertEqual(errors, [
+            f"Workflow contains a cycle: {a.id} -> {b.id} -> {a.id}",
+            f"Node {c.id}: Required input port 'input' has multiple connections",
+            f"Node {d.id}: Required input port 'input' has no connection",
+        ])
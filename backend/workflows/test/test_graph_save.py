@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from InnoFlow.ai_integration.models import NodePort
+from workflows.models import Workflow, Node, NodeConnection
+
+User = get_user_model()
+
+
+class SaveWorkflowGraphTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='graphsaveuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Editor Workflow', user=self.user)
+        self.input_node = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': 'hello'}, order=1
+        )
+        self.old_node = Node.objects.create(
+            workflow=self.workflow, type='openai_tts', config={'voice': 'en'}, order=2
+        )
+        NodeConnection.objects.create(source_node=self.input_node, target_node=self.old_node)
+        self.url = reverse('workflow-graph', args=[self.workflow.id])
+
+    def test_save_graph_diffs_against_stored_graph(self):
+        payload = {
+            'nodes': [
+                {'id': self.input_node.id, 'config': {'text': 'changed'}, 'order': 1},
+                {'key': 'sum', 'type': 'huggingface_summarization', 'config': {'model': 'bart'}, 'order': 2},
+                {'key': 'in2', 'type': 'text_input', 'config': {'text': 'second'}, 'order': 3},
+            ],
+            'connections': [
+                {'source': self.input_node.id, 'target': 'sum'},
+                {'source': 'in2', 'target': 'sum', 'target_port': 'context'},
+            ]
+        }
+
+        with self.assertNumQueries(15):
+            response = self.client.put(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['nodes'], {'created': 2, 'updated': 1, 'deleted': 1})
+        self.assertEqual(response.data['connections'], {'created': 2, 'deleted': 0})
+        self.assertFalse(Node.objects.filter(id=self.old_node.id).exists())
+
+        summary_id = response.data['node_ids']['sum']
+        second_id = response.data['node_ids']['in2']
+        self.input_node.refresh_from_db()
+        self.assertEqual(self.input_node.config, {'text': 'changed'})
+        self.assertEqual(
+            set(NodeConnection.objects.values_list('source_node_id', 'target_node_id', 'target_port')),
+            {(self.input_node.id, summary_id, 'input'), (second_id, summary_id, 'context')}
+        )
+        # New registered node types get their ports in bulk
+        self.assertEqual(
+            list(NodePort.objects.filter(node_id=second_id).values_list('name', 'port_type')),
+            [('output', 'output')]
+        )
+
+        # Saving the same graph again changes nothing
+        payload['nodes'][1:] = [
+            {'id': summary_id, 'type': 'huggingface_summarization', 'config': {'model': 'bart'}, 'order': 2},
+            {'id': second_id, 'key': 'in2', 'type': 'text_input', 'config': {'text': 'second'}, 'order': 3},
+        ]
+        for connection in payload['connections']:
+            connection['target'] = summary_id
+        response = self.client.put(self.url, payload, format='json')
+        self.assertEqual(response.data['nodes'], {'created': 0, 'updated': 0, 'deleted': 0})
+        self.assertEqual(response.data['connections'], {'created': 0, 'deleted': 0})
+
+    def test_invalid_graph_is_rejected_without_changes(self):
+        payload = {
+            'nodes': [
+                {'id': self.input_node.id},
+                {'key': 'a', 'type': 'huggingface_summarization', 'config': {'model': 'bart'}, 'order': 1},
+                {'key': 'b', 'type': 'not_a_type', 'config': {'x': 1}, 'order': 3},
+            ],
+            'connections': [
+                {'source': 'a', 'target': 'b'},
+                {'source': 'b', 'target': 'a'},
+                {'source': 'a', 'target': 'missing'},
+            ]
+        }
+
+        response = self.client.put(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], [
+            "Node b: Invalid node type: not_a_type",
+            "Duplicate node order in workflow: 1",
+            "Connection references unknown node 'missing'",
+            "Workflow contains a cycle: a -> b -> a",
+        ])
+        self.assertEqual(Node.objects.filter(workflow=self.workflow).count(), 2)
+        self.assertEqual(NodeConnection.objects.count(), 1)
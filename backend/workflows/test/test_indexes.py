@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from InnoFlow.ai_integration.models import NodePort
+from InnoFlow.analytics.models import WorkflowAnalytics
+from workflows.models import Workflow, Node, NodeConnection, WorkflowExecution
+
+User = get_user_model()
+
+
+class HotQueryIndexTests(TestCase):
+    """The hot query patterns are answered from their dedicated indexes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='indexuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Index Workflow', user=self.user)
+        self.node = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': 'x'}, order=1
+        )
+
+    def assertUsesIndex(self, queryset, index_name):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tables are tiny in tests, so make the planner show whether
+                # an index can serve the query at all
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"Expected {index_name} in query plan:\n{plan}")
+
+    def test_connection_target_port_lookup(self):
+        queryset = NodeConnection.objects.filter(target_node=self.node, target_port='input')
+        self.assertUsesIndex(queryset, 'wf_connection_target_port')
+
+    def test_required_port_lookup(self):
+        queryset = NodePort.objects.filter(node=self.node, port_type='input', optional=False)
+        self.assertUsesIndex(queryset, 'ai_nodeport_type_optional')
+
+    def test_execution_status_lookup(self):
+        queryset = WorkflowExecution.objects.filter(workflow=self.workflow, status='completed')
+        self.assertUsesIndex(queryset, 'wf_execution_workflow_status')
+
+    def test_running_executions_use_partial_index(self):
+        queryset = WorkflowExecution.objects.filter(status='running').order_by('started_at')
+        self.assertUsesIndex(queryset, 'wf_execution_running')
+
+    def test_recent_analytics_lookup(self):
+        queryset = WorkflowAnalytics.objects.filter(workflow=self.workflow).order_by('-executed_at')
+        self.assertUsesIndex(queryset, 'analytics_workflow_executed')
+
+    def test_nodes_in_order_use_unique_order_index(self):
+        if not connection.features.supports_deferrable_unique_constraints:
+            self.skipTest("Deferrable unique constraints are not created on this database")
+        queryset = Node.objects.filter(workflow=self.workflow).order_by('order')
+        self.assertUsesIndex(queryset, 'unique_node_order_per_workflow')
@@ -0,0 +1,158 @@
+import fcntl
+import math
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase, override_settings
+from workflows.index_storage import LOCK
+from workflows.keyword_index import KeywordIndex, analyze, build_segment, get_keyword_index, run_keyword_search
+from workflows.retry import NonRetryableNodeError
+
+
+def brute_force_bm25(texts, query, k, k1=1.2, b=0.75):
+    documents = [Counter(analyze(text)) for text in texts]
+    avgdl = sum(sum(d.values()) for d in documents) / len(documents)
+    scores = []
+    for doc, counts in enumerate(documents):
+        score = 0.0
+        for term in set(analyze(query)):
+            df = sum(1 for d in documents if term in d)
+            if counts[term]:
+                idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+                tf = counts[term]
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * sum(counts.values()) / avgdl))
+        if score:
+            scores.append((score, doc))
+    return sorted(scores, reverse=True)[:k]
+
+
+class KeywordIndexTests(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(WORKFLOW_INDEX_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        rng = np.random.default_rng(3)
+        words = [f'w{i}' for i in range(60)]
+        # Zipf-like term frequencies so some postings span several blocks
+        weights = 1 / np.arange(1, len(words) + 1)
+        self.texts = [
+            ' '.join(rng.choice(words, size=rng.integers(5, 40), p=weights / weights.sum()))
+            for _ in range(900)
+        ]
+
+    def make_index(self, segments=3):
+        index = KeywordIndex(self.root / 'keywords' / 'test')
+        size = -(-len(self.texts) // segments)
+        for start in range(0, len(self.texts), size):
+            texts = self.texts[start:start + size]
+            index.add([str(i) for i in range(start, start + len(texts))], texts)
+            index.save()
+        return index
+
+    def test_matches_brute_force_bm25(self):
+        index = self.make_index()
+        self.assertEqual(len(index.segments), 3)
+        for query in ['w0 w1', 'w3 w17 w42', 'w55 w0 w2 w9', 'w59']:
+            expected = brute_force_bm25(self.texts, query, 10)
+            results = index.search(query, k=10)
+            np.testing.assert_allclose([r['score'] for r in results], [s for s, _ in expected], rtol=1e-5)
+            self.assertEqual({r['id'] for r in results}, {str(doc) for _, doc in expected})
+
+    def test_postings_are_delta_encoded_with_skip_pointers(self):
+        segment = build_segment([(str(i), Counter(analyze(text)), {}) for i, text in enumerate(self.texts)])
+        t = segment.term_index('w0')
+        docs, tfs = segment.postings(t)
+        self.assertGreater(len(docs), 256)
+        self.assertTrue(np.all(np.diff(docs) > 0))
+        self.assertLessEqual(segment.deltas.dtype.itemsize, 2)
+
+        candidates = np.array([0, 1, int(docs[200]), int(docs[-1]), len(self.texts) + 5])
+        matched, matched_tfs = segment.lookup(t, candidates)
+        expected = np.isin(candidates, docs)
+        np.testing.assert_array_equal(matched, expected)
+        np.testing.assert_array_equal(matched_tfs, tfs[np.searchsorted(docs, candidates[expected])])
+
+    def test_deletes_merges_and_reopen(self):
+        index = self.make_index()
+        index.add(['0'], ['w59 w59 w59'], [{'text': 'replaced'}])
+        index.delete(['1'])
+        self.assertEqual(index.search('w59', k=1)[0]['text'], 'replaced')
+        self.assertNotIn('1', {r['id'] for r in index.search(self.texts[1], k=900)})
+
+        # Merges the newest segments; tombstones of the first one stay until compaction
+        index.max_segments = 2
+        index.save()
+        self.assertEqual(len(index.segments), 2)
+        self.assertEqual(index.size, len(self.texts) + 1)
+        index.compact()
+        self.assertEqual(index.size, len(self.texts) - 1)
+
+        reopened = KeywordIndex.open(index.directory)
+        self.assertEqual(len(reopened), len(self.texts) - 1)
+        self.assertEqual(reopened.search('w59', k=1)[0]['text'], 'replaced')
+        self.assertEqual([r['id'] for r in reopened.search('w3 w17', k=5)],
+                         [r['id'] for r in index.search('w3 w17', k=5)])
+
+    def test_search_reads_payloads_of_replaced_segments(self):
+        index = self.make_index()
+        index.delete(['0'])
+        resolve = KeywordIndex._resolve
+
+        def compacted_before_resolving(segments, rows, scores):
+            # Merges every segment into a new one and unlinks their files
+            index.compact()
+            return resolve(segments, rows, scores)
+
+        expected = index.search('w3 w17', k=5)
+        with patch.object(KeywordIndex, '_resolve', staticmethod(compacted_before_resolving)):
+            results = index.search('w3 w17', k=5)
+        self.assertEqual(results, expected)
+        self.assertEqual(len(list(index.directory.glob('segment-*.payloads.jsonl'))), 1)
+
+    def test_node_upsert_and_search(self):
+        chunks = [
+            {'text': 'The invoice export is missing the tax column', 'metadata': {'source': 'a.txt', 'chunk': 0}},
+            {'text': 'Password reset emails arrive late', 'metadata': {'source': 'a.txt', 'chunk': 1}},
+        ]
+        summary = run_keyword_search({'index': 'tickets', 'operation': 'upsert'}, {'input': chunks})
+        self.assertEqual(summary, {'index': 'tickets', 'upserted': 2, 'size': 2})
+
+        results = run_keyword_search({'index': 'tickets', 'top_k': 1}, {'query': 'tax invoice'})
+        self.assertEqual(results[0]['id'], 'a.txt#0')
+        self.assertEqual(results[0]['metadata'], {'source': 'a.txt', 'chunk': 0})
+        self.assertIsNotNone(get_keyword_index('tickets'))
+
+        with self.assertRaises(NonRetryableNodeError):
+            run_keyword_search({'index': 'unknown'}, {'query': 'tax'})
+
+    def test_writers_lock_the_index_and_load_other_writers_changes(self):
+        run_keyword_search({'index': 'tickets', 'operation': 'upsert'}, {'input': ['tax invoice']})
+        directory = self.root / 'keywords' / 'tickets'
+        # Another process adds a document to the index this one has cached
+        other = KeywordIndex.open(directory)
+        other.add(['other'], ['password reset'])
+        other.save()
+
+        save = KeywordIndex.save
+        lock_held = []
+
+        def save_and_check_lock(index):
+            with open(directory / LOCK) as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                    lock_held.append(False)
+                except BlockingIOError:
+                    lock_held.append(True)
+            save(index)
+
+        with patch.object(KeywordIndex, 'save', save_and_check_lock):
+            summary = run_keyword_search({'index': 'tickets', 'operation': 'upsert'}, {'input': ['late emails']})
+        self.assertEqual(lock_held, [True])
+        self.assertEqual(summary['size'], 3)
+        self.assertEqual(len(KeywordIndex.open(directory)), 3)
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from workflows.models import Workflow, Node
+
+User = get_user_model()
+
+
+class NodeSaveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='nodesaveuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Save Workflow', user=self.user)
+        self.node = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': 'hello'}, order=1
+        )
+
+    def test_duplicate_order_is_rejected(self):
+        with self.assertRaisesMessage(ValidationError, "Duplicate node order in workflow"):
+            Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'x'}, order=1)
+
+    def test_trusted_updates_skip_validation(self):
+        self.node.retry_count = 2
+        with self.assertNumQueries(1):
+            self.node.save(update_fields=['retry_count'])
+
+        self.node.config = {}
+        with self.assertNumQueries(1):
+            self.node.save(validate=False)
+
+    def test_update_fields_only_validates_updated_fields(self):
+        self.node.config = {'text': 'changed'}
+        # No uniqueness query when the order is not being saved
+        with self.assertNumQueries(1):
+            self.node.save(update_fields=['config'])
+
+        self.node.config = {}
+        with self.assertRaises(ValidationError):
+            self.node.save(update_fields=['config'])
+
+
+class NodeSerializerValidationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='nodeapiuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='API Workflow', user=self.user)
+        Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'hello'}, order=1)
+
+    def test_invalid_nodes_are_rejected_before_saving(self):
+        url = reverse('node-list')
+        duplicate = {'workflow': self.workflow.id, 'type': 'text_input', 'config': {'text': 'x'}, 'order': 1}
+        missing_text = {'workflow': self.workflow.id, 'type': 'text_input', 'config': {'other': 'x'}, 'order': 2}
+
+        self.assertEqual(self.client.post(url, duplicate, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, missing_text, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Text input nodes require a text configuration", response.data['non_field_errors'])
+        self.assertEqual(Node.objects.count(), 1)
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from InnoFlow.analytics.models import WorkflowAnalytics
+from workflows.models import Workflow, Node, WorkflowExecution
+
+User = get_user_model()
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pageuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.workflow = Workflow.objects.create(name='Paged Workflow', user=self.user)
+        Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'x'}, order=1)
+        self.executions = [
+            WorkflowExecution.objects.create(
+                workflow=self.workflow, status='completed',
+                results={'1': 'x' * 100}, error_logs=f'log {i}'
+            )
+            for i in range(5)
+        ]
+
+    def test_execution_list_pages_with_cursor_newest_first(self):
+        url = reverse('workflowexecution-list')
+        seen = []
+        response = self.client.get(url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, [execution.id for execution in reversed(self.executions)])
+
+    def test_heavy_execution_fields_are_opt_in(self):
+        url = reverse('workflowexecution-list')
+
+        row = self.client.get(url).data['results'][0]
+        self.assertNotIn('results', row)
+        self.assertNotIn('error_logs', row)
+        self.assertIn('status', row)
+
+        row = self.client.get(url, {'include': 'results'}).data['results'][0]
+        self.assertEqual(row['results'], {'1': 'x' * 100})
+        self.assertNotIn('error_logs', row)
+
+        row = self.client.get(url, {'fields': 'id,status'}).data['results'][0]
+        self.assertEqual(set(row), {'id', 'status'})
+
+        detail = self.client.get(reverse('workflowexecution-detail', args=[self.executions[0].id])).data
+        self.assertEqual(detail['error_logs'], 'log 0')
+
+    def test_workflow_list_nodes_are_opt_in(self):
+        url = reverse('workflow-list')
+        self.assertNotIn('nodes', self.client.get(url).data['results'][0])
+        row = self.client.get(url, {'include': 'nodes'}).data['results'][0]
+        self.assertEqual(len(row['nodes']), 1)
+
+    def test_analytics_list_is_paginated(self):
+        for _ in range(3):
+            WorkflowAnalytics.objects.create(workflow=self.workflow, execution_time=1.0, success_rate=1.0)
+        response = self.client.get(reverse('analytics:analytics-list'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
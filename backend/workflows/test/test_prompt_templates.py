@@ -0,0 +1,105 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from workflows.models import Node, Workflow
+from workflows.prompt_templates import TemplateError, compile_template, get_template, render_text
+from workflows.utils import execute_node, execute_node_batch
+
+TEMPLATE = """Answer the question: ${query}
+{% for chunk in context.results %}
+[${loop.index}] ${chunk.text} (${chunk.metadata.source})
+{% endfor %}
+{% if tone %}Use a ${tone} tone.{% elif not brief %}Explain your reasoning.{% else %}Be brief.{% endif %}"""
+
+
+class PromptTemplateTests(TestCase):
+    def test_renders_variables_loops_and_conditions(self):
+        template = compile_template(TEMPLATE)
+        context = {
+            'query': 'Why is the tax column missing?',
+            'context': {'results': [
+                {'text': 'CSV exports omit tax', 'metadata': {'source': 'kb.txt'}},
+                {'text': 'Tax is set per country', 'metadata': {'source': 'faq.md'}},
+            ]},
+        }
+        self.assertEqual(template.render(context), (
+            "Answer the question: Why is the tax column missing?\n"
+            "[1] CSV exports omit tax (kb.txt)\n"
+            "[2] Tax is set per country (faq.md)\n"
+            "Explain your reasoning."
+        ))
+        self.assertTrue(template.render({**context, 'brief': True}).endswith("Be brief."))
+        self.assertTrue(template.render({**context, 'tone': 'formal'}).endswith("Use a formal tone."))
+
+    def test_variables_are_checked_once_at_compile_time(self):
+        template = compile_template(TEMPLATE)
+        # tone is only read under the if testing it
+        self.assertEqual(template.required, {'query', 'context'})
+        with self.assertRaisesMessage(TemplateError, 'Missing template variables: context, query'):
+            template.render({})
+        with self.assertRaisesMessage(TemplateError, 'undeclared variables: context'):
+            compile_template(TEMPLATE, variables=['query'])
+        for source in ['{% if x %}open', '{% endfor %}', '${not a path}', '{% while x %}{% endwhile %}']:
+            with self.assertRaises(TemplateError):
+                compile_template(source)
+
+    def test_templates_are_compiled_once(self):
+        with patch('workflows.prompt_templates.compile_template', wraps=compile_template) as compile_mock:
+            first = get_template('Hello ${name} from the cache test')
+            second = get_template('Hello ${name} from the cache test')
+        self.assertIs(first, second)
+        compile_mock.assert_called_once()
+
+    def test_text_input_substitution(self):
+        self.assertEqual(render_text('Hello ${name}, ${unknown}', {'name': 'Ada'}), 'Hello Ada, ${unknown}')
+        self.assertEqual(render_text('${count}', {'count': 3}), 3)
+
+    def test_text_input_keeps_non_template_syntax(self):
+        variables = {'price': 9.5, 'a': 1, 'name': 'Ada'}
+        self.assertEqual(render_text('Cost is ${price:.2f}', variables), 'Cost is ${price:.2f}')
+        self.assertEqual(render_text('`${a + b}` for ${name}', variables), '`${a + b}` for Ada')
+        self.assertEqual(render_text('{% raw %}${name}{% endraw %}', variables), '{% raw %}Ada{% endraw %}')
+        self.assertEqual(render_text('{% if name %} unclosed', variables), '{% if name %} unclosed')
+        with self.assertRaises(TemplateError):
+            compile_template('Cost is ${price:.2f}')
+
+
+class PromptTemplateNodeTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='templates', password='password')
+        self.workflow = Workflow.objects.create(name='Templates', user=user)
+
+    def test_node_renders_ports_variables_and_defaults(self):
+        node = Node.objects.create(workflow=self.workflow, type='prompt_template', order=1, config={
+            'template': '${greeting}, ${user}: ${context}',
+            'variables': ['user'],
+            'defaults': {'greeting': 'Hi'},
+        })
+        output = execute_node(node, {'context': {'text': 'retrieved text'}, 'variables': {'user': 'Ada'}})
+        self.assertEqual(output, 'Hi, Ada: retrieved text')
+
+        outputs = execute_node_batch(node, [
+            {'context': {'text': 'a'}, 'variables': {'user': 'Ada'}},
+            {'context': {'text': 'b'}, 'variables': {}},
+        ])
+        self.assertEqual(outputs[0], 'Hi, Ada: a')
+        self.assertIsInstance(outputs[1], TemplateError)
+
+    def test_invalid_templates_are_rejected_on_save(self):
+        with self.assertRaises(ValidationError):
+            Node.objects.create(workflow=self.workflow, type='prompt_template', order=1,
+                                config={'template': '${user} {% if x %}', 'variables': ['user']})
+        with self.assertRaises(ValidationError):
+            Node.objects.create(workflow=self.workflow, type='prompt_template', order=2,
+                                config={'template': '${user} ${account}', 'variables': ['user']})
+
+    def test_text_input_renders_workflow_variables(self):
+        node = Node.objects.create(workflow=self.workflow, type='text_input', order=1,
+                                   config={'text': 'Summarize ${document}'})
+        self.assertEqual(execute_node(node, {'variables': {'document': 'the report'}}), 'Summarize the report')
+
+        # Texts using ${...} or {% %} for something else still save
+        node = Node.objects.create(workflow=self.workflow, type='text_input', order=2,
+                                   config={'text': 'Cost is ${price:.2f} {% raw %}'})
+        self.assertEqual(execute_node(node, {'variables': {'price': 3}}), 'Cost is ${price:.2f} {% raw %}')
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from InnoFlow.analytics.models import WorkflowAnalytics
+from workflows.models import Workflow, Node, WorkflowExecution
+from workflows.test.query_counts import QueryCountAssertionsMixin
+
+User = get_user_model()
+
+
+class EndpointQueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='queryuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.add_workflows(2)
+
+    def add_workflows(self, count):
+        for _ in range(count):
+            workflow = Workflow.objects.create(name='Counted Workflow', user=self.user)
+            for order in range(3):
+                Node.objects.create(workflow=workflow, type='text_input', config={'text': 'x'}, order=order)
+            WorkflowExecution.objects.create(workflow=workflow, status='completed', results={})
+            WorkflowAnalytics.objects.create(workflow=workflow, execution_time=1.0, success_rate=1.0)
+
+    def test_workflow_list_with_nodes(self):
+        url = reverse('workflow-list')
+        # Workflows, then one prefetch for all of their nodes
+        self.assertEndpointQueries(url, 2, {'include': 'nodes'})
+        self.assertConstantQueries(url, lambda: self.add_workflows(5), {'include': 'nodes'})
+        self.assertEndpointQueries(url, 1)
+
+    def test_workflow_detail(self):
+        workflow = Workflow.objects.first()
+        self.assertEndpointQueries(reverse('workflow-detail', args=[workflow.id]), 2)
+
+    def test_execution_and_analytics_lists(self):
+        self.assertConstantQueries(reverse('workflowexecution-list'), lambda: self.add_workflows(5))
+        self.assertConstantQueries(reverse('analytics:analytics-list'), lambda: self.add_workflows(5))
+
+    def test_node_create_does_not_load_the_workflow_user(self):
+        workflow = Workflow.objects.first()
+        # Workflow lookup, duplicate order check, insert
+        self.assertEndpointQueries(
+            reverse('node-list'), 3,
+            {'workflow': workflow.id, 'type': 'text_input', 'config': {'text': 'y'}, 'order': 10},
+            method='post', format='json'
+        )
@@ -0,0 +1,148 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from workflows.batch import iter_batch_output
+from workflows.execution import WorkflowExecutor
+from workflows.models import (
+    Workflow, WorkflowBatch, WorkflowExecution, ExecutionResultBlob, Node, NodeConnection, NodeExecutionResult
+)
+from workflows.result_store import (
+    REF_KEY, ERROR_LOGS_REF, compress, decompress, offload_execution_output, load_execution_output
+)
+
+User = get_user_model()
+
+
+@override_settings(WORKFLOW_RESULT_INLINE_LIMIT=100)
+class ResultStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='storeuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Store Workflow', user=self.user)
+        self.summary = 'summary ' * 200
+
+    def create_execution(self, **fields):
+        execution = WorkflowExecution.objects.create(workflow=self.workflow, status='completed')
+        for field, value in fields.items():
+            setattr(execution, field, value)
+        offload_execution_output([execution])
+        execution.save()
+        return execution
+
+    def test_compress_round_trip(self):
+        raw = self.summary.encode('utf-8')
+        data = compress(raw)
+        self.assertLess(len(data), len(raw))
+        self.assertEqual(decompress(data), raw)
+
+    def test_large_outputs_leave_the_execution_row(self):
+        execution = self.create_execution(results={1: self.summary, 2: 'short'})
+        execution.refresh_from_db()
+
+        self.assertEqual(execution.results['1'], {REF_KEY: 'results/1', 'size': len(self.summary) + 2})
+        self.assertEqual(execution.results['2'], 'short')
+        blob = ExecutionResultBlob.objects.get(execution=execution)
+        self.assertLess(len(blob.data), blob.size)
+
+        with self.assertNumQueries(1):
+            load_execution_output([execution])
+        self.assertEqual(execution.results, {'1': self.summary, '2': 'short'})
+
+    def test_long_error_logs_keep_a_truncated_head(self):
+        logs = [f"Error executing node {i}: failed" for i in range(20)]
+        execution = self.create_execution(status='failed', error_logs=logs)
+        execution.refresh_from_db()
+
+        self.assertTrue(execution.error_logs.startswith(ERROR_LOGS_REF + logs[0]))
+        load_execution_output([execution])
+        self.assertEqual(execution.error_logs, '\n'.join(logs))
+
+    def test_node_ids_cannot_collide_with_error_logs(self):
+        logs = [f"Error executing node error_logs: failed {i}" for i in range(20)]
+        execution = self.create_execution(status='failed', results={'error_logs': self.summary}, error_logs=logs)
+        execution.refresh_from_db()
+
+        load_execution_output([execution])
+        self.assertEqual(execution.results, {'error_logs': self.summary})
+        self.assertEqual(execution.error_logs, '\n'.join(logs))
+
+    def test_small_outputs_need_no_queries(self):
+        execution = self.create_execution(results={'1': 'short'}, error_logs='boom')
+        self.assertFalse(ExecutionResultBlob.objects.exists())
+        with self.assertNumQueries(0):
+            load_execution_output([execution])
+        self.assertEqual(execution.results, {'1': 'short'})
+
+    def test_batch_output_includes_stored_results(self):
+        batch = WorkflowBatch.objects.create(workflow=self.workflow, total_rows=1)
+        execution = self.create_execution(results={'1': self.summary})
+        execution.batch = batch
+        execution.save(update_fields=['batch'])
+
+        lines = list(iter_batch_output(batch))
+        self.assertEqual(len(lines), 1)
+        self.assertIn(self.summary, lines[0])
+
+    @patch('workflows.execution.execute_node_util')
+    def test_large_checkpoints_are_stored_once(self, mock_execute):
+        source = Node.objects.create(workflow=self.workflow, type='text_input', config={'text': 'hi'}, order=1)
+        target = Node.objects.create(workflow=self.workflow, type='huggingface_summarization',
+                                     config={'model': 'bart'}, order=2, max_retries=0)
+        NodeConnection.objects.create(source_node=source, target_node=target)
+        mock_execute.side_effect = [self.summary, ValueError("Worker lost")]
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        with self.assertRaises(ValueError):
+            WorkflowExecutor(execution).execute_workflow()
+
+        checkpoint = NodeExecutionResult.objects.get(execution=execution, node_key=str(source.id))
+        self.assertEqual(checkpoint.result, {REF_KEY: f'results/{source.id}', 'size': len(self.summary) + 2})
+
+        # Resuming restores the stored output, and completing keeps a single copy of it
+        mock_execute.side_effect = lambda node, input_data, **kwargs: f"summary of {input_data['input'][:7]}"
+        WorkflowExecutor(execution).execute_workflow()
+        mock_execute.assert_called_with(target, {'input': self.summary})
+        self.assertEqual(ExecutionResultBlob.objects.filter(execution=execution).count(), 1)
+        execution.refresh_from_db()
+        load_execution_output([execution])
+        self.assertEqual(execution.results[str(source.id)], self.summary)
+
+
+@override_settings(WORKFLOW_RESULT_INLINE_LIMIT=100)
+class ResultStoreApiTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='storeapi', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        workflow = Workflow.objects.create(name='Store API Workflow', user=self.user)
+        self.summary = 'summary ' * 200
+        self.execution = WorkflowExecution.objects.create(workflow=workflow, status='completed')
+        self.execution.results = {'1': self.summary}
+        offload_execution_output([self.execution])
+        self.execution.save()
+
+    def test_lists_and_details_load_stored_results(self):
+        workflow = self.execution.workflow
+        for _ in range(2):
+            execution = WorkflowExecution.objects.create(workflow=workflow, status='completed')
+            execution.results = {'1': self.summary, '2': 'short'}
+            offload_execution_output([execution])
+            execution.save()
+
+        url = reverse('workflowexecution-list')
+        # One query for the page and one for the stored results of all its rows
+        with self.assertNumQueries(2):
+            rows = self.client.get(url, {'include': 'results'}).data['results']
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row['results']['1'] == self.summary for row in rows))
+        with self.assertNumQueries(1):
+            rows = self.client.get(url).data['results']
+        self.assertNotIn('results', rows[0])
+
+        detail = self.client.get(reverse('workflowexecution-detail', args=[self.execution.id])).data
+        self.assertEqual(detail['results'], {'1': self.summary})
+
+    def test_detail_without_results_skips_the_store(self):
+        url = reverse('workflowexecution-detail', args=[self.execution.id])
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {'fields': 'id,status'}).data
+        self.assertEqual(set(data), {'id', 'status'})
@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from InnoFlow.ai_integration.models import AIModelConfig
+from workflows.keyword_index import run_keyword_search
+from workflows.retrieval import build_context, reciprocal_rank_fusion, run_hybrid_retriever
+from workflows.retry import NonRetryableNodeError
+from workflows.utils import extract_input_text
+from workflows.vector_store import run_vector_store
+
+CHUNKS = [
+    ('Invoices exported as CSV are missing the tax column', [1.0, 0.0, 0.0]),
+    ('Tax rates are configured per country in settings', [0.9, 0.1, 0.0]),
+    ('Password reset emails arrive late', [0.0, 1.0, 0.0]),
+    ('The mobile app crashes on login', [0.0, 0.0, 1.0]),
+]
+
+
+class ReciprocalRankFusionTests(TestCase):
+    def test_documents_found_by_both_retrievers_rank_first(self):
+        fused = reciprocal_rank_fusion({
+            'keyword': [{'id': 'a', 'score': 9.0}, {'id': 'b', 'score': 5.0}],
+            'vector': [{'id': 'c', 'score': 0.9}, {'id': 'b', 'score': 0.8}],
+        }, k=60)
+        self.assertEqual([entry['id'] for entry in fused], ['b', 'a', 'c'])
+        self.assertAlmostEqual(fused[0]['score'], 1 / 62 + 1 / 62)
+        self.assertEqual(fused[0]['scores'], {'keyword': 5.0, 'vector': 0.8})
+
+    def test_context_respects_the_token_budget(self):
+        results = [{'text': 'one two three'}, {'text': 'four five six seven eight'}, {'text': 'nine'}]
+        context = build_context(results, max_tokens=5, tokenizer='regex')
+        self.assertEqual(context['text'], 'one two three\n\nnine')
+        self.assertLessEqual(context['tokens'], 5)
+        self.assertEqual(extract_input_text({'input': context}), context['text'])
+
+
+class HybridRetrieverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(WORKFLOW_INDEX_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        items = [
+            {'text': text, 'embedding': embedding, 'metadata': {'source': 'kb.txt', 'chunk': number}}
+            for number, (text, embedding) in enumerate(CHUNKS)
+        ]
+        run_keyword_search({'index': 'kb', 'operation': 'upsert'}, {'input': items})
+        run_vector_store({'index': 'kb', 'operation': 'upsert'}, {'input': items})
+        self.config = {'keyword_index': 'kb', 'vector_index': 'kb', 'top_k': 3, 'tokenizer': 'regex'}
+
+    def test_fuses_keyword_and_vector_results(self):
+        output = run_hybrid_retriever(self.config, {'query': 'tax column', 'embedding': [1.0, 0.05, 0.0]})
+        ids = [result['id'] for result in output['results']]
+        self.assertEqual(ids[:2], ['kb.txt#0', 'kb.txt#1'])
+        self.assertEqual(set(output['results'][0]['scores']), {'keyword', 'vector'})
+        self.assertTrue(output['text'].startswith(CHUNKS[0][0]))
+
+        # Keyword search alone needs no embedding
+        output = run_hybrid_retriever({**self.config, 'vector_index': None}, {'query': 'password'})
+        self.assertEqual(output['results'][0]['id'], 'kb.txt#2')
+
+    @patch('workflows.retrieval.get_reranker')
+    def test_reranks_in_one_batch_and_caches_scores(self, mock_get_reranker):
+        reranker = MagicMock()
+        reranker.predict.side_effect = lambda pairs, batch_size: [-len(text) for _, text in pairs]
+        mock_get_reranker.return_value = reranker
+        config = {**self.config, 'rerank': True, 'rerank_top_n': 2}
+
+        first = run_hybrid_retriever(config, {'query': 'tax column', 'embedding': [1.0, 0.05, 0.0]})
+        second = run_hybrid_retriever(config, {'query': 'tax column', 'embedding': [1.0, 0.05, 0.0]})
+
+        reranker.predict.assert_called_once()
+        self.assertEqual(len(reranker.predict.call_args[0][0]), 2)
+        # The shorter of the two fused leaders wins the rerank
+        self.assertEqual(first['results'][0]['id'], 'kb.txt#1')
+        self.assertEqual(first['results'], second['results'])
+
+    def test_context_fits_the_model_window(self):
+        model_config = AIModelConfig.objects.create(
+            name='Small', provider='OLLAMA', model_name='llama3', model_type='chat',
+            parameters={'context_window': 40, 'max_tokens': 30}
+        )
+        config = {'keyword_index': 'kb', 'model_config': model_config.pk, 'prompt_reserve_tokens': 4}
+        output = run_hybrid_retriever(config, {'query': 'tax column'})
+        # 40 - 30 - 4 tokens: the best result is trimmed to fit
+        self.assertEqual(output['tokens'], 6)
+        self.assertEqual(output['text'], 'Invoices exported as CSV')
+        self.assertTrue(output['results'][0]['truncated'])
+
+    def test_requires_an_index(self):
+        with self.assertRaises(NonRetryableNodeError):
+            run_hybrid_retriever({'keyword_index': 'missing'}, {'query': 'tax'})
+
+    def test_misconfigured_retrievers_fail_instead_of_being_skipped(self):
+        query = {'query': 'tax column', 'embedding': [1.0, 0.05, 0.0]}
+        with self.assertRaisesMessage(NonRetryableNodeError, 'Vector index missing does not exist'):
+            run_hybrid_retriever({**self.config, 'vector_index': 'missing'}, query)
+        with self.assertRaisesMessage(NonRetryableNodeError, 'Keyword index missing does not exist'):
+            run_hybrid_retriever({**self.config, 'keyword_index': 'missing'}, query)
+        with self.assertRaisesMessage(NonRetryableNodeError, 'requires a query embedding'):
+            run_hybrid_retriever(self.config, {'query': 'password'})
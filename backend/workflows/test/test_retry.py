@@ -0,0 +1,125 @@
+from unittest import TestCase as SimpleTestCase
+from unittest.mock import patch, MagicMock
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from workflows.models import Workflow, Node, WorkflowExecution, NodeConnection, NodeExecutionResult
+from workflows.execution import WorkflowExecutor
+from workflows.retry import RetryPolicy, NodeRetryScheduled, NonRetryableNodeError, get_retry_policy
+from workflows.tasks import run_workflow
+
+User = get_user_model()
+
+
+class RetryPolicyTests(SimpleTestCase):
+    def test_exponential_backoff_is_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=False)
+        self.assertEqual([policy.get_delay(n) for n in range(1, 5)], [1.0, 2.0, 4.0, 5.0])
+
+    def test_jitter_stays_within_backoff_window(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=60.0)
+        for _ in range(50):
+            self.assertTrue(0 <= policy.get_delay(3) <= 4.0)
+
+    def test_error_classification(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(ConnectionError("reset by peer")))
+        self.assertFalse(policy.is_retryable(NonRetryableNodeError("bad input")))
+        self.assertFalse(policy.is_retryable(ValidationError("invalid")))
+
+        rate_limited = Exception("slow down")
+        rate_limited.status_code = 429
+        unauthorized = Exception("bad key")
+        unauthorized.response = MagicMock(status_code=401)
+        self.assertTrue(policy.is_retryable(rate_limited))
+        self.assertFalse(policy.is_retryable(unauthorized))
+
+    def test_unknown_node_type_uses_default_policy(self):
+        self.assertIsInstance(get_retry_policy('no_such_type'), RetryPolicy)
+
+
+class ExecutorRetryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='retryuser', password='testpass')
+        self.workflow = Workflow.objects.create(name='Retry Workflow', user=self.user)
+        self.flaky = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': 'flaky'}, order=1
+        )
+        self.downstream = Node.objects.create(
+            workflow=self.workflow, type='openai_tts', config={'voice': 'en'}, order=2
+        )
+        self.independent = Node.objects.create(
+            workflow=self.workflow, type='text_input', config={'text': 'other'}, order=3
+        )
+        NodeConnection.objects.create(source_node=self.flaky, target_node=self.downstream)
+
+    @patch('workflows.execution.execute_node_util')
+    def test_non_retryable_error_fails_without_retrying(self, mock_execute):
+        mock_execute.side_effect = NonRetryableNodeError("malformed config")
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        executor = WorkflowExecutor(execution)
+        executor.sleep = MagicMock()
+
+        with self.assertRaises(NonRetryableNodeError):
+            executor.execute_workflow()
+
+        self.assertEqual(mock_execute.call_count, 1)
+        executor.sleep.assert_not_called()
+        self.assertEqual(execution.status, 'failed')
+
+    @patch('workflows.execution.execute_node_util')
+    def test_task_does_not_rerun_a_failed_workflow(self, mock_execute):
+        mock_execute.side_effect = NonRetryableNodeError("malformed config")
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+
+        with self.assertRaises(NonRetryableNodeError):
+            run_workflow.apply(args=[self.workflow.id, execution.id], throw=True)
+
+        self.assertEqual(mock_execute.call_count, 1)
+        execution.refresh_from_db()
+        self.assertEqual(execution.status, 'failed')
+
+    @patch('workflows.execution.execute_node_util')
+    def test_retry_state_lives_on_execution(self, mock_execute):
+        mock_execute.side_effect = [ConnectionError("timeout"), "ok", "spoken", "other"]
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        executor = WorkflowExecutor(execution)
+        executor.sleep = MagicMock()
+
+        executor.execute_workflow()
+
+        executor.sleep.assert_called_once()
+        self.flaky.refresh_from_db()
+        self.assertEqual(self.flaky.retry_count, 0)
+        checkpoint = NodeExecutionResult.objects.get(execution=execution, node_key=str(self.flaky.id))
+        self.assertEqual(checkpoint.attempts, 1)
+
+    @patch('workflows.execution.execute_node_util')
+    def test_deferred_retry_keeps_running_independent_branches(self, mock_execute):
+        def flaky_first_node(node, input_data, **kwargs):
+            if node.id == self.flaky.id:
+                raise ConnectionError("rate limited")
+            return f"{node.id} done"
+        mock_execute.side_effect = flaky_first_node
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        executor = WorkflowExecutor(execution, defer_retries=True)
+
+        with self.assertRaises(NodeRetryScheduled) as ctx:
+            executor.execute_workflow()
+
+        self.assertEqual(ctx.exception.node_ids, [self.flaky.id])
+        executed = [call.args[0].id for call in mock_execute.call_args_list]
+        self.assertEqual(executed, [self.flaky.id, self.independent.id])
+        self.assertEqual(execution.status, 'pending')
+
+        # The next attempt resumes with the stored attempt counter
+        mock_execute.reset_mock()
+        mock_execute.side_effect = lambda node, input_data, **kwargs: f"{node.id} done"
+        executor = WorkflowExecutor(execution, defer_retries=True)
+        executor.execute_workflow()
+
+        executed = [call.args[0].id for call in mock_execute.call_args_list]
+        self.assertEqual(executed, [self.flaky.id, self.downstream.id])
+        self.assertEqual(execution.status, 'completed')
+        checkpoint = NodeExecutionResult.objects.get(execution=execution, node_key=str(self.flaky.id))
+        self.assertEqual(checkpoint.attempts, 1)
@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase, override_settings
+from workflows import vector_store
+from workflows.retry import NonRetryableNodeError
+from workflows.vector_store import VectorIndex, get_vector_index, run_vector_store
+
+
+def chunk(text, embedding, source='doc.txt', number=0):
+    return {'text': text, 'metadata': {'source': source, 'chunk': number}, 'embedding': embedding}
+
+
+class VectorStoreTestCase(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            WORKFLOW_INDEX_ROOT=self.root, WORKFLOW_VECTOR_BACKEND='exact', WORKFLOW_VECTOR_SEARCH_BLOCK=16
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.rng = np.random.default_rng(7)
+
+    def make_index(self, rows=100, dim=8):
+        index = VectorIndex(dim, directory=self.root / 'vectors' / 'test')
+        vectors = self.rng.normal(size=(rows, dim)).astype(np.float32)
+        index.add([f'v{i}' for i in range(rows)], vectors, [{'text': f'text {i}'} for i in range(rows)])
+        return index, vectors
+
+
+class VectorIndexTests(VectorStoreTestCase):
+    def test_exact_search_matches_brute_force(self):
+        index, vectors = self.make_index()
+        queries = self.rng.normal(size=(3, 8))
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ queries.T), axis=0)[:5].T
+
+        results = index.search(queries, k=5)
+        self.assertEqual([[r['id'] for r in query] for query in results],
+                         [[f'v{i}' for i in row] for row in expected])
+        self.assertEqual(results[0][0]['text'], f'text {expected[0][0]}')
+        self.assertGreaterEqual(results[0][0]['score'], results[0][-1]['score'])
+
+    def test_upserts_and_deletes_are_tombstoned(self):
+        index, vectors = self.make_index(rows=10)
+        index.add(['v1'], [-vectors[1]], [{'text': 'replaced'}])
+        self.assertEqual(index.delete(['v2', 'missing']), 1)
+
+        self.assertEqual(len(index), 9)
+        self.assertEqual(index.size, 11)
+        ids = [r['id'] for r in index.search(vectors[2], k=10)]
+        self.assertNotIn('v2', ids)
+        self.assertEqual(index.search(-vectors[1], k=1)[0]['text'], 'replaced')
+
+        index.compact()
+        self.assertEqual(index.size, 9)
+        self.assertEqual(index.search(-vectors[1], k=1)[0]['text'], 'replaced')
+
+    def test_saved_index_is_memory_mapped(self):
+        index, vectors = self.make_index()
+        index.save()
+        index.add(['extra'], [vectors[0] * 2], [{'text': 'extra'}])
+        index.save()
+
+        reopened = VectorIndex.open(index.directory)
+        self.assertEqual(len(reopened.segments), 2)
+        self.assertIsInstance(reopened.segments[0].vectors, np.memmap)
+        self.assertEqual(len(reopened), 101)
+        self.assertEqual(
+            [r['id'] for r in reopened.search(vectors[5], k=3)],
+            [r['id'] for r in index.search(vectors[5], k=3)]
+        )
+
+    @override_settings(WORKFLOW_VECTOR_MAX_SEGMENTS=2)
+    def test_segments_are_merged(self):
+        index, vectors = self.make_index(rows=3)
+        for i in range(3):
+            index.save()
+            index.add([f'new{i}'], [vectors[0]], [{'text': 'new'}])
+        index.save()
+        self.assertEqual(len(index.segments), 2)
+        self.assertEqual(len(VectorIndex.open(index.directory)), 6)
+        self.assertEqual(len(list(index.directory.glob('segment-*.ids.json'))), 2)
+
+    def test_search_resolves_rows_of_its_snapshot(self):
+        index, vectors = self.make_index(rows=10)
+        index.delete([f'v{i}' for i in range(5)])
+        exact_search = index._exact_search
+
+        def compacted_while_scoring(*args):
+            found = exact_search(*args)
+            # Renumbers every row the search found
+            index.compact()
+            return found
+
+        with patch.object(index, '_exact_search', side_effect=compacted_while_scoring):
+            results = index.search(vectors[7], k=1)
+        self.assertEqual(results[0]['id'], 'v7')
+        self.assertEqual(index.search(vectors[7], k=1)[0]['id'], 'v7')
+
+    def test_search_reads_payloads_of_replaced_segments(self):
+        index, vectors = self.make_index(rows=10)
+        index.save()
+        index = VectorIndex.open(index.directory)
+        index.delete(['v0'])
+        exact_search = index._exact_search
+
+        def compacted_while_scoring(*args):
+            found = exact_search(*args)
+            # Replaces the saved segment and unlinks its files
+            index.compact()
+            return found
+
+        with patch.object(index, '_exact_search', side_effect=compacted_while_scoring):
+            results = index.search(vectors[7], k=1)
+        self.assertEqual((results[0]['id'], results[0]['text']), ('v7', 'text 7'))
+        self.assertEqual(len(list(index.directory.glob('segment-*.payloads.jsonl'))), 1)
+
+    def test_dimension_is_checked(self):
+        index, _ = self.make_index()
+        with self.assertRaises(NonRetryableNodeError):
+            index.search([1.0, 2.0], k=1)
+
+    @unittest.skipIf(vector_store.hnswlib is None, "hnswlib is not installed")
+    def test_hnsw_backend_agrees_with_exact_search(self):
+        index, vectors = self.make_index(rows=500)
+        exact = [r['id'] for r in index.search(vectors[3], k=1)]
+        index.backend = 'hnsw'
+        self.assertEqual([r['id'] for r in index.search(vectors[3], k=1)], exact)
+
+
+class VectorStoreNodeTests(VectorStoreTestCase):
+    def test_upsert_then_search(self):
+        items = [chunk('apples', [1, 0, 0], number=0), chunk('pears', [0, 1, 0], number=1)]
+        summary = run_vector_store({'index': 'fruit', 'operation': 'upsert'}, {'input': items})
+        self.assertEqual(summary, {'index': 'fruit', 'upserted': 2, 'size': 2})
+
+        # Re-ingesting a chunk replaces it
+        run_vector_store({'index': 'fruit', 'operation': 'upsert'}, {'input': [chunk('plums', [0, 1, 0.1], number=1)]})
+        results = run_vector_store({'index': 'fruit', 'top_k': 1}, {'query': {'embedding': [0, 1, 0]}})
+        self.assertEqual(results[0]['id'], 'doc.txt#1')
+        self.assertEqual(results[0]['text'], 'plums')
+        self.assertEqual(len(get_vector_index('fruit')), 2)
+
+    def test_search_of_unknown_index_fails(self):
+        with self.assertRaises(NonRetryableNodeError):
+            run_vector_store({'index': 'missing'}, {'input': [1.0, 0.0]})
+        with self.assertRaises(NonRetryableNodeError):
+            run_vector_store({'index': '../escape'}, {'input': [1.0, 0.0]})
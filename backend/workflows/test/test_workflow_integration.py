@@ -1,7 +1,8 @@
 from django.test import TestCase
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
-from workflows.models import Workflow, Node, WorkflowExecution, NodeConnection
+from workflows.models import Workflow, Node, WorkflowExecution, NodeConnection, NodeExecutionResult
 from workflows.execution import WorkflowExecutor
 from workflows.utils import execute_node
 from unittest.mock import patch, MagicMock
@@ -152,3 +153,77 @@ class WorkflowIntegrationTests(APITestCase):
         self.assertEqual(len(retry_attempts), 3)
         self.assertEqual(execution.status, 'completed')
         self.assertEqual(execution.results[retry_node.id], "Success after retries")
+
+    @patch('workflows.execution.execute_node_util')
+    def test_resume_skips_checkpointed_nodes(self, mock_execute):
+        def fail_on_summarization(node, input_data, **kwargs):
+            if node.type == 'huggingface_summarization':
+                raise ValueError("Worker lost")
+            return f"Node {node.order} output"
+        mock_execute.side_effect = fail_on_summarization
+        self.summarize_node.max_retries = 0
+        self.summarize_node.save()
+
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        with self.assertRaises(ValueError):
+            WorkflowExecutor(execution).execute_workflow()
+
+        checkpoint = NodeExecutionResult.objects.get(
+            execution=execution, node_key=str(self.input_node.id)
+        )
+        self.assertEqual(checkpoint.status, 'completed')
+        self.assertEqual(checkpoint.result, "Node 1 output")
+
+        mock_execute.reset_mock()
+        mock_execute.side_effect = lambda node, input_data, **kwargs: f"Node {node.order} output"
+        executor = WorkflowExecutor(execution)
+        executor.execute_workflow()
+
+        executed = [call.args[0].id for call in mock_execute.call_args_list]
+        self.assertNotIn(self.input_node.id, executed)
+        self.assertEqual(executed, [self.summarize_node.id, self.tts_node.id])
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.results[self.input_node.id], "Node 1 output")
+        self.assertEqual(execution.node_results.filter(status='completed').count(), 3)
+
+    @patch('workflows.execution.execute_node_util')
+    def test_resume_reruns_nodes_edited_since_the_failure(self, mock_execute):
+        def fail_on_tts(node, input_data, **kwargs):
+            if node.type == 'openai_tts':
+                raise ValueError("Worker lost")
+            return f"{node.config} output"
+        mock_execute.side_effect = fail_on_tts
+        NodeConnection.objects.create(source_node=self.input_node, target_node=self.summarize_node)
+        NodeConnection.objects.create(source_node=self.summarize_node, target_node=self.tts_node)
+        self.tts_node.max_retries = 0
+        self.tts_node.save()
+        execution = WorkflowExecution.objects.create(workflow=self.workflow)
+        with self.assertRaises(ValueError):
+            WorkflowExecutor(execution).execute_workflow()
+
+        # Editing the input node invalidates it and the summary it feeds
+        self.input_node.config = {'text': 'Edited input'}
+        self.input_node.save()
+        mock_execute.reset_mock()
+        mock_execute.side_effect = lambda node, input_data, **kwargs: f"{node.config} output"
+        WorkflowExecutor(execution).execute_workflow()
+
+        executed = [call.args[0].id for call in mock_execute.call_args_list]
+        self.assertEqual(executed, [self.input_node.id, self.summarize_node.id, self.tts_node.id])
+        self.assertEqual(execution.results[self.input_node.id], "{'text': 'Edited input'} output")
+
+    @patch('workflows.views.run_workflow.delay')
+    def test_only_failed_executions_can_be_resumed(self, mock_delay):
+        execution = WorkflowExecution.objects.create(workflow=self.workflow, status='pending')
+        url = reverse('workflowexecution-resume', args=[execution.id])
+
+        # A pending execution may still have a retry of its task queued
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 400)
+        mock_delay.assert_not_called()
+
+        execution.status = 'failed'
+        execution.save()
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        mock_delay.assert_called_once_with(self.workflow.id, execution.id)
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WorkflowViewSet, NodeViewSet, WorkflowExecutionViewSet
+from .views import WorkflowViewSet, NodeViewSet, WorkflowExecutionViewSet, WorkflowBatchViewSet
 
 router = DefaultRouter()
 router.register(r'workflows', WorkflowViewSet)
 router.register(r'nodes', NodeViewSet)
 router.register(r'workflow_executions', WorkflowExecutionViewSet)
+router.register(r'workflow_batches', WorkflowBatchViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -3,6 +3,12 @@ import logging
 import io
 from gtts import gTTS
 from .models import Node
+from .documents import chunk_text, load_documents
+from .embeddings import run_embedding
+from .keyword_index import run_keyword_search
+from .prompt_templates import render_prompt_template, render_prompt_templates, render_text
+from .retrieval import run_hybrid_retriever
+from .vector_store import run_vector_store
 
 logger = logging.getLogger(__name__)
 
@@ -20,30 +26,77 @@ def get_summarizer_pipeline():
             raise ImportError("transformers library with PyTorch/TensorFlow is required for summarization")
     return _summarizer_pipeline
 
+# Node types whose work can be done for many inputs in a single call
+BATCH_NODE_TYPES = {'huggingface_summarization', 'prompt_template'}
+
+def extract_input_text(input_data):
+    """Extract the text a node should work on from its input data"""
+    if isinstance(input_data, dict):
+        text = (input_data.get('result') or
+                input_data.get('input') or
+                input_data.get('text'))
+        # Retrieval nodes pass their context as {"text": ...}
+        if isinstance(text, dict) and isinstance(text.get('text'), str):
+            return text['text']
+        return text
+    return str(input_data) if input_data is not None else None
+
+def summarize_texts(texts, batch_size=8):
+    """Summarize several texts with one pipeline call"""
+    # Handle short inputs
+    max_length = min(130, max(len(text.split()) for text in texts) + 10)
+    summarizer_pipeline = get_summarizer_pipeline()
+    summaries = summarizer_pipeline(texts, max_length=max_length, min_length=10, batch_size=batch_size)
+    return [summary.get("summary_text", "") for summary in summaries]
+
+def execute_node_batch(node: Node, inputs):
+    """
+    Execute a batch-capable node for many inputs at once.
+
+    Returns one result per input; inputs that cannot be processed get the
+    exception instance in their slot instead of failing the whole batch.
+    """
+    if node.type not in BATCH_NODE_TYPES:
+        raise ValueError(f"Node type {node.type} does not support batch execution")
+
+    logger.info(f"Executing Node {node.id} ({node.type}) for a batch of {len(inputs)} inputs")
+    if node.type == 'prompt_template':
+        # Compiled once for the whole batch
+        return render_prompt_templates(node.config, inputs)
+
+    results = [None] * len(inputs)
+    texts = []
+    positions = []
+    for position, input_data in enumerate(inputs):
+        text = extract_input_text(input_data) or node.config.get('text')
+        if not text or not isinstance(text, str):
+            results[position] = ValueError("Summarization input must be a string")
+            continue
+        texts.append(text)
+        positions.append(position)
+
+    if texts:
+        for position, summary in zip(positions, summarize_texts(texts)):
+            results[position] = summary
+    return results
+
 def execute_node(node: Node, input_data, continue_on_error=False):
     """Execute a node with enhanced error handling and logging"""
     try:
         logger.info(f"Executing Node {node.id} ({node.type}) with input: {str(input_data)[:50]}...")
 
         # Extract text from input data
-        text = None
-        if isinstance(input_data, dict):
-            text = (input_data.get('result') or 
-                   input_data.get('input') or 
-                   input_data.get('text'))
-            # Handle variables
-            variables = input_data.get('variables', {})
-            if variables and node.type == 'text_input':
-                config_text = node.config.get('text', '')
-                for var_name, value in variables.items():
-                    var_placeholder = f'${{{var_name}}}'
-                    if var_placeholder in config_text:
-                        return value
-        else:
-            text = str(input_data) if input_data is not None else None
+        text = extract_input_text(input_data)
 
         if node.type == "text_input":
-            result = node.config.get('text', text or '')
+            if 'text' in node.config:
+                variables = input_data.get('variables') if isinstance(input_data, dict) else None
+                result = render_text(node.config['text'], variables)
+            else:
+                result = text or ''
+
+        elif node.type == "prompt_template":
+            result = render_prompt_template(node.config, input_data)
 
         elif node.type == "huggingface_summarization":
             if not text:
@@ -53,11 +106,7 @@ def execute_node(node: Node, input_data, continue_on_error=False):
             if not text:
                 raise ValueError("Summarization input must be a string")
             
-            # Handle short inputs
-            max_length = min(130, len(text.split()) + 10)
-            summarizer_pipeline = get_summarizer_pipeline()
-            summary = summarizer_pipeline(text, max_length=max_length, min_length=10)
-            result = summary[0].get("summary_text", "")
+            result = summarize_texts([text])[0]
 
         elif node.type == "openai_tts":
             if not text:
@@ -72,6 +121,24 @@ def execute_node(node: Node, input_data, continue_on_error=False):
             audio_file.seek(0)
             result = "TTS audio generated successfully"
 
+        elif node.type == "document_loader":
+            result = load_documents(node.config, input_data)
+
+        elif node.type == "text_chunker":
+            result = chunk_text(node.config, input_data)
+
+        elif node.type == "vector_store":
+            result = run_vector_store(node.config, input_data)
+
+        elif node.type == "keyword_search":
+            result = run_keyword_search(node.config, input_data)
+
+        elif node.type == "hybrid_retriever":
+            result = run_hybrid_retriever(node.config, input_data)
+
+        elif node.type == "embedding":
+            result = run_embedding(node.config, input_data)
+
         else:
             raise ValueError(f"Unknown node type: {node.type}")
 
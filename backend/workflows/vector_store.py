@@ -0,0 +1,540 @@
+# workflows/vector_store.py
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .index_storage import (
+    LOCK, RecordFile, document_id, file_lock, get_index_directory, get_payload, read_json,
+    save_array, write_json, write_records
+)
+from .retry import NonRetryableNodeError
+from .streams import LazyStream, get_stream_input
+
+try:
+    import hnswlib
+except ImportError:  # Optional; searches are exact without it
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('cosine', 'dot')
+BACKENDS = ('auto', 'exact', 'hnsw')
+OPERATIONS = ('upsert', 'search', 'delete')
+MANIFEST = 'index.json'
+UPSERT_BATCH_SIZE = 1024
+
+
+def write_segment(directory: Path, name: str, parts: Iterable, dim: int,
+                  block_size: int = 65536) -> 'Segment':
+    """
+    Write rows of one or more segments to a new segment on disk
+
+    ``parts`` are (vectors, ids, payloads, keep mask or None) tuples; vectors
+    are copied block by block so memory-mapped inputs are never loaded whole.
+    """
+    parts = list(parts)
+    total = sum(int(keep.sum()) if keep is not None else len(ids) for _, ids, _, keep in parts)
+    vectors_path = directory / f'{name}.npy'
+    output = np.lib.format.open_memmap(vectors_path, mode='w+', dtype=np.float32, shape=(total, dim))
+    ids = []
+    payloads = []
+    position = 0
+    for vectors, part_ids, part_payloads, keep in parts:
+        for start in range(0, len(part_ids), block_size):
+            block = np.asarray(vectors[start:start + block_size])
+            if keep is not None:
+                block = block[keep[start:start + block_size]]
+            output[position:position + len(block)] = block
+            position += len(block)
+        if keep is None:
+            ids.extend(part_ids)
+            payloads.append(part_payloads)
+        else:
+            ids.extend(i for i, kept in zip(part_ids, keep) if kept)
+            payloads.append(p for p, kept in zip(part_payloads, keep) if kept)
+    output.flush()
+    del output
+
+    offsets = write_records(directory / f'{name}.payloads.jsonl', itertools.chain.from_iterable(payloads))
+    save_array(directory / f'{name}.offsets.npy', offsets)
+    write_json(directory / f'{name}.ids.json', ids)
+    return Segment.open(directory, name)
+
+
+class Segment:
+    """
+    Rows of a vector index stored together
+
+    Saved segments are immutable and memory-mapped from disk; new rows are
+    appended to an unsaved in-memory segment whose buffer grows by doubling.
+    """
+    def __init__(self, dim: int, name: str = None, vectors: np.ndarray = None,
+                 ids: List[str] = None, payloads=None):
+        self.name = name
+        self.ids = ids if ids is not None else []
+        self.payloads = payloads if payloads is not None else []
+        self._buffer = vectors if vectors is not None else np.empty((0, dim), dtype=np.float32)
+        self.size = len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._buffer[:self.size]
+
+    @property
+    def saved(self) -> bool:
+        return self.name is not None
+
+    def append(self, vectors: np.ndarray, ids: List[str], payloads: List[Dict]) -> None:
+        needed = self.size + len(vectors)
+        if needed > len(self._buffer):
+            buffer = np.empty((max(needed, 2 * len(self._buffer), 1024), self._buffer.shape[1]), dtype=np.float32)
+            buffer[:self.size] = self._buffer[:self.size]
+            self._buffer = buffer
+        self._buffer[self.size:needed] = vectors
+        self.ids.extend(ids)
+        self.payloads.extend(payloads)
+        # Searches read ``size`` last, so they never see rows being written
+        self.size = needed
+
+    def get_payloads(self, rows: List[int]) -> List[Dict]:
+        if isinstance(self.payloads, RecordFile):
+            return self.payloads.get_many(rows)
+        return [self.payloads[row] for row in rows]
+
+    @classmethod
+    def open(cls, directory: Path, name: str) -> 'Segment':
+        vectors = np.load(directory / f'{name}.npy', mmap_mode='r')
+        ids = read_json(directory / f'{name}.ids.json', [])
+        payloads = RecordFile(directory / f'{name}.payloads.jsonl', directory / f'{name}.offsets.npy')
+        return cls(vectors.shape[1], name, vectors, ids, payloads)
+
+
+class VectorIndex:
+    """
+    Embedding index with exact and approximate (HNSW) search.
+
+    Vectors are float32 rows split into segments. Exact search scans them in
+    blocks with one matrix product per block and keeps the top k with
+    ``argpartition``. With hnswlib installed, collections of at least
+    WORKFLOW_VECTOR_HNSW_THRESHOLD live vectors are searched through an HNSW
+    graph instead. Deletes and replaced rows are tombstoned and dropped when
+    the index is compacted.
+
+    Writers in every process hold the index's file lock from reopening it to
+    saving it (see ``vector_index_writer``); readers in other processes
+    reopen it when its manifest changes.
+    """
+    def __init__(self, dim: int, metric: str = 'cosine', directory: Path = None, backend: str = None):
+        if metric not in METRICS:
+            raise NonRetryableNodeError(f"Unknown vector metric: {metric}")
+        self.dim = dim
+        self.metric = metric
+        self.directory = directory
+        self.backend = backend or getattr(settings, 'WORKFLOW_VECTOR_BACKEND', 'auto')
+        self.hnsw_threshold = getattr(settings, 'WORKFLOW_VECTOR_HNSW_THRESHOLD', 100000)
+        self.hnsw_ef = getattr(settings, 'WORKFLOW_VECTOR_HNSW_EF', 64)
+        self.max_segments = getattr(settings, 'WORKFLOW_VECTOR_MAX_SEGMENTS', 8)
+        self.compact_ratio = getattr(settings, 'WORKFLOW_VECTOR_COMPACT_RATIO', 0.25)
+        self.block_size = getattr(settings, 'WORKFLOW_VECTOR_SEARCH_BLOCK', 65536)
+        self.segments: List[Segment] = []
+        self.deleted = np.zeros(0, dtype=bool)
+        self.id_rows: Dict[str, int] = {}
+        self.saved_mtime = None
+        self._next_segment = 0
+        self._hnsw = None
+        self._hnsw_rows = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.id_rows)
+
+    @property
+    def size(self) -> int:
+        """Rows stored, including tombstoned ones"""
+        return sum(segment.size for segment in self.segments)
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise NonRetryableNodeError(f"Expected vectors of dimension {self.dim}, got shape {vectors.shape}")
+        if self.metric == 'cosine':
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def add(self, ids: List[str], vectors, payloads: List[Dict] = None) -> None:
+        """Add rows, replacing rows with the same ids"""
+        vectors = self._prepare(vectors)
+        if len(ids) != len(vectors):
+            raise ValueError("Got a different number of ids and vectors")
+        payloads = payloads if payloads is not None else [{} for _ in ids]
+        with self._lock:
+            if not self.segments or self.segments[-1].saved:
+                self.segments.append(Segment(self.dim))
+            start = self.size
+            self.segments[-1].append(vectors, list(ids), list(payloads))
+            self.deleted = np.concatenate([self.deleted, np.zeros(len(ids), dtype=bool)])
+            for row, row_id in enumerate(ids, start):
+                previous = self.id_rows.get(row_id)
+                if previous is not None:
+                    self._tombstone(previous)
+                self.id_rows[row_id] = row
+            if self._hnsw is not None:
+                self._hnsw_add(start, vectors)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Tombstone rows by id; returns the number of rows deleted"""
+        deleted = 0
+        with self._lock:
+            for row_id in ids:
+                row = self.id_rows.pop(row_id, None)
+                if row is not None:
+                    self._tombstone(row)
+                    deleted += 1
+        return deleted
+
+    def _tombstone(self, row: int) -> None:
+        self.deleted[row] = True
+        if self._hnsw is not None:
+            try:
+                self._hnsw.mark_deleted(row)
+            except RuntimeError:
+                pass
+
+    def _use_hnsw(self) -> bool:
+        if hnswlib is None or self.backend == 'exact':
+            return False
+        return self.backend == 'hnsw' or len(self.id_rows) >= self.hnsw_threshold
+
+    def _ensure_hnsw(self):
+        """Load the saved HNSW graph, or build it from the stored vectors"""
+        if self._hnsw is not None:
+            return self._hnsw
+        size = self.size
+        # Cosine vectors are normalized on insert, so inner product ranks them
+        graph = hnswlib.Index(space='ip', dim=self.dim)
+        path = self.directory / 'hnsw.bin' if self.directory else None
+        if path is not None and path.exists() and self._hnsw_rows == size:
+            graph.load_index(str(path), max_elements=max(2 * size, 1024))
+        else:
+            logger.info(f"Building HNSW graph over {size} vectors")
+            graph.init_index(max_elements=max(2 * size, 1024), ef_construction=200, M=16)
+            offset = 0
+            for segment in self.segments:
+                for start in range(0, segment.size, self.block_size):
+                    block = np.asarray(segment.vectors[start:start + self.block_size])
+                    graph.add_items(block, np.arange(offset + start, offset + start + len(block)))
+                offset += segment.size
+            for row in np.flatnonzero(self.deleted):
+                graph.mark_deleted(int(row))
+        self._hnsw = graph
+        return graph
+
+    def _hnsw_add(self, start: int, vectors: np.ndarray) -> None:
+        needed = start + len(vectors)
+        if needed > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(needed, 2 * self._hnsw.get_max_elements()))
+        self._hnsw.add_items(vectors, np.arange(start, needed))
+
+    def _exact_search(self, queries: np.ndarray, k: int, segments, deleted: np.ndarray):
+        candidate_scores = []
+        candidate_rows = []
+        offset = 0
+        for vectors in segments:
+            for start in range(0, len(vectors), self.block_size):
+                scores = queries @ np.asarray(vectors[start:start + self.block_size]).T
+                dead = deleted[offset + start:offset + start + scores.shape[1]]
+                if dead.any():
+                    scores[:, dead] = -np.inf
+                if scores.shape[1] > k:
+                    top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                    scores = np.take_along_axis(scores, top, axis=1)
+                else:
+                    top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+                candidate_scores.append(scores)
+                candidate_rows.append(top + offset + start)
+            offset += len(vectors)
+
+        scores = np.concatenate(candidate_scores, axis=1)
+        rows = np.concatenate(candidate_rows, axis=1)
+        if scores.shape[1] > k:
+            top = np.argpartition(scores, -k, axis=1)[:, -k:]
+            scores = np.take_along_axis(scores, top, axis=1)
+            rows = np.take_along_axis(rows, top, axis=1)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+    def search(self, query, k: int = 10) -> List:
+        """
+        Nearest rows to one query vector, or to each of a matrix of queries
+
+        Returns:
+            [{"id", "score", "text", "metadata"}] best first, or one such list
+            per query for a matrix
+        """
+        single = np.ndim(query) == 1
+        queries = self._prepare(query)
+        with self._lock:
+            # Results are resolved against this snapshot, as a save may merge
+            # or compact the index's segments meanwhile
+            segments = list(self.segments)
+            deleted = self.deleted
+            k = min(k, len(self.id_rows))
+            graph = self._ensure_hnsw() if k and self._use_hnsw() else None
+        if k <= 0:
+            return [] if single else [[] for _ in queries]
+
+        rows = scores = None
+        if graph is not None:
+            try:
+                graph.set_ef(max(self.hnsw_ef, k))
+                labels, distances = graph.knn_query(queries, k=k)
+                rows, scores = labels.astype(np.int64), 1 - distances
+            except RuntimeError as e:
+                logger.warning(f"HNSW search failed, falling back to exact search: {str(e)}")
+        if rows is None:
+            rows, scores = self._exact_search(queries, k, [segment.vectors for segment in segments], deleted)
+
+        results = [
+            self._resolve(segments, query_rows, query_scores) for query_rows, query_scores in zip(rows, scores)
+        ]
+        return results[0] if single else results
+
+    @staticmethod
+    def _resolve(segments, rows: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        """Ids and payloads of result rows"""
+        live = [(int(row), float(score)) for row, score in zip(rows, scores) if np.isfinite(score)]
+        bounds = np.cumsum([0] + [segment.size for segment in segments])
+        located = {}
+        for position, (row, _) in enumerate(live):
+            index = int(np.searchsorted(bounds, row, side='right')) - 1
+            located.setdefault(index, []).append((position, row - int(bounds[index])))
+        results = [None] * len(live)
+        for index, entries in located.items():
+            segment = segments[index]
+            payloads = segment.get_payloads([local for _, local in entries])
+            for (position, local), payload in zip(entries, payloads):
+                results[position] = {'id': segment.ids[local], 'score': live[position][1], **payload}
+        return results
+
+    def _segment_name(self) -> str:
+        name = f'segment-{self._next_segment:06d}'
+        self._next_segment += 1
+        return name
+
+    def save(self) -> None:
+        """
+        Write unsaved rows as a new segment and update the manifest
+
+        Merges the newest segments past WORKFLOW_VECTOR_MAX_SEGMENTS and
+        compacts the index once WORKFLOW_VECTOR_COMPACT_RATIO of its rows
+        are tombstones.
+        """
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self.size and self.deleted.sum() > self.compact_ratio * self.size:
+                self.compact(save=False)
+            for position, segment in enumerate(self.segments):
+                if not segment.saved:
+                    self.segments[position] = write_segment(
+                        self.directory, self._segment_name(),
+                        [(segment.vectors, segment.ids, segment.payloads, None)], self.dim, self.block_size
+                    )
+            if len(self.segments) > self.max_segments:
+                # Merging adjacent segments keeps row numbers, and so the HNSW graph, valid
+                count = len(self.segments) - self.max_segments + 1
+                merged = write_segment(
+                    self.directory, self._segment_name(),
+                    [(segment.vectors, segment.ids, segment.payloads, None) for segment in self.segments[-count:]],
+                    self.dim, self.block_size
+                )
+                self.segments[-count:] = [merged]
+            save_array(self.directory / 'deleted.npy', self.deleted)
+            if self._hnsw is not None:
+                self._hnsw.save_index(str(self.directory / 'hnsw.bin'))
+                self._hnsw_rows = self.size
+            manifest_path = self.directory / MANIFEST
+            write_json(manifest_path, {
+                'dim': self.dim,
+                'metric': self.metric,
+                'segments': [segment.name for segment in self.segments],
+                'next_segment': self._next_segment,
+                'hnsw_rows': self._hnsw_rows if self._hnsw is not None else None,
+            })
+            self.saved_mtime = manifest_path.stat().st_mtime_ns
+            self._remove_unused_files()
+
+    def _remove_unused_files(self) -> None:
+        names = {segment.name for segment in self.segments}
+        for path in self.directory.glob('segment-*'):
+            if path.name.split('.')[0] not in names:
+                # Readers that still map the file keep it alive until they close it
+                path.unlink(missing_ok=True)
+        if self._hnsw is None:
+            (self.directory / 'hnsw.bin').unlink(missing_ok=True)
+
+    def compact(self, save: bool = True) -> None:
+        """Rewrite the index as one segment without tombstoned rows"""
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            parts = []
+            offset = 0
+            for segment in self.segments:
+                keep = ~self.deleted[offset:offset + segment.size]
+                parts.append((segment.vectors, segment.ids, segment.payloads, keep))
+                offset += segment.size
+            if any(keep.any() for _, _, _, keep in parts):
+                self.segments = [write_segment(self.directory, self._segment_name(), parts, self.dim, self.block_size)]
+            else:
+                self.segments = []
+            self.deleted = np.zeros(self.size, dtype=bool)
+            self.id_rows = {row_id: row for row, row_id in enumerate(self.segments[0].ids)} if self.segments else {}
+            self._hnsw = None
+            if save:
+                self.save()
+
+    @classmethod
+    def open(cls, directory: Path, backend: str = None) -> Optional['VectorIndex']:
+        """Open a saved index with its segments memory-mapped, or None if there is none"""
+        manifest_path = directory / MANIFEST
+        manifest = read_json(manifest_path)
+        if manifest is None:
+            return None
+        index = cls(manifest['dim'], manifest['metric'], directory, backend)
+        index.segments = [Segment.open(directory, name) for name in manifest['segments']]
+        index._next_segment = manifest['next_segment']
+        index._hnsw_rows = manifest.get('hnsw_rows') or 0
+        deleted_path = directory / 'deleted.npy'
+        index.deleted = np.load(deleted_path) if deleted_path.exists() else np.zeros(index.size, dtype=bool)
+        row = 0
+        for segment in index.segments:
+            for row_id in segment.ids:
+                if not index.deleted[row]:
+                    index.id_rows[row_id] = row
+                row += 1
+        index.saved_mtime = manifest_path.stat().st_mtime_ns
+        return index
+
+
+_indexes: Dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(name: str, dim: int = None, metric: str = 'cosine') -> Optional[VectorIndex]:
+    """
+    Process-wide VectorIndex by name, reopened when another process saved it
+
+    Creates the index when it does not exist and ``dim`` is given, otherwise
+    returns None for unknown names.
+    """
+    directory = get_index_directory('vectors', name)
+    manifest_path = directory / MANIFEST
+    with _indexes_lock:
+        mtime = manifest_path.stat().st_mtime_ns if manifest_path.exists() else None
+        index = _indexes.get(str(directory))
+        if index is not None and index.saved_mtime == mtime:
+            return index
+        index = VectorIndex.open(directory) if mtime is not None else None
+        if index is None:
+            if dim is None:
+                return None
+            index = VectorIndex(dim, metric, directory)
+        _indexes[str(directory)] = index
+        return index
+
+
+@contextmanager
+def vector_index_writer(name: str):
+    """
+    Hold a vector index's file lock across processes while it is changed
+
+    Open the index with ``get_vector_index`` inside the block, so changes
+    saved by another process are loaded first, and save it before leaving.
+    """
+    with file_lock(get_index_directory('vectors', name) / LOCK):
+        yield
+
+
+def get_query_vector(value) -> List[float]:
+    """Query vector from a node input: a vector, an embedded item or a stream of one"""
+    if isinstance(value, LazyStream):
+        value = next(iter(value), None)
+    if isinstance(value, dict):
+        value = value.get('embedding')
+    if not isinstance(value, (list, tuple, np.ndarray)) or not len(value):
+        raise NonRetryableNodeError("Vector search requires a query embedding as input")
+    return value
+
+
+def run_vector_store(config: Dict, input_data=None):
+    """
+    vector_store node: upsert embedded chunks into, delete ids from, or
+    search a named index
+    """
+    name = config.get('index')
+    operation = config.get('operation', 'search')
+    if operation not in OPERATIONS:
+        raise NonRetryableNodeError(f"Unknown vector store operation: {operation}")
+
+    if operation == 'search':
+        if isinstance(input_data, dict):
+            value = input_data.get('query', input_data.get('input'))
+        else:
+            value = input_data
+        query = get_query_vector(value)
+        index = get_vector_index(name)
+        if index is None:
+            raise NonRetryableNodeError(f"Vector index {name} does not exist")
+        return index.search(query, int(config.get('top_k', 5)))
+
+    items = get_stream_input(input_data)
+    if items is None:
+        raise NonRetryableNodeError(f"Vector store {operation} requires items as input")
+
+    with vector_index_writer(name):
+        if operation == 'delete':
+            return delete_vectors(name, items)
+        return upsert_vectors(name, items, config.get('metric', 'cosine'))
+
+
+def delete_vectors(name: str, items: Iterable) -> Dict:
+    index = get_vector_index(name)
+    if index is None:
+        return {'index': name, 'deleted': 0, 'size': 0}
+    ids = [document_id(item) if isinstance(item, dict) else str(item) for item in items]
+    deleted = index.delete(ids)
+    index.save()
+    return {'index': name, 'deleted': deleted, 'size': len(index)}
+
+
+def upsert_vectors(name: str, items: Iterable, metric: str) -> Dict:
+    index = None
+    upserted = 0
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, UPSERT_BATCH_SIZE))
+        if not batch:
+            break
+        missing = [item for item in batch if not isinstance(item, dict) or item.get('embedding') is None]
+        if missing:
+            raise NonRetryableNodeError("Vector store upsert requires items with an embedding")
+        if index is None:
+            index = get_vector_index(name, dim=len(batch[0]['embedding']), metric=metric)
+            if index.metric != metric:
+                raise NonRetryableNodeError(f"Vector index {name} uses the {index.metric} metric")
+        index.add(
+            [document_id(item) for item in batch],
+            [item['embedding'] for item in batch],
+            [get_payload(item) for item in batch]
+        )
+        upserted += len(batch)
+    if index is None:
+        return {'index': name, 'upserted': 0, 'size': 0}
+    index.save()
+    return {'index': name, 'upserted': upserted, 'size': len(index)}
@@ -1,22 +1,39 @@
 from django.shortcuts import render
+from django.core.exceptions import ValidationError
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, serializers
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework import status
 
-from .models import Workflow, Node, WorkflowExecution
-from .serializers import WorkflowSerializer, NodeSerializer, WorkflowExecutionSerializer
-from .tasks import run_workflow
+from InnoFlow.pagination import TimestampCursorPagination, ExecutionCursorPagination
+from .models import Workflow, Node, WorkflowExecution, WorkflowBatch
+from .serializers import WorkflowSerializer, NodeSerializer, WorkflowExecutionSerializer, WorkflowBatchSerializer
+from .tasks import run_workflow, run_workflow_batch
+from .batch import create_batch, create_streaming_batch, iter_batch_output, iter_uploaded_rows
+from .events import execution_channel, get_event_broker, iter_execution_events
+from .graph_save import save_workflow_graph
+from .plan import ExecutionPlan, PLAN_SOURCES
+from .renderers import EventStreamRenderer, FastJSONRenderer
+from .fast_serializers import FastListModelMixin
+from .result_store import load_execution_output, load_output_rows
 
 class WorkflowViewSet(viewsets.ModelViewSet):
     serializer_class = WorkflowSerializer
     permission_classes = [AllowAny]  # Temporarily allow all for demo
     queryset = Workflow.objects.all()
+    pagination_class = TimestampCursorPagination
 
     def get_queryset(self):
         # Return all workflows for demo purposes
-        return Workflow.objects.all()
+        queryset = Workflow.objects.all()
+        if self.action in ('list', 'retrieve'):
+            queryset = self.serializer_class.prepare_queryset(queryset, self.request, self)
+        return queryset
 
     def perform_create(self, serializer):
         # Skip user assignment for demo
@@ -24,10 +41,29 @@ class WorkflowViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
+        """
+        Start an execution of the workflow.
+
+        With ``source=definition`` the plan is compiled from the ReactFlow
+        ``definition`` instead of the workflow's Node rows.
+        """
         workflow = self.get_object()
+        # "definition" runs the saved ReactFlow document directly
+        source = request.data.get('source', 'nodes')
+        if source not in PLAN_SOURCES:
+            return Response(
+                {"error": f"Unknown source '{source}', expected one of: {', '.join(PLAN_SOURCES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if source == 'definition':
+            try:
+                ExecutionPlan.from_definition(workflow.definition)
+            except ValidationError as e:
+                return Response({"errors": e.messages}, status=status.HTTP_400_BAD_REQUEST)
         execution = WorkflowExecution.objects.create(
             workflow=workflow,
-            status='pending'
+            status='pending',
+            execution_context={'plan_source': source}
         )
         run_workflow.delay(workflow.id, execution.id)
         return Response({
@@ -35,6 +71,69 @@ class WorkflowViewSet(viewsets.ModelViewSet):
             "execution_id": execution.id
         })
 
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser, MultiPartParser, FormParser])
+    def batch(self, request, pk=None):
+        """
+        Run the workflow once per set of variables.
+
+        Accepts either a JSON body with an ``inputs`` list of variable objects
+        or an uploaded ``file`` in JSONL or CSV format. With ``stream=true``
+        the file is read lazily while the batch runs and per-row outputs are
+        written to a JSONL artifact instead of execution records.
+        """
+        workflow = self.get_object()
+        upload = request.FILES.get('file')
+        streaming = str(request.data.get('stream', '')).lower() in ('1', 'true', 'yes')
+        try:
+            if streaming:
+                if not upload:
+                    raise ValueError("Streaming batches require an uploaded 'file'")
+                batch = create_streaming_batch(workflow, upload, request.data.get('concurrency'))
+                run_workflow_batch.delay(batch.id)
+                return Response({
+                    "status": "Workflow batch started",
+                    "batch_id": batch.id,
+                    "streaming": True
+                })
+            if upload:
+                rows = list(iter_uploaded_rows(upload))
+            else:
+                rows = request.data.get('inputs')
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise ValueError("'inputs' must be a list of variable objects")
+            if not rows:
+                raise ValueError("Batch must contain at least one row")
+            batch = create_batch(workflow, rows, request.data.get('concurrency'))
+        except (TypeError, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        run_workflow_batch.delay(batch.id)
+        return Response({
+            "status": "Workflow batch started",
+            "batch_id": batch.id,
+            "total_rows": batch.total_rows
+        })
+
+    @action(detail=True, methods=['put'])
+    def graph(self, request, pk=None):
+        """
+        Save the whole editor graph in one transaction.
+
+        The body holds ``nodes`` (existing ones by ``id``, new ones with a
+        client ``key``) and ``connections`` between them. Nodes and
+        connections missing from the body are deleted.
+        """
+        workflow = self.get_object()
+        try:
+            summary = save_workflow_graph(
+                workflow,
+                request.data.get('nodes', []),
+                request.data.get('connections', [])
+            )
+        except ValidationError as e:
+            return Response({"errors": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary)
+
 class NodeViewSet(viewsets.ModelViewSet):
     serializer_class = NodeSerializer
     permission_classes = [AllowAny]  # Temporarily allow all for demo
@@ -49,11 +148,89 @@ class NodeViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class WorkflowExecutionViewSet(viewsets.ReadOnlyModelViewSet):
+class WorkflowExecutionViewSet(FastListModelMixin, viewsets.ReadOnlyModelViewSet):
     queryset = WorkflowExecution.objects.all()
     serializer_class = WorkflowExecutionSerializer
     permission_classes = [AllowAny]  # Temporarily allow all for demo
+    pagination_class = ExecutionCursorPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    # Rows are resolved by id against the result store
+    row_columns = ('id',)
 
     def get_queryset(self):
         # Return all executions for demo purposes
-        return self.queryset.all()
\ No newline at end of file
+        return self.serializer_class.prepare_queryset(self.queryset.all(), self.request, self)
+
+    def prepare_rows(self, rows):
+        """Load the outputs kept in the result store of a page, in one query"""
+        rows = list(rows)
+        output_fields = [field for field in ('results', 'error_logs') if rows and field in rows[0]]
+        if not output_fields:
+            return rows
+        outputs = load_output_rows([
+            {'id': row['id'], 'results': row.get('results'), 'error_logs': row.get('error_logs')}
+            for row in rows
+        ])
+        for row, output in zip(rows, outputs):
+            for field in output_fields:
+                row[field] = output[field]
+        return rows
+
+    def retrieve(self, request, *args, **kwargs):
+        execution = self.get_object()
+        load_execution_output([execution])
+        return Response(self.get_serializer(execution).data)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Re-run a failed execution, skipping nodes that already completed"""
+        execution = self.get_object()
+        # Pending executions are queued or waiting for a scheduled retry of their task
+        if execution.status != 'failed':
+            return Response(
+                {"error": f"Only failed executions can be resumed, this one is {execution.status}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        execution.status = 'pending'
+        execution.save(update_fields=['status'])
+        # Subscribers must not replay the execution_finished of the previous run
+        get_event_broker().reset(execution_channel(execution.id))
+        run_workflow.delay(execution.workflow_id, execution.id)
+        return Response({
+            "status": "Workflow execution resumed",
+            "execution_id": execution.id,
+            "completed_nodes": execution.node_results.filter(status='completed').count()
+        })
+
+    @action(detail=True, methods=['get'], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def events(self, request, pk=None):
+        """Stream node-level progress of an execution as Server-Sent Events"""
+        execution = self.get_object()
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id or 0)
+        except ValueError:
+            last_event_id = 0
+        response = StreamingHttpResponse(
+            iter_execution_events(execution, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Disable proxy buffering so events reach the client as they happen
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class WorkflowBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = WorkflowBatch.objects.all()
+    serializer_class = WorkflowBatchSerializer
+    permission_classes = [AllowAny]  # Temporarily allow all for demo
+
+    @action(detail=True, methods=['get'])
+    def output(self, request, pk=None):
+        """Download the per-row results of a batch as JSONL"""
+        batch = self.get_object()
+        response = StreamingHttpResponse(iter_batch_output(batch), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="batch_{batch.id}.jsonl"'
+        return response